@@ -0,0 +1,135 @@
+import os
+import typing
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from typing import Optional
+
+TRUE_VALUES = ("1", "true", "yes")
+
+def _cpu_count(limit=None):
+    count = os.cpu_count() or 1
+    return min(limit, count) if limit else count
+
+@dataclass(frozen=True)
+class Settings:
+    # ชื่อ field ตรงกับชื่อตัวแปรสภาพแวดล้อมแบบตัวพิมพ์ใหญ่ เช่น mongo_database_name -> MONGO_DATABASE_NAME
+    app_test_mode: bool = False
+
+    # MongoDB
+    mongo_connection_string: Optional[str] = None
+    mongo_database_name: Optional[str] = None
+    mongo_sender_names_collection: Optional[str] = None
+    mongo_mock_collection: Optional[str] = None
+    mongo_bulk_batch_size: int = 1000
+    mongo_max_pool_size: int = 200
+    mongo_min_pool_size: int = 10
+    mongo_max_idle_time_ms: int = 60000
+    mongo_wait_queue_timeout_ms: int = 5000
+
+    # การยืนยันตัวตน
+    jwt_secret: str = "devsecret"
+    jwt_expire_minutes: int = 1440
+    auth_cache_ttl: int = 60
+    auth_cache_size: int = 10000
+    auth_claims_only: bool = False
+    # ใส่ค่าแบบเต็มตามที่ werkzeug เก็บไว้หน้า hash เช่น scrypt:32768:8:1 หรือ pbkdf2:sha256:1000000
+    password_hash_method: str = "scrypt:32768:8:1"
+    password_hash_workers: int = field(default_factory=lambda: _cpu_count(4))
+    password_hash_max_pending: int = 100
+    login_rate_limit_window: int = 60
+    login_rate_limit_per_email: int = 5
+    login_rate_limit_per_ip: int = 30
+    rate_limit_cache_size: int = 100000
+
+    # อีเมล
+    sender_email: Optional[str] = None
+    sender_password: Optional[str] = None
+    recipient_email: Optional[str] = None
+    smtp_server: Optional[str] = None
+    smtp_port: int = 587
+    smtp_starttls: bool = True
+    smtp_pool_size: int = 2
+    smtp_health_check_seconds: int = 30
+    smtp_coalesce_window: float = 0
+    # ค่าว่างหมายถึงใช้ตาม APP_TEST_MODE (ดู use_test_outbox)
+    email_test_outbox: Optional[bool] = None
+    imap_server: Optional[str] = None
+    imap_port: int = 993
+    imap_ssl: bool = True
+    imap_mailbox: str = "inbox"
+    imap_poll_interval: int = 10
+    imap_idle_timeout: int = 300
+    imap_backoff_base_seconds: float = 5
+    imap_backoff_max_seconds: float = 300
+
+    # worker
+    request_workers: int = 2
+    job_lease_seconds: int = 120
+    job_max_attempts: int = 5
+    job_retry_delay_seconds: int = 10
+    job_poll_interval: float = 1
+    job_rows_chunk_size: int = 5000
+    scheduler_lease_seconds: int = 30
+    scheduler_renew_seconds: int = 10
+    pdf_render_workers: int = field(default_factory=_cpu_count)
+    thai_font_path_normal: Optional[str] = None
+
+    # การแจ้งเตือน
+    notification_stream_queue_size: int = 1000
+    notification_stream_heartbeat_seconds: float = 15
+    # ใช้ change stream ของ MongoDB เป็นแหล่งข้อมูลเมื่อรันหลาย worker (ต้องเป็น replica set)
+    notification_change_stream: bool = False
+
+    # ข้อมูลผู้ส่ง
+    sender_cache_ttl: int = 30
+    sender_cache_size: int = 256
+    sender_import_chunk_size: int = 5000
+    sender_import_max_rejects: int = 1000
+
+    # ไฟล์ใน GridFS
+    # "zstd" เพื่อบีบอัดไฟล์ตอบกลับก่อนเก็บ (ต้องติดตั้ง zstandard เพิ่มเอง)
+    reply_compression: Optional[str] = None
+    reply_compression_level: int = 3
+    # รอบลบไฟล์ที่ไม่มีการอ้างถึง 0 = ปิด (ตรวจด้วย python -m app.utils.file_store --dry-run ก่อนเปิด)
+    file_retention_interval_seconds: int = 0
+    # ลบไฟล์ที่ไม่ได้ถูกเก็บซ้ำเกินจำนวนวันนี้แม้ยังมีการอ้างถึง 0 = เก็บไว้จนกว่าจะไม่มีการอ้างถึง
+    file_retention_days: int = 0
+    # ไฟล์ที่เพิ่งเก็บอาจยังไม่ถูกบันทึกลงงานหรือ sender_names จึงยังไม่ลบ
+    file_retention_grace_seconds: int = 86400
+    file_retention_batch_size: int = 500
+
+    # metrics (ต้องติดตั้ง pyinstrument เพิ่มเองเมื่อต้องการใช้ profiler)
+    profiling_enabled: bool = False
+    profile_dir: str = "profiles"
+
+    @property
+    def use_test_outbox(self):
+        return self.app_test_mode if self.email_test_outbox is None else self.email_test_outbox
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        values = {}
+        for setting in fields(cls):
+            name = setting.name.upper()
+            raw = environ.get(name, "").strip()
+            # ค่าว่างถือว่าไม่ได้ตั้ง ใช้ค่าเริ่มต้นแทนการ crash ตอนแปลงชนิด
+            if raw:
+                values[setting.name] = _parse(name, setting.type, raw)
+        return cls(**values)
+
+def _parse(name, annotation, raw):
+    if typing.get_origin(annotation) is typing.Union:
+        annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+    if annotation is bool:
+        return raw.lower() in TRUE_VALUES
+    try:
+        return annotation(raw)
+    except ValueError:
+        raise ValueError(f"{name} ต้องเป็น {annotation.__name__} แต่ได้ค่า {raw!r}")
+
+@lru_cache(maxsize=None)
+def get_settings():
+    # อ่าน .env และตัวแปรสภาพแวดล้อมครั้งเดียวต่อ process เมื่อมีการใช้งานครั้งแรก
+    from dotenv import load_dotenv
+    load_dotenv()
+    return Settings.from_env()
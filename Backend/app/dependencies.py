@@ -1,15 +1,70 @@
-from fastapi import HTTPException, Header
+from fastapi import HTTPException, Header, Query
+from typing import Optional
+from app.config import get_settings
 from app.utils.authentication import decode_token
-from app.models.user import users_collection
+from app.models.user import async_users_collection
 from bson.objectid import ObjectId
+from cachetools import TTLCache
+import threading
 
-def get_current_user(authorization: str = Header(...)):
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = authorization.split(" ")[1]
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+def user_cache():
+    # สร้าง cache เมื่อใช้ครั้งแรก ขนาดและอายุมาจาก settings
+    # TTLCache ไล่รายการที่ใช้ล่าสุดน้อยที่สุดออกเมื่อเต็ม (LRU) และหมดอายุตาม TTL
+    global _user_cache
+    if _user_cache is None:
+        settings = get_settings()
+        _user_cache = TTLCache(maxsize=settings.auth_cache_size, ttl=settings.auth_cache_ttl)
+    return _user_cache
+
+def invalidate_user(user_id):
+    # เรียกทุกครั้งที่แก้ไขหรือลบผู้ใช้ เพื่อไม่ให้ cache คืนข้อมูลเก่า
+    with _user_cache_lock:
+        user_cache().pop(str(user_id), None)
+
+def clear_user_cache():
+    with _user_cache_lock:
+        user_cache().clear()
+
+async def load_user(user_id: str):
+    with _user_cache_lock:
+        user = user_cache().get(user_id)
+    if user is None:
+        user = await async_users_collection().find_one({"_id": ObjectId(user_id)}, {"password": 0})
+        if not user:
+            return None
+        user["id"] = user_id
+        with _user_cache_lock:
+            user_cache()[user_id] = user
+    return dict(user)
+
+async def user_from_token(token: str):
     payload = decode_token(token)
-    user = users_collection().find_one({"_id": ObjectId(payload["sub"])})
+    if get_settings().auth_claims_only:
+        # เชื่อข้อมูลใน token ที่ลงลายเซ็นแล้ว โดยไม่อ่านฐานข้อมูล
+        return {
+            "_id": ObjectId(payload["sub"]),
+            "id": payload["sub"],
+            "name": payload.get("name"),
+            "email": payload["email"],
+            "role": payload.get("role")
+        }
+    user = await load_user(payload["sub"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user["id"] = str(user["_id"])
-    return user
\ No newline at end of file
+    return user
+
+async def get_current_user(authorization: str = Header(...)):
+    if not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+    return await user_from_token(authorization.split(" ")[1])
+
+async def get_stream_user(authorization: Optional[str] = Header(None), token: Optional[str] = Query(None)):
+    # EventSource ของเบราว์เซอร์ตั้ง header เองไม่ได้ จึงรับ token ทาง query string ด้วย
+    if authorization and authorization.startswith("Bearer "):
+        return await user_from_token(authorization.split(" ")[1])
+    if token:
+        return await user_from_token(token)
+    raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
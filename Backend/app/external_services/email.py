@@ -1,129 +1,267 @@
-import os
-import smtplib
 import imaplib
+import threading
 import email
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
-from dotenv import load_dotenv
-from app.models.database import grid_fs
+from email.header import decode_header, make_header
+from app.config import get_settings
+from app.utils.file_store import store_file, read_file
+from app.utils.metrics import timed
+from app.external_services.smtp_pool import SMTPPool, CoalescingDispatcher
 from app.models.sender_names import sender_names_collection
 from app.models.notification import notifications_collection
+from app.models.reply_match import reply_matches_collection
+from app.models.job import jobs_collection
+from app.external_services.notification import create_notifications, build_notification
+from app.utils.reply_matching import match_reply
+from app.utils.sender_search import invalidate_sender_cache
+from app.utils.helpers import chunked
 import datetime
-import pandas as pd
-from io import BytesIO
+import re
 
-load_dotenv()
+# โหมดทดสอบเก็บอีเมลที่ส่งไว้ที่นี่แทนการส่งผ่าน SMTP
+test_outbox = []
 
-SENDER_EMAIL = os.getenv("SENDER_EMAIL")
-SENDER_PASSWORD = os.getenv("SENDER_PASSWORD")
-RECIPIENT_EMAIL = os.getenv("RECIPIENT_EMAIL")
-SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = int(os.getenv("SMTP_PORT"))
-IMAP_SERVER = os.getenv("IMAP_SERVER")
+REQUEST_ID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+UID_PATTERN = re.compile(rb"UID (\d+)")
+IMAP_UID_SET_SIZE = 200
+# แถวในไฟล์ตอบกลับที่ไม่ตรงกับผู้ส่งในคำขอ เก็บไว้ดูได้ไม่เกินจำนวนนี้ต่อไฟล์
+REPLY_EXTRA_ROWS_KEPT = 1000
+# งานที่ยังบันทึกแถวผู้ส่งไม่เสร็จ
+ACTIVE_JOB_STATUSES = ["queued", "running"]
 
-def send_email(subject, body, file_ids):
+@timed("gridfs.get")
+def read_attachments(file_ids):
+    attachments = []
+    for file_id in file_ids:
+        attachments.append(read_file(file_id))
+    return attachments
+
+def build_email(recipient, subject, body, attachments):
     msg = MIMEMultipart()
-    msg['From'] = SENDER_EMAIL
-    msg['To'] = RECIPIENT_EMAIL
+    msg['From'] = get_settings().sender_email
+    msg['To'] = recipient
     msg['Subject'] = subject
     msg.attach(MIMEText(body, 'plain', 'utf-8'))
 
-    for file_id in file_ids:
-        file_data = grid_fs.get(file_id).read()
-        filename = grid_fs.get(file_id).filename
+    for filename, file_data in attachments:
         part = MIMEBase('application', 'octet-stream')
         part.set_payload(file_data)
         encoders.encode_base64(part)
         part.add_header("Content-Disposition", f'attachment; filename="{filename}"')
         msg.attach(part)
+    return msg
 
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        server.send_message(msg)
+def deliver_email(msg):
+    if get_settings().use_test_outbox:
+        test_outbox.append(msg)
+        return
+    get_smtp_pool().send(msg)
 
-def check_inbox_and_save_reply():
-    mail = imaplib.IMAP4_SSL(IMAP_SERVER)
-    mail.login(SENDER_EMAIL, SENDER_PASSWORD)
-    mail.select("inbox")
+# pool และ dispatcher (ซึ่งเปิด thread) สร้างเมื่อส่งอีเมลครั้งแรก ไม่ใช่ตอน import
+smtp_pool = None
+email_dispatcher = None
+_smtp_lock = threading.Lock()
 
-    sender_names = sender_names_collection()
-    notifications = notifications_collection()
+def get_smtp_pool():
+    global smtp_pool
+    with _smtp_lock:
+        if smtp_pool is None:
+            settings = get_settings()
+            smtp_pool = SMTPPool(
+                settings.smtp_server,
+                settings.smtp_port,
+                settings.sender_email,
+                settings.sender_password,
+                size=settings.smtp_pool_size,
+                starttls=settings.smtp_starttls,
+                health_check_after=settings.smtp_health_check_seconds
+            )
+        return smtp_pool
 
-    for doc in sender_names.find({"status": {"$in": ["pending", "suspension_requested"]}}):
-        request_id = doc.get("request_id")
-        if not request_id:
-            continue
-        sender_name = doc["sender_name"]
-        phone_number = doc["phone_number"]
-        user_id = doc["created_by"]
-        thai_date = doc["thai_date"]
+def get_email_dispatcher():
+    global email_dispatcher
+    window = get_settings().smtp_coalesce_window
+    if window <= 0:
+        return None
+    with _smtp_lock:
+        if email_dispatcher is None:
+            email_dispatcher = CoalescingDispatcher(build_email, deliver_email, window)
+        return email_dispatcher
 
-        if notifications.find_one({"request_id": request_id, "sender_name": sender_name, "status": "received"}):
-            continue
+def close_smtp_pool():
+    if smtp_pool is not None:
+        smtp_pool.close()
+
+@timed("smtp.send_email")
+def send_email(subject, body, file_ids, recipient=None):
+    recipient = recipient or get_settings().recipient_email
+    attachments = read_attachments(file_ids)
+    dispatcher = get_email_dispatcher()
+    if dispatcher:
+        dispatcher.submit(recipient, subject, body, attachments).result()
+        return
+    deliver_email(build_email(recipient, subject, body, attachments))
+
+def email_status():
+    pool = get_smtp_pool()
+    return {**pool.stats, "latency_seconds": pool.latency_summary(), "coalesce_window": get_settings().smtp_coalesce_window}
+
+def connect_imap():
+    settings = get_settings()
+    imap_class = imaplib.IMAP4_SSL if settings.imap_ssl else imaplib.IMAP4
+    mail = imap_class(settings.imap_server, settings.imap_port)
+    mail.login(settings.sender_email, settings.sender_password)
+    return mail
+
+def uid_sets(uids):
+    # รวม UID ที่ต่อเนื่องเป็นช่วง (เช่น 1:500) และแบ่งเป็นหลายคำสั่ง ไม่ให้บรรทัดคำสั่งยาวเกินที่เซิร์ฟเวอร์รับได้
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    parts = [f"{start}:{end}" if start != end else str(start) for start, end in ranges]
+    return [",".join(chunk) for chunk in chunked(parts, IMAP_UID_SET_SIZE)]
 
-        result, data = mail.search(None, f'(SUBJECT "{request_id}")')
+def fetch_messages(mail, uids, message_parts):
+    messages = {}
+    for uid_set in uid_sets(uids):
+        result, data = mail.uid("FETCH", uid_set, message_parts)
         if result != 'OK':
+            raise imaplib.IMAP4.error(f"UID FETCH failed: {data}")
+        for item in data:
+            if not isinstance(item, tuple):
+                continue
+            uid_match = UID_PATTERN.search(item[0])
+            if uid_match:
+                messages[int(uid_match.group(1))] = email.message_from_bytes(item[1])
+    return messages
+
+def index_request_ids(headers):
+    sender_email = (get_settings().sender_email or "").lower()
+    request_uids = {}
+    for uid, msg in sorted(headers.items()):
+        if not msg["From"] or (sender_email and sender_email in msg["From"].lower()):
             continue
+        subject = str(make_header(decode_header(msg["Subject"] or "")))
+        for request_id in set(REQUEST_ID_PATTERN.findall(subject.lower())):
+            request_uids.setdefault(request_id, []).append(uid)
+    return request_uids
 
-        for num in data[0].split():
-            _, msg_data = mail.fetch(num, "(RFC822)")
-            msg = email.message_from_bytes(msg_data[0][1])
-            if msg["From"] and SENDER_EMAIL.lower() not in msg["From"].lower():
-                for part in msg.walk():
-                    if part.get_content_maintype() == 'multipart' or part.get('Content-Disposition') is None:
-                        continue
-                    filename = part.get_filename()
-                    if filename and filename.lower().endswith((".csv", ".xlsx")):
-                        file_data = part.get_payload(decode=True)
-                        reply_id = grid_fs.put(file_data, filename=filename, request_id=request_id, file_type="reply")
-                        is_valid_response = check_response_contains_sender(file_data, sender_name, phone_number, filename)
-                        new_status = "received" if is_valid_response else "error"
-                        sender_names.update_one(
-                            {"sender_name": sender_name, "request_id": request_id},
-                            {
-                                "$addToSet": {"status": new_status},
-                                "$set": {
-                                    "reply_file_id": reply_id if is_valid_response else None,
-                                    "updated_at": datetime.datetime.now()
-                                }
-                            }
-                        )
-                        notifications.insert_one({
-                            "request_id": request_id,
-                            "sender_name": sender_name,
-                            "status": new_status,
-                            "user_id": user_id,
-                            "is_read": False,
-                            "thai_date": thai_date,
-                            "created_at": datetime.datetime.now()
-                        })
-                        mail.store(num, '+FLAGS', '\\Seen')
-                        break
-    mail.logout()
-
-def check_response_contains_sender(file_data, sender_name, phone_number, filename):
-    try:
-        if filename.lower().endswith(".csv"):
-            df = pd.read_csv(BytesIO(file_data))
-        else:
-            df = pd.read_excel(BytesIO(file_data))
-        df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-        sender_name_clean = sender_name.strip().lower()
-        phone_number_clean = ''.join(filter(str.isdigit, str(phone_number))).lstrip('0')
+def find_reply_attachment(msg):
+    for part in msg.walk():
+        if part.get_content_maintype() == 'multipart' or part.get('Content-Disposition') is None:
+            continue
+        filename = part.get_filename()
+        if filename and filename.lower().endswith((".csv", ".xlsx")):
+            return filename, part.get_payload(decode=True)
+    return None, None
+
+@timed("gridfs.put_reply")
+def store_reply_file(file_data, filename, request_id):
+    # ไฟล์แนบเดียวกันเก็บครั้งเดียว ไม่ว่าจะมีผู้ส่งหรือข้อความอ้างถึงกี่รายการ
+    return store_file(file_data, filename, "reply", request_id, compress=True)
+
+# mail คือการเชื่อมต่อที่ select mailbox แล้วของผู้เรียก uids คือ UID ของข้อความที่ต้องตรวจในรอบนี้
+@timed("imap.check_inbox_and_save_reply")
+def check_inbox_and_save_reply(mail, uids):
+    # คืน UID ที่ยังประมวลผลไม่ได้ ให้ worker ตรวจซ้ำในรอบถัดไป
+    request_uids = index_request_ids(fetch_messages(mail, uids, "(BODY.PEEK[HEADER.FIELDS (SUBJECT FROM)])"))
+    deferred = set()
+    # งานที่ยังไม่จบส่งอีเมลก่อนบันทึกแถวผู้ส่ง (และ retry การบันทึกได้) คำตอบที่มาก่อนจึงยังไม่มีแถวให้เทียบ
+    for job in jobs_collection().find({"_id": {"$in": list(request_uids)}, "status": {"$in": ACTIVE_JOB_STATUSES}}, {"_id": 1}):
+        deferred.update(request_uids.pop(job["_id"]))
+    if not request_uids:
+        return deferred
+
+    sender_names = sender_names_collection()
+    notifications = notifications_collection()
+
+    pending_by_request = {}
+    for doc in sender_names.find({
+        "request_id": {"$in": list(request_uids)},
+        "status": {"$in": ["pending", "suspension_requested"]}
+    }):
+        pending_by_request.setdefault(doc["request_id"], []).append(doc)
+    if not pending_by_request:
+        return deferred
 
-        sender_col = next((col for col in df.columns if "sender" in col and "name" in col), None)
-        phone_col = next((col for col in df.columns if "phone" in col or "number" in col), None)
+    received = {
+        (doc["request_id"], doc["sender_name"])
+        for doc in notifications.find(
+            {"request_id": {"$in": list(pending_by_request)}, "status": "received"},
+            {"request_id": 1, "sender_name": 1}
+        )
+    }
 
-        if not sender_col or not phone_col:
-            return False
+    wanted_uids = sorted({uid for request_id in pending_by_request for uid in request_uids[request_id]})
+    messages = fetch_messages(mail, wanted_uids, "(RFC822)")
 
-        df[sender_col] = df[sender_col].astype(str).str.strip().str.lower()
-        df[phone_col] = df[phone_col].astype(str).str.replace(r'\D', '', regex=True).str.lstrip('0')
+    seen_uids = set()
+    for request_id, docs in pending_by_request.items():
+        docs = [doc for doc in docs if (request_id, doc["sender_name"]) not in received]
+        # ใช้ทุกข้อความของคำขอตามลำดับ UID คำตอบที่แก้ไขส่งมาภายหลังจึงเปลี่ยน error เป็น received ได้
+        for uid in request_uids[request_id]:
+            if not docs:
+                break
+            filename, file_data = find_reply_attachment(messages[uid]) if uid in messages else (None, None)
+            if not filename:
+                continue
+            matched = apply_reply(request_id, docs, filename, file_data)
+            docs = [doc for doc in docs if doc["sender_name"] not in matched]
+            seen_uids.add(uid)
 
-        match = df[(df[sender_col] == sender_name_clean) & (df[phone_col] == phone_number_clean)]
-        return not match.empty
-    except:
-        return False
\ No newline at end of file
+    if seen_uids:
+        invalidate_sender_cache()
+        for uid_set in uid_sets(seen_uids):
+            mail.uid("STORE", uid_set, '+FLAGS', '\\Seen')
+    return deferred
+
+def apply_reply(request_id, docs, filename, file_data):
+    # docs คือผู้ส่งของคำขอที่ยังไม่ได้รับข้อมูล คืนชื่อผู้ส่งที่พบในไฟล์นี้
+    reply_id = store_reply_file(file_data, filename, request_id)
+    result = match_reply(file_data, filename, docs)
+    if result["error"]:
+        print(f"❌ Cannot read reply {filename} for {request_id}:", result["error"])
+    now = datetime.datetime.now()
+    reply_matches_collection().insert_one({
+        "request_id": request_id,
+        "reply_file_id": reply_id,
+        "filename": filename,
+        "matched": result["matched"],
+        "missing": result["missing"],
+        "extra": result["extra"][:REPLY_EXTRA_ROWS_KEPT],
+        "extra_count": len(result["extra"]),
+        "error": result["error"],
+        "created_at": now
+    })
+    sender_names = sender_names_collection()
+    for new_status, names in (("received", result["matched"]), ("error", result["missing"])):
+        if not names:
+            continue
+        sender_names.update_many(
+            {"request_id": request_id, "sender_name": {"$in": names}},
+            {
+                "$addToSet": {"status": new_status},
+                # reply_file_id ใช้ยืนยันการระงับทั้งไฟล์ จึงเก็บเฉพาะแถวที่พบ ไฟล์ที่แจ้งว่าไม่พบแยกไว้อีกฟิลด์
+                "$set": {
+                    "reply_file_id": reply_id if new_status == "received" else None,
+                    **({"error_reply_file_id": reply_id} if new_status == "error" else {}),
+                    "updated_at": now
+                }
+            }
+        )
+    statuses = {name: "received" for name in result["matched"]}
+    statuses.update({name: "error" for name in result["missing"]})
+    create_notifications([
+        build_notification(
+            request_id, doc["sender_name"], statuses[doc["sender_name"]],
+            doc["created_by"], doc["thai_date"], doc.get("mobile_provider")
+        )
+        for doc in docs
+    ])
+    return set(result["matched"])
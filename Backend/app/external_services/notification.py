@@ -1,14 +1,64 @@
-from app.models.notification import notifications_collection
+from app.models.notification import notifications_collection, async_notifications_collection
+from app.external_services.notification_hub import publish_notifications
+from app.utils.status_stats import record_status_events, record_status_events_async
+from pymongo.errors import DuplicateKeyError, BulkWriteError
 import datetime
 
-def create_notification(request_id: str, sender_name: str, status: str, user_id: str, thai_date: str):
-    notifications = notifications_collection()
-    return notifications.insert_one({
+DUPLICATE_KEY_ERROR = 11000
+
+def build_notification(request_id: str, sender_name: str, status: str, user_id: str, thai_date: str, mobile_provider: str = None):
+    return {
         "request_id": request_id,
         "sender_name": sender_name,
         "status": status,
         "user_id": user_id,
+        "mobile_provider": mobile_provider,
         "is_read": False,
         "thai_date": thai_date,
+        # ดัชนี unique บน key นี้ทำให้การแจ้งเตือนเดิมไม่ถูกสร้างซ้ำเมื่อ retry หรือประมวลผลคำตอบซ้ำ
+        "idempotency_key": f"{request_id}:{sender_name}:{status}",
         "created_at": datetime.datetime.now()
-    })
\ No newline at end of file
+    }
+
+def create_notification(request_id: str, sender_name: str, status: str, user_id: str, thai_date: str, mobile_provider: str = None):
+    notifications = notifications_collection()
+    doc = build_notification(request_id, sender_name, status, user_id, thai_date, mobile_provider)
+    try:
+        result = notifications.insert_one(doc)
+    except DuplicateKeyError:
+        return None
+    publish_notifications([doc])
+    record_status_events([doc])
+    return result
+
+def create_notifications(docs):
+    if not docs:
+        return 0
+    notifications = notifications_collection()
+    try:
+        notifications.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details["writeErrors"]
+        if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        duplicates = {error["index"] for error in errors}
+        docs = [doc for index, doc in enumerate(docs) if index not in duplicates]
+    publish_notifications(docs)
+    record_status_events(docs)
+    return len(docs)
+
+async def create_notifications_async(docs):
+    if not docs:
+        return 0
+    notifications = async_notifications_collection()
+    try:
+        await notifications.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details["writeErrors"]
+        if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        duplicates = {error["index"] for error in errors}
+        docs = [doc for index, doc in enumerate(docs) if index not in duplicates]
+    publish_notifications(docs)
+    await record_status_events_async(docs)
+    return len(docs)
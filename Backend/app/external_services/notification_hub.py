@@ -0,0 +1,80 @@
+import asyncio
+from app.config import get_settings
+
+class NotificationHub:
+    # pub/sub ภายใน process: ผู้ฟังแต่ละคนได้ asyncio.Queue ของตัวเองแยกตาม user_id
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size
+        self._loop = None
+        self._subscribers = {}
+        self.stats = {"published": 0, "delivered": 0, "dropped_subscribers": 0}
+
+    def attach(self, loop):
+        self._loop = loop
+
+    def detach(self):
+        self._loop = None
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._close(queue)
+        self._subscribers.clear()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=self.queue_size or get_settings().notification_stream_queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self._subscribers.get(user_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self):
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, docs):
+        # เรียกได้จากทุก thread งานจริงถูกส่งต่อไปทำใน event loop
+        if self._loop is None or not docs:
+            return
+        self.stats["published"] += len(docs)
+        self._loop.call_soon_threadsafe(self._dispatch, list(docs))
+
+    def _dispatch(self, docs):
+        for doc in docs:
+            for queue in list(self._subscribers.get(doc["user_id"], ())):
+                try:
+                    queue.put_nowait(doc)
+                    self.stats["delivered"] += 1
+                except asyncio.QueueFull:
+                    # ผู้ฟังช้าเกินไป ตัดการเชื่อมต่อ ให้ client เชื่อมใหม่พร้อม Last-Event-ID
+                    self.unsubscribe(doc["user_id"], queue)
+                    self.stats["dropped_subscribers"] += 1
+                    self._close(queue)
+
+    @staticmethod
+    def _close(queue):
+        # None บอกให้ stream ปิดการเชื่อมต่อ
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+notification_hub = NotificationHub()
+
+def publish_notifications(docs):
+    if not get_settings().notification_change_stream:
+        notification_hub.publish(docs)
+
+async def watch_notification_changes(collection):
+    # ทุก worker เห็นการแจ้งเตือนที่ worker อื่นสร้าง ผ่าน change stream
+    while True:
+        try:
+            async with collection.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                async for change in stream:
+                    notification_hub.publish([change["fullDocument"]])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("❌ Notification change stream error:", e)
+            await asyncio.sleep(5)
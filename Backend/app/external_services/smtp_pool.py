@@ -0,0 +1,154 @@
+import smtplib
+import threading
+import time
+import queue
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+class SMTPPool:
+    def __init__(self, host, port, username=None, password=None, size=2, starttls=True, timeout=30, health_check_after=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.starttls = starttls
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.stats = {"sent": 0, "failed": 0, "connects": 0, "reconnects": 0}
+        self.latencies = deque(maxlen=1000)
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self.stats["connects"] += 1
+        return server
+
+    def _is_healthy(self, server):
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _checkout(self):
+        try:
+            server, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+        # ส่ง NOOP เฉพาะการเชื่อมต่อที่ว่างนานพอที่เซิร์ฟเวอร์อาจตัดไปแล้ว
+        if time.monotonic() - last_used > self.health_check_after and not self._is_healthy(server):
+            self._close(server)
+            self.stats["reconnects"] += 1
+            return self._connect()
+        return server
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._checkout()
+            yield server
+        except (smtplib.SMTPServerDisconnected, OSError):
+            if server:
+                server.close()
+            server = None
+            raise
+        finally:
+            if server:
+                self._idle.put((server, time.monotonic()))
+            self._slots.release()
+
+    def send(self, msg):
+        started = time.perf_counter()
+        try:
+            try:
+                with self.connection() as server:
+                    server.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # การเชื่อมต่อใน pool หลุดระหว่างตรวจสุขภาพกับตอนส่ง ลองส่งใหม่หนึ่งครั้งด้วยการเชื่อมต่อใหม่
+                self.stats["reconnects"] += 1
+                with self.connection() as server:
+                    server.send_message(msg)
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        self.stats["sent"] += 1
+        self.latencies.append(time.perf_counter() - started)
+
+    def latency_summary(self):
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {"count": 0, "p50": None, "p95": None, "max": None}
+        return {
+            "count": len(latencies),
+            "p50": latencies[len(latencies) // 2],
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "max": latencies[-1]
+        }
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+class CoalescingDispatcher:
+    # รวมอีเมลที่ส่งถึงผู้รับคนเดียวกันภายในช่วงเวลา window ให้เป็นข้อความเดียว
+    def __init__(self, build_message, send, window):
+        self.build_message = build_message
+        self.send = send
+        self.window = window
+        self._pending = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="smtp-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, recipient, subject, body, attachments):
+        future = Future()
+        self._pending.put((recipient, subject, body, attachments, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.window
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            by_recipient = {}
+            for item in batch:
+                by_recipient.setdefault(item[0], []).append(item)
+            for recipient, items in by_recipient.items():
+                futures = [item[4] for item in items]
+                try:
+                    msg = self.build_message(
+                        recipient,
+                        " / ".join(item[1] for item in items),
+                        "\n\n----------\n\n".join(item[2] for item in items),
+                        [attachment for item in items for attachment in item[3]]
+                    )
+                    self.send(msg)
+                except Exception as e:
+                    for future in futures:
+                        future.set_exception(e)
+                    continue
+                for future in futures:
+                    future.set_result(len(items))
@@ -1,8 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import users, requests
+from app.models.database import open_async_db, close_async_db, close_db
+from app.utils.metrics import MetricsMiddleware, metrics_endpoint
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_async_db()
+    await requests.start_background_workers()
+    yield
+    await requests.stop_background_workers()
+    close_async_db()
+    close_db()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,6 +23,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 app.include_router(users.router, prefix="/api")
 app.include_router(requests.router, prefix="/api")
\ No newline at end of file
@@ -1,13 +1,85 @@
-import os
-from dotenv import load_dotenv
-from pymongo import MongoClient
-import gridfs
+import threading
+from app.config import get_settings
+from app.utils.metrics import mongo_command_listener
 
-load_dotenv()
+# client ทั้งหมดสร้างเมื่อใช้ครั้งแรก การ import โมดูลนี้จึงไม่เชื่อมต่อฐานข้อมูล
+# client แบบ sync ใช้กับ worker ที่ทำงานใน thread และ CLI ส่วน router ใช้ client ของ Motor ด้านล่าง
+mongo_client = None
+mongo_db = None
+grid_fs = None
+_client_lock = threading.Lock()
 
-MONGO_CONNECTION_STRING = os.getenv("MONGO_CONNECTION_STRING")
-MONGO_DATABASE_NAME = os.getenv("MONGO_DATABASE_NAME")
+# Motor ต้องสร้างภายใน event loop จึงเปิด/ปิดใน lifespan ของแอป (app/main.py)
+async_client = None
+async_db = None
+async_grid_fs = None
 
-mongo_client = MongoClient(MONGO_CONNECTION_STRING)
-mongo_db = mongo_client[MONGO_DATABASE_NAME]
-grid_fs = gridfs.GridFS(mongo_db)
\ No newline at end of file
+def get_mongo_client():
+    global mongo_client
+    if mongo_client is None:
+        with _client_lock:
+            if mongo_client is None:
+                mongo_client = _create_client()
+    return mongo_client
+
+def _create_client():
+    settings = get_settings()
+    if settings.app_test_mode:
+        # โหมดทดสอบ: ใช้ MongoDB จำลองในหน่วยความจำแทนเซิร์ฟเวอร์จริง
+        import mongomock
+        from mongomock.gridfs import enable_gridfs_integration
+        enable_gridfs_integration()
+        return mongomock.MongoClient()
+    from pymongo import MongoClient
+    return MongoClient(settings.mongo_connection_string, event_listeners=[mongo_command_listener])
+
+def get_mongo_db():
+    global mongo_db
+    if mongo_db is None:
+        mongo_db = get_mongo_client()[get_settings().mongo_database_name]
+    return mongo_db
+
+def get_grid_fs():
+    global grid_fs
+    if grid_fs is None:
+        import gridfs
+        grid_fs = gridfs.GridFS(get_mongo_db())
+    return grid_fs
+
+def drop_database():
+    # ใช้กับ benchmark เท่านั้น
+    get_mongo_client().drop_database(get_settings().mongo_database_name)
+
+def close_db():
+    global mongo_client, mongo_db, grid_fs
+    # ข้อมูลของ mongomock อยู่ใน client จึงไม่ปิดในโหมดทดสอบ
+    if mongo_client is not None and not get_settings().app_test_mode:
+        mongo_client.close()
+        mongo_client = mongo_db = grid_fs = None
+
+def open_async_db():
+    global async_client, async_db, async_grid_fs
+    settings = get_settings()
+    from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+    if settings.app_test_mode:
+        from mongomock_motor import AsyncMongoMockClient
+        # ใช้ข้อมูลชุดเดียวกับ client แบบ sync เพื่อให้ worker และ router เห็นข้อมูลตรงกัน
+        async_client = AsyncMongoMockClient(mock_mongo_client=get_mongo_client())
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        async_client = AsyncIOMotorClient(
+            settings.mongo_connection_string,
+            maxPoolSize=settings.mongo_max_pool_size,
+            minPoolSize=settings.mongo_min_pool_size,
+            maxIdleTimeMS=settings.mongo_max_idle_time_ms,
+            waitQueueTimeoutMS=settings.mongo_wait_queue_timeout_ms,
+            event_listeners=[mongo_command_listener]
+        )
+    async_db = async_client[settings.mongo_database_name]
+    async_grid_fs = AsyncIOMotorGridFSBucket(async_db)
+
+def close_async_db():
+    global async_client, async_db, async_grid_fs
+    if async_client is not None and not get_settings().app_test_mode:
+        async_client.close()
+    async_client = async_db = async_grid_fs = None
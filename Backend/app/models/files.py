@@ -0,0 +1,8 @@
+from app.models.database import get_mongo_db
+
+# collection ของ GridFS (bucket ชื่อ fs) ใช้ตรง ๆ เมื่อต้องค้นหรือลบไฟล์ทีละหลายรายการ
+def files_collection():
+    return get_mongo_db()["fs.files"]
+
+def chunks_collection():
+    return get_mongo_db()["fs.chunks"]
@@ -0,0 +1,173 @@
+import argparse
+import datetime
+import sys
+from bson.objectid import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from app.config import get_settings
+from app.models.files import files_collection
+from app.models.user import users_collection
+from app.models.sender_names import sender_names_collection
+from app.models.notification import notifications_collection
+from app.models.job import jobs_collection, job_rows_collection
+from app.models.stats import sender_stats_collection
+from app.models.reply_match import reply_matches_collection
+
+# ดัชนีที่ทุก collection ต้องมี ชื่อดัชนีกำหนดเองเพื่อให้เทียบกับของจริงในฐานข้อมูลได้
+INDEXES = {
+    users_collection: [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True)
+    ],
+    sender_names_collection: [
+        IndexModel([("sender_name", ASCENDING), ("phone_number", ASCENDING)], name="sender_phone"),
+        IndexModel([("request_id", ASCENDING), ("status", ASCENDING)], name="request_status"),
+        IndexModel([("request_id", ASCENDING), ("sender_name", ASCENDING)], name="request_sender"),
+        IndexModel([("created_by", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="created_by_page"),
+        # ค้นผู้ส่งแบ่งหน้าตาม (date, _id) ดัชนีจึงลงท้ายด้วย date, _id
+        IndexModel([("status", ASCENDING), ("date", ASCENDING), ("_id", ASCENDING)], name="status_date"),
+        IndexModel([("mobile_provider", ASCENDING), ("date", ASCENDING), ("_id", ASCENDING)], name="provider_date"),
+        IndexModel([("date", ASCENDING), ("_id", ASCENDING)], name="date"),
+        # ใช้นับการอ้างถึงไฟล์ตอนลบไฟล์ที่ไม่ได้ใช้
+        IndexModel([("pdf_sent_data_id", ASCENDING)], name="pdf_sent_data_id"),
+        IndexModel([("pdf_sent_suspension_id", ASCENDING)], name="pdf_sent_suspension_id"),
+        IndexModel([("reply_file_id", ASCENDING)], name="reply_file_id"),
+        IndexModel([("error_reply_file_id", ASCENDING)], name="error_reply_file_id")
+    ],
+    notifications_collection: [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_page"),
+        IndexModel([("user_id", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_unread_page"),
+        IndexModel([("request_id", ASCENDING), ("status", ASCENDING)], name="request_status"),
+        IndexModel(
+            [("idempotency_key", ASCENDING)], name="idempotency_key_unique", unique=True,
+            partialFilterExpression={"idempotency_key": {"$exists": True}}
+        )
+    ],
+    jobs_collection: [
+        IndexModel([("status", ASCENDING), ("available_at", ASCENDING)], name="status_available"),
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)], name="status_lease"),
+        IndexModel([("data_pdf_id", ASCENDING)], name="data_pdf_id"),
+        IndexModel([("suspension_pdf_id", ASCENDING)], name="suspension_pdf_id")
+    ],
+    job_rows_collection: [
+        IndexModel([("request_id", ASCENDING), ("seq", ASCENDING)], name="request_seq_unique", unique=True)
+    ],
+    sender_stats_collection: [
+        IndexModel([("dimension", ASCENDING), ("value", ASCENDING)], name="dimension_value"),
+        IndexModel([("dimension", ASCENDING), ("user_id", ASCENDING)], name="dimension_user")
+    ],
+    reply_matches_collection: [
+        IndexModel([("request_id", ASCENDING), ("created_at", ASCENDING)], name="request_created"),
+        IndexModel([("reply_file_id", ASCENDING)], name="reply_file_id")
+    ],
+    files_collection: [
+        IndexModel([("request_id", ASCENDING), ("file_type", ASCENDING)], name="request_file_type"),
+        # ไฟล์ระบุด้วย SHA-256 ของเนื้อหา (app/utils/file_store.py) ไฟล์เก่าที่ไม่มี sha256 ไม่ต้องตรวจซ้ำ
+        IndexModel(
+            [("sha256", ASCENDING)], name="sha256_unique", unique=True,
+            partialFilterExpression={"sha256": {"$exists": True}}
+        )
+    ]
+}
+
+# คำค้นที่ router และ worker ใช้จริง ต้องไม่เป็น COLLSCAN และคำค้นที่ระบุการเรียงต้องไม่เรียงในหน่วยความจำ (SORT)
+def query_plans():
+    now = datetime.datetime.now()
+    return [
+        (users_collection, {"email": "someone@example.com"}, None),
+        (sender_names_collection, {"created_by": "user"}, [("created_at", -1), ("_id", -1)]),
+        (sender_names_collection, {"request_id": {"$in": ["r"]}, "status": {"$in": ["pending", "suspension_requested"]}}, None),
+        (sender_names_collection, {"request_id": "r", "sender_name": "s"}, None),
+        (sender_names_collection, {"sender_name": "s", "phone_number": "0"}, None),
+        (sender_names_collection, {}, [("date", -1), ("_id", -1)]),
+        (sender_names_collection, {"date": {"$gte": "2025-01-01", "$lte": "2025-12-31"}}, [("date", -1), ("_id", -1)]),
+        (sender_names_collection, {"mobile_provider": "AIS"}, [("date", -1), ("_id", -1)]),
+        (sender_names_collection, {"mobile_provider": "AIS", "date": {"$gte": "2025-01-01"}}, [("date", -1), ("_id", -1)]),
+        (sender_names_collection, {"status": "available"}, [("date", -1), ("_id", -1)]),
+        (sender_names_collection, {"status": "available", "date": {"$lte": "2025-12-31"}}, [("date", -1), ("_id", -1)]),
+        (sender_names_collection, {"status": "available", "mobile_provider": "AIS", "date": {"$lte": "2025-12-31"}}, [("date", -1), ("_id", -1)]),
+        # ช่วงของชื่อกับการเรียงตามวันที่ใช้ดัชนีเดียวกันไม่ได้ ตรวจเฉพาะว่าไม่ COLLSCAN
+        (sender_names_collection, {"sender_name": {"$regex": "^Sender"}}, None),
+        (notifications_collection, {"user_id": "user"}, [("created_at", -1), ("_id", -1)]),
+        (notifications_collection, {"user_id": "user", "is_read": False}, [("created_at", -1), ("_id", -1)]),
+        (notifications_collection, {"request_id": {"$in": ["r"]}, "status": "received"}, None),
+        # คิวงานที่พร้อมทำมีไม่กี่รายการ การเรียง available_at ในหน่วยความจำจึงไม่เป็นปัญหา
+        (jobs_collection, {"$or": [
+            {"status": "queued", "available_at": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}}
+        ]}, None),
+        (job_rows_collection, {"request_id": "r"}, [("seq", 1)]),
+        (sender_stats_collection, {"dimension": {"$in": ["all", "provider"]}}, None),
+        (sender_stats_collection, {"dimension": "request", "user_id": "user"}, None),
+        (sender_names_collection, {"pdf_sent_data_id": {"$in": [ObjectId()]}}, None),
+        (sender_names_collection, {"pdf_sent_suspension_id": {"$in": [ObjectId()]}}, None),
+        (sender_names_collection, {"reply_file_id": {"$in": [ObjectId()]}}, None),
+        (sender_names_collection, {"error_reply_file_id": {"$in": [ObjectId()]}}, None),
+        (jobs_collection, {"data_pdf_id": {"$in": [ObjectId()]}}, None),
+        (jobs_collection, {"suspension_pdf_id": {"$in": [ObjectId()]}}, None),
+        (reply_matches_collection, {"request_id": "r"}, [("created_at", 1)]),
+        (reply_matches_collection, {"reply_file_id": {"$in": [ObjectId()]}}, None),
+        (files_collection, {"sha256": "0"}, None),
+        (files_collection, {"request_id": "r", "file_type": "sent_data"}, None)
+    ]
+
+def ensure_indexes(drop_extra=False):
+    for collection_fn, models in INDEXES.items():
+        collection = collection_fn()
+        existing = collection.index_information()
+        wanted = {model.document["name"] for model in models}
+        for model in models:
+            name = model.document["name"]
+            try:
+                collection.create_indexes([model])
+            except OperationFailure as e:
+                # มีดัชนีชื่อเดียวกันแต่ key/ตัวเลือกต่างกัน ต้องสร้างใหม่
+                if e.code in (85, 86) and name in existing:
+                    collection.drop_index(name)
+                    collection.create_indexes([model])
+                else:
+                    print(f"❌ Cannot create index {collection.name}.{name}:", e)
+        if drop_extra:
+            for name in existing:
+                if name != "_id_" and name not in wanted:
+                    collection.drop_index(name)
+                    print(f"Dropped index {collection.name}.{name}")
+
+def plan_stages(plan, stage):
+    if isinstance(plan, dict):
+        if plan.get("stage") == stage:
+            return 1
+        return sum(plan_stages(value, stage) for value in plan.values())
+    if isinstance(plan, list):
+        return sum(plan_stages(value, stage) for value in plan)
+    return 0
+
+def check_query_plans():
+    failures = []
+    for collection_fn, query, sort in query_plans():
+        collection = collection_fn()
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        if plan_stages(winning_plan, "COLLSCAN"):
+            failures.append((collection.name, "COLLSCAN", query))
+        elif sort and plan_stages(winning_plan, "SORT"):
+            failures.append((collection.name, "SORT", query))
+    return failures
+
+if __name__ == "__main__":
+    # python -m app.models.indexes [--drop-extra] [--check]
+    parser = argparse.ArgumentParser(description="Reconcile MongoDB indexes")
+    parser.add_argument("--drop-extra", action="store_true", help="drop indexes that are not declared in INDEXES")
+    parser.add_argument("--check", action="store_true", help="fail if any known query uses a collection scan or an in-memory sort")
+    args = parser.parse_args()
+
+    ensure_indexes(drop_extra=args.drop_extra)
+    print("Indexes are up to date")
+    if args.check:
+        if get_settings().app_test_mode:
+            sys.exit("❌ --check needs a real MongoDB server, mongomock cannot explain queries")
+        failures = check_query_plans()
+        for collection_name, stage, query in failures:
+            print(f"❌ {stage} on {collection_name}: {query}")
+        sys.exit(1 if failures else 0)
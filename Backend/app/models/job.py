@@ -0,0 +1,15 @@
+from app.models import database
+from app.models.database import get_mongo_db
+
+def jobs_collection():
+    return get_mongo_db()["request_jobs"]
+
+def async_jobs_collection():
+    return database.async_db["request_jobs"]
+
+# แถวของคำขอเก็บแยกเป็นชุด เอกสารงานจึงไม่เกินขนาด 16 MB ของ MongoDB แม้คำขอจะใหญ่
+def job_rows_collection():
+    return get_mongo_db()["request_job_rows"]
+
+def async_job_rows_collection():
+    return database.async_db["request_job_rows"]
@@ -0,0 +1,4 @@
+from app.models.database import get_mongo_db
+
+def leases_collection():
+    return get_mongo_db()["leases"]
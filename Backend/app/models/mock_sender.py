@@ -1,10 +1,5 @@
-import os
-from dotenv import load_dotenv
-from app.models.database import mongo_db
-
-load_dotenv()
-
-MONGO_MOCK_COLLECTION = os.getenv("MONGO_MOCK_COLLECTION")
+from app.config import get_settings
+from app.models.database import get_mongo_db
 
 def mock_data_collection():
-    return mongo_db[MONGO_MOCK_COLLECTION]
\ No newline at end of file
+    return get_mongo_db()[get_settings().mongo_mock_collection]
\ No newline at end of file
@@ -1,4 +1,8 @@
-from app.models.database import mongo_db
+from app.models import database
+from app.models.database import get_mongo_db
 
 def notifications_collection():
-    return mongo_db["notifications"]
\ No newline at end of file
+    return get_mongo_db()["notifications"]
+
+def async_notifications_collection():
+    return database.async_db["notifications"]
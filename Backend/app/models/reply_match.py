@@ -0,0 +1,9 @@
+from app.models import database
+from app.models.database import get_mongo_db
+
+# ผลเทียบไฟล์ตอบกลับแต่ละฉบับกับผู้ส่งของคำขอ (matched/missing/extra)
+def reply_matches_collection():
+    return get_mongo_db()["reply_matches"]
+
+def async_reply_matches_collection():
+    return database.async_db["reply_matches"]
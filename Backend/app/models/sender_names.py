@@ -1,10 +1,9 @@
-import os
-from dotenv import load_dotenv
-from app.models.database import mongo_db
-
-load_dotenv()
-
-MONGO_SENDER_NAMES_COLLECTION = os.getenv("MONGO_SENDER_NAMES_COLLECTION")
+from app.config import get_settings
+from app.models import database
+from app.models.database import get_mongo_db
 
 def sender_names_collection():
-    return mongo_db[MONGO_SENDER_NAMES_COLLECTION]
\ No newline at end of file
+    return get_mongo_db()[get_settings().mongo_sender_names_collection]
+
+def async_sender_names_collection():
+    return database.async_db[get_settings().mongo_sender_names_collection]
\ No newline at end of file
@@ -0,0 +1,8 @@
+from app.models import database
+from app.models.database import get_mongo_db
+
+def sender_stats_collection():
+    return get_mongo_db()["sender_stats"]
+
+def async_sender_stats_collection():
+    return database.async_db["sender_stats"]
@@ -1,4 +1,8 @@
-from app.models.database import mongo_db
+from app.models import database
+from app.models.database import get_mongo_db
 
 def users_collection():
-    return mongo_db["users"]
\ No newline at end of file
+    return get_mongo_db()["users"]
+
+def async_users_collection():
+    return database.async_db["users"]
@@ -1,64 +1,62 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import Optional
-from app.schemas.request import SenderRequest
-from app.models.sender_names import sender_names_collection
-from app.models.notification import notifications_collection
-from app.utils.pdf import generate_custom_pdf_and_store, generate_suspension_pdf
-from app.external_services.email import send_email
-from app.external_services.notification import create_notification
-from app.dependencies import get_current_user
-from app.models.database import grid_fs
+from fastapi import APIRouter, HTTPException, Query, Depends, Header, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from typing import Optional, List
+from app.schemas.request import SenderRequest, CompleteSuspensionRequest
+from app.models.sender_names import async_sender_names_collection
+from app.models.notification import async_notifications_collection
+from app.models.reply_match import async_reply_matches_collection
+from app.external_services.notification import create_notifications_async, build_notification
+from app.external_services.notification_hub import notification_hub, watch_notification_changes
+from app.workers.request_jobs import enqueue_request_job, get_job, start_request_workers, stop_request_workers
+from app.dependencies import get_current_user, get_stream_user
+from app.config import get_settings
+from app.models import database
+from app.utils.helpers import convert_objectid_to_str
+from app.utils.sender_search import build_sender_query, cached_sender_page, cache_sender_page, invalidate_sender_cache, SENDER_PROJECTION
+from app.utils.status_stats import get_stats, get_request_stats, DIMENSIONS, STATUSES
+from app.utils.pagination import keyset_page, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from app.utils.metrics import span, stats_collector
+from app.utils.file_store import decompress_bytes
+from app.utils.file_stream import grid_file_etag, content_disposition, parse_byte_range, iter_grid_file, media_type_for
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from gridfs.errors import NoFile
+import asyncio
 import datetime
+from collections import deque
+import json
+import tempfile
 import uuid
-import asyncio
 
 router = APIRouter()
+change_stream_task = None
 
-def create_request(data: SenderRequest, current_user: dict):
+async def create_request(data: SenderRequest, current_user: dict):
     request_id = str(uuid.uuid4())
-    thai_date = datetime.datetime.now().strftime("%d %B %Y")
-    data_pdf_id = generate_custom_pdf_and_store(data.rows, data.fields, request_id, thai_date)
-    suspension_pdf_id = generate_suspension_pdf(request_id, thai_date)
-
-    subject = f"ขอข้อมูลและระงับสัญญาณ (Request ID: {request_id})"
-    body = f"เรียนเจ้าหน้าที่\n\nRequest ID: {request_id}\nวันที่: {thai_date}\nกรุณาดำเนินการระงับสัญญาณตามเอกสารแนบและส่งข้อมูลกลับในรูปแบบ Excel/CSV"
-    send_email(subject, body, [data_pdf_id, suspension_pdf_id])
-
-    sender_names = sender_names_collection()
-    for row in data.rows:
-        sender_names.update_one(
-            {"sender_name": row["sender_name"], "phone_number": row["phone_number"]},
-            {
-                "$set": {
-                    "request_id": request_id,
-                    "thai_date": thai_date,
-                    "fields": data.fields,
-                    "pdf_sent_data_id": data_pdf_id,
-                    "pdf_sent_suspension_id": suspension_pdf_id,
-                    "created_by": current_user["id"],
-                    "created_at": datetime.datetime.now(),
-                    "updated_at": datetime.datetime.now()
-                },
-                "$addToSet": {
-                    "status": {"$each": ["pending", "suspension_requested"]}
-                },
-                "$setOnInsert": {
-                    "mobile_provider": row.get("mobile_provider"),
-                    "full_name": row.get("full_name"),
-                    "date": row.get("date")
-                }
-            },
-            upsert=True
-        )
-        create_notification(request_id, row["sender_name"], "pending", current_user["id"], thai_date)
-        create_notification(request_id, row["sender_name"], "suspension_requested", current_user["id"], thai_date)
+    await enqueue_request_job(request_id, data.fields, data.rows, current_user["id"])
+    return {"message": "รับคำขอเรียบร้อย กำลังดำเนินการ", "request_id": request_id, "status": "queued"}
+
+async def get_request_job(request_id: str, current_user: dict):
+    job = await get_job(request_id, current_user["id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="ไม่พบคำขอ")
+    job.pop("_id")
+    job.pop("worker_id", None)
+    return convert_objectid_to_str(job)
 
-    return {"message": "ส่งคำขอเรียบร้อย", "request_id": request_id}
+async def get_reply_matches(request_id: str, current_user: dict):
+    # ผลเทียบไฟล์ตอบกลับทุกฉบับของคำขอตามลำดับที่ได้รับ
+    if not await get_job(request_id, current_user["id"]):
+        raise HTTPException(status_code=404, detail="ไม่พบคำขอ")
+    docs = await async_reply_matches_collection().find(
+        {"request_id": request_id}, {"_id": 0}
+    ).sort("created_at", 1).to_list(length=None)
+    return convert_objectid_to_str(docs)
 
-def mark_notification_read(notification_id: str, current_user: dict):
-    notifications = notifications_collection()
-    result = notifications.update_one(
+async def mark_notification_read(notification_id: str, current_user: dict):
+    notifications = async_notifications_collection()
+    result = await notifications.update_one(
         {"_id": ObjectId(notification_id), "user_id": current_user["id"]},
         {"$set": {"is_read": True, "updated_at": datetime.datetime.now()}}
     )
@@ -68,32 +66,61 @@ def mark_notification_read(notification_id: str, current_user: dict):
         return {"message": "Notification already marked as read"}
     return {"message": "Marked as read"}
 
-def complete_suspension(request_id: str, sender_name: str):
-    sender_names = sender_names_collection()
-    doc = sender_names.find_one({"request_id": request_id, "sender_name": sender_name})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Sender not found for this request")
-    result = sender_names.update_one(
-        {"request_id": request_id, "sender_name": sender_name},
-        {
-            "$addToSet": {"status": "suspended"},
-            "$set": {
-                "updated_at": datetime.datetime.now(),
-                "suspended_at": datetime.datetime.now()
+async def complete_suspensions(request_id: str, current_user: dict, sender_names: list = None, reply_file_id: str = None):
+    # ตรวจว่าเป็นคำขอของผู้เรียกก่อนแก้สถานะหรือส่งการแจ้งเตือนใด ๆ
+    if not await get_job(request_id, current_user["id"]):
+        raise HTTPException(status_code=404, detail="ไม่พบคำขอ")
+    senders = async_sender_names_collection()
+    query = {"request_id": request_id}
+    if sender_names is not None:
+        query["sender_name"] = {"$in": sender_names}
+    else:
+        try:
+            query["reply_file_id"] = ObjectId(reply_file_id)
+        except (InvalidId, TypeError):
+            raise HTTPException(status_code=400, detail="reply_file_id ไม่ถูกต้อง")
+    docs = await senders.find(
+        query, {"sender_name": 1, "status": 1, "created_by": 1, "thai_date": 1, "mobile_provider": 1}
+    ).to_list(length=None)
+
+    found = {doc["sender_name"]: doc for doc in docs}
+    to_suspend = [doc for doc in docs if "suspended" not in doc.get("status", [])]
+    if to_suspend:
+        now = datetime.datetime.now()
+        await senders.update_many(
+            {"request_id": request_id, "sender_name": {"$in": [doc["sender_name"] for doc in to_suspend]}},
+            {
+                "$addToSet": {"status": "suspended"},
+                "$set": {"updated_at": now, "suspended_at": now}
             }
-        }
-    )
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Sender not found")
-    if result.modified_count == 0:
+        )
+        invalidate_sender_cache()
+        await create_notifications_async([
+            build_notification(request_id, doc["sender_name"], "suspended", doc["created_by"], doc["thai_date"], doc.get("mobile_provider"))
+            for doc in to_suspend
+        ])
+
+    suspended = {doc["sender_name"] for doc in to_suspend}
+    names = sender_names if sender_names is not None else list(found)
+    return {
+        "request_id": request_id,
+        "suspended": len(suspended),
+        "results": [{
+            "sender_name": name,
+            "result": "suspended" if name in suspended else "already_suspended" if name in found else "not_found"
+        } for name in names]
+    }
+
+async def complete_suspension(request_id: str, sender_name: str, current_user: dict):
+    result = (await complete_suspensions(request_id, current_user, [sender_name]))["results"][0]["result"]
+    if result == "not_found":
+        raise HTTPException(status_code=404, detail="Sender not found for this request")
+    if result == "already_suspended":
         return {"message": "Sender already marked as suspended"}
-    create_notification(request_id, sender_name, "suspended", doc["created_by"], doc["thai_date"])
     return {"message": "Suspension completed for sender"}
 
-def get_notifications(current_user: dict):
-    notifications = notifications_collection()
-    notifications_data = notifications.find({"user_id": current_user["id"]}).sort("created_at", -1)
-    return [{
+def serialize_notification(doc):
+    return {
         "notification_id": str(doc["_id"]),
         "request_id": doc["request_id"],
         "sender_name": doc.get("sender_name", ""),
@@ -101,12 +128,88 @@ def get_notifications(current_user: dict):
         "thai_date": doc["thai_date"],
         "is_read": doc["is_read"],
         "created_at": doc["created_at"]
-    } for doc in notifications_data]
+    }
+
+def notification_event(doc):
+    data = json.dumps(jsonable_encoder(serialize_notification(doc)), ensure_ascii=False)
+    return f"id: {doc['_id']}\nevent: notification\ndata: {data}\n\n"
+
+async def stream_notifications(current_user: dict, last_event_id: str = None):
+    settings = get_settings()
+    user_id = current_user["id"]
+    # subscribe ก่อนอ่านย้อนหลัง เพื่อไม่ให้พลาดการแจ้งเตือนที่เกิดระหว่างนั้น
+    queue = notification_hub.subscribe(user_id)
+    try:
+        yield "retry: 3000\n\n"
+        last_id = None
+        if last_event_id:
+            try:
+                last_id = ObjectId(last_event_id)
+            except InvalidId:
+                last_id = None
+        # ObjectId จากหลาย process ไม่เรียงกันแน่นอน จึงกันส่งซ้ำด้วยชุด _id ที่ส่งไปล่าสุดแทนการเทียบค่า
+        # เอกสารที่อยู่ทั้งในผลย้อนหลังและในคิวมีไม่เกินขนาดคิว เพราะคิวเต็มแล้วการเชื่อมต่อจะถูกปิด
+        page_size = settings.notification_stream_queue_size
+        recent = deque(maxlen=2 * page_size)
+        recent_ids = set()
+
+        def remember(doc_id):
+            if len(recent) == recent.maxlen:
+                recent_ids.discard(recent[0])
+            recent.append(doc_id)
+            recent_ids.add(doc_id)
 
-def get_requests(current_user: dict):
-    sender_names = sender_names_collection()
-    requests = sender_names.find({"created_by": current_user["id"]}).sort("created_at", -1)
-    return convert_objectid_to_str([{
+        # อ่านย้อนหลังทีละหน้าจนทัน ไม่หยุดที่หน้าแรก
+        while last_id:
+            missed = await async_notifications_collection().find(
+                {"user_id": user_id, "_id": {"$gt": last_id}}
+            ).sort("_id", 1).to_list(length=page_size)
+            for doc in missed:
+                last_id = doc["_id"]
+                remember(doc["_id"])
+                yield notification_event(doc)
+            if len(missed) < page_size:
+                break
+        while True:
+            try:
+                doc = await asyncio.wait_for(queue.get(), timeout=settings.notification_stream_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if doc is None:
+                return
+            if doc["_id"] in recent_ids:
+                continue
+            remember(doc["_id"])
+            yield notification_event(doc)
+    finally:
+        notification_hub.unsubscribe(user_id, queue)
+
+async def get_notifications(current_user: dict, limit: int = DEFAULT_PAGE_LIMIT, cursor: str = None, unread_only: bool = False):
+    query = {"user_id": current_user["id"]}
+    if unread_only:
+        query["is_read"] = False
+    docs, next_cursor = await keyset_page(
+        async_notifications_collection(), query,
+        {"request_id": 1, "sender_name": 1, "status": 1, "thai_date": 1, "is_read": 1},
+        limit, cursor
+    )
+    return [serialize_notification(doc) for doc in docs], next_cursor
+
+async def count_unread_notifications(current_user: dict):
+    notifications = async_notifications_collection()
+    return {"unread": await notifications.count_documents({"user_id": current_user["id"], "is_read": False})}
+
+async def get_requests(current_user: dict, limit: int = DEFAULT_PAGE_LIMIT, cursor: str = None):
+    docs, next_cursor = await keyset_page(
+        async_sender_names_collection(), {"created_by": current_user["id"]},
+        {
+            "request_id": 1, "sender_name": 1, "thai_date": 1, "status": 1,
+            "reply_file_id": 1, "pdf_sent_data_id": 1, "pdf_sent_suspension_id": 1
+        },
+        limit, cursor
+    )
+    return [{
         "request_id": doc["request_id"],
         "sender_name": doc["sender_name"],
         "thai_date": doc["thai_date"],
@@ -115,88 +218,278 @@ def get_requests(current_user: dict):
         "pdf_sent_data_id": str(doc.get("pdf_sent_data_id", "")),
         "pdf_sent_suspension_id": str(doc.get("pdf_sent_suspension_id", "")),
         "created_at": doc["created_at"]
-    } for doc in requests])
+    } for doc in docs], next_cursor
 
-from app.utils.helpers import convert_objectid_to_str
+async def get_available_senders(
+    start: str = None, end: str = None, provider: str = None, status: str = None,
+    name_prefix: str = None, limit: int = DEFAULT_PAGE_LIMIT, cursor: str = None
+):
+    query = build_sender_query(start, end, provider, status, name_prefix)
+    key = (start, end, provider, status, name_prefix, limit, cursor)
+    page = cached_sender_page(key)
+    if page is None:
+        # แบ่งหน้าตาม (date, _id) ซึ่งอยู่ท้ายดัชนี date, status_date และ provider_date จึงไม่ต้องเรียงในหน่วยความจำ
+        docs, next_cursor = await keyset_page(async_sender_names_collection(), query, SENDER_PROJECTION, limit, cursor, sort_key="date")
+        # _id ใช้ทำ cursor เท่านั้น ไม่ส่งกลับเหมือนเดิม
+        page = ([{key: value for key, value in doc.items() if key != "_id"} for doc in docs], next_cursor)
+        cache_sender_page(key, page)
+    return page
 
-def get_available_senders(start: str = None, end: str = None):
-    sender_names = sender_names_collection()
-    today = datetime.date.today()
-    query = {}
-    if start:
-        try:
-            start_date = datetime.datetime.strptime(start, "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="รูปแบบวันที่ไม่ถูกต้อง ควรใช้ YYYY-MM-DD")
-    if end:
-        try:
-            end_date = datetime.datetime.strptime(end, "%Y-%m-%d").date()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="รูปแบบวันที่ไม่ถูกต้อง ควรใช้ YYYY-MM-DD")
-    if start and end:
-        if start_date > end_date:
-            raise HTTPException(status_code=400, detail="วันที่เริ่มต้นต้องน้อยกว่าหรือเท่ากับวันที่สิ้นสุด")
-        if end_date > today:
-            raise HTTPException(status_code=400, detail="วันที่สิ้นสุดต้องไม่มากกว่าวันปัจจุบัน")
-        query["date"] = {"$gte": start, "$lte": end}
-    elif start:
-        query["date"] = {"$gte": start}
-    elif end:
-        if end_date > today:
-            raise HTTPException(status_code=400, detail="วันที่สิ้นสุดต้องไม่มากกว่าวันปัจจุบัน")
-        query["date"] = {"$lte": end}
-    
-    results = list(sender_names.find(query, {"_id": 0}))
-    return convert_objectid_to_str(results)
-
-@router.post("/request")
-def create_request_endpoint(data: SenderRequest, current_user: dict = Depends(get_current_user)):
-    return create_request(data, current_user)
+async def export_available_senders(query):
+    cursor = async_sender_names_collection().find(query, {**SENDER_PROJECTION, "_id": 0}).sort("date", 1).batch_size(1000)
+    async for doc in cursor:
+        yield json.dumps(jsonable_encoder(doc), ensure_ascii=False) + "\n"
+
+@router.post("/request", status_code=202)
+async def create_request_endpoint(data: SenderRequest, current_user: dict = Depends(get_current_user)):
+    return await create_request(data, current_user)
+
+@router.get("/request/{request_id}/job")
+async def get_request_job_endpoint(request_id: str, current_user: dict = Depends(get_current_user)):
+    return await get_request_job(request_id, current_user)
+
+@router.get("/request/{request_id}/replies")
+async def get_reply_matches_endpoint(request_id: str, current_user: dict = Depends(get_current_user)):
+    return await get_reply_matches(request_id, current_user)
 
 @router.post("/notification/mark-read/{notification_id}")
-def mark_notification_read_endpoint(notification_id: str, current_user: dict = Depends(get_current_user)):
-    return mark_notification_read(notification_id, current_user)
+async def mark_notification_read_endpoint(notification_id: str, current_user: dict = Depends(get_current_user)):
+    return await mark_notification_read(notification_id, current_user)
+
+@router.post("/request/complete-suspension/{request_id}")
+async def complete_suspensions_endpoint(
+    request_id: str,
+    data: CompleteSuspensionRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    if (data.sender_names is None) == (data.reply_file_id is None):
+        raise HTTPException(status_code=400, detail="ต้องระบุ sender_names หรือ reply_file_id อย่างใดอย่างหนึ่ง")
+    return await complete_suspensions(request_id, current_user, data.sender_names, data.reply_file_id)
 
 @router.post("/request/complete-suspension/{request_id}/{sender_name}")
-def complete_suspension_endpoint(request_id: str, sender_name: str):
-    return complete_suspension(request_id, sender_name)
+async def complete_suspension_endpoint(request_id: str, sender_name: str, current_user: dict = Depends(get_current_user)):
+    return await complete_suspension(request_id, sender_name, current_user)
 
 @router.get("/notifications")
-def get_notifications_endpoint(current_user: dict = Depends(get_current_user)):
-    return get_notifications(current_user)
+async def get_notifications_endpoint(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(None),
+    unread_only: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    # body ยังเป็น list เหมือนเดิม หน้าถัดไปส่งกลับทาง header X-Next-Cursor
+    notifications, next_cursor = await get_notifications(current_user, limit, cursor, unread_only)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return notifications
+
+@router.get("/notifications/stream")
+async def stream_notifications_endpoint(
+    last_event_id: Optional[str] = Header(None),
+    last_event_id_query: Optional[str] = Query(None, alias="last_event_id"),
+    current_user: dict = Depends(get_stream_user)
+):
+    # เบราว์เซอร์ส่ง Last-Event-ID เองเฉพาะตอนเชื่อมต่อใหม่อัตโนมัติ EventSource ที่สร้างใหม่จึงส่งทาง query string แทน
+    return StreamingResponse(
+        stream_notifications(current_user, last_event_id or last_event_id_query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/notifications/unread-count")
+async def count_unread_notifications_endpoint(current_user: dict = Depends(get_current_user)):
+    return await count_unread_notifications(current_user)
 
 @router.get("/requests")
-def get_requests_endpoint(current_user: dict = Depends(get_current_user)):
-    return get_requests(current_user)
+async def get_requests_endpoint(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(None),
+    current_user: dict = Depends(get_current_user)
+):
+    requests, next_cursor = await get_requests(current_user, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return requests
 
 @router.get("/file/{file_id}")
-def download_file(file_id: str, current_user: dict = Depends(get_current_user)):
-    from bson.objectid import ObjectId
-    from fastapi.responses import FileResponse
+async def download_file(
+    file_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     try:
-        file_obj = grid_fs.get(ObjectId(file_id))
-        temp_path = f"/tmp/{file_obj.filename}"
-        with open(temp_path, 'wb') as f:
-            f.write(file_obj.read())
-        media_type = 'application/pdf' if file_obj.filename.endswith('.pdf') else \
-                     'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' if file_obj.filename.endswith('.xlsx') else 'text/csv'
-        return FileResponse(temp_path, media_type=media_type, filename=file_obj.filename)
-    except:
+        with span("gridfs.open"):
+            file_obj = await database.async_grid_fs.open_download_stream(ObjectId(file_id))
+    except (InvalidId, NoFile):
         raise HTTPException(status_code=404, detail="ไม่พบไฟล์")
 
+    etag = grid_file_etag(file_obj)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": content_disposition(file_obj.filename)
+    }
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # ไฟล์ตอบกลับที่บีบอัดไว้มีขนาดเล็ก คลายทั้งไฟล์ก่อนตัดช่วงที่ขอ
+    compression = getattr(file_obj, "compression", None)
+    content = decompress_bytes(await file_obj.read(), compression) if compression else None
+    length = file_obj.length if content is None else len(content)
+
+    start, end = 0, length - 1
+    status_code = 200
+    if range_header and length:
+        byte_range = parse_byte_range(range_header, length)
+        if byte_range is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{length}"})
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    media_type = media_type_for(file_obj.filename)
+    if content is not None:
+        return Response(content[start:end + 1], status_code=status_code, media_type=media_type, headers=headers)
+    return StreamingResponse(
+        iter_grid_file(file_obj, start, end - start + 1),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
+
 @router.get("/available-senders")
-def get_available_senders_endpoint(start: Optional[str] = Query(None), end: Optional[str] = Query(None)):
-    return get_available_senders(start, end)
+async def get_available_senders_endpoint(
+    response: Response,
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    provider: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    name_prefix: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(None),
+    current_user: dict = Depends(get_current_user)
+):
+    senders, next_cursor = await get_available_senders(start, end, provider, status, name_prefix, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return senders
 
-@router.on_event("startup")
-async def start_check_replies_loop():
-    from app.external_services.email import check_inbox_and_save_reply
-    async def loop_check():
-        while True:
-            try:
-                check_inbox_and_save_reply()
-                print("✅ Checked inbox for replies")
-            except Exception as e:
-                print("❌ Error in check-inbox loop:", e)
-            await asyncio.sleep(10)
-    asyncio.create_task(loop_check())
\ No newline at end of file
+@router.get("/available-senders/export")
+async def export_available_senders_endpoint(
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    provider: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    name_prefix: Optional[str] = Query(None),
+    current_user: dict = Depends(get_current_user)
+):
+    query = build_sender_query(start, end, provider, status, name_prefix)
+    return StreamingResponse(
+        export_available_senders(query),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": content_disposition("senders.ndjson")}
+    )
+
+@router.post("/senders/import")
+async def import_senders_endpoint(
+    request: Request,
+    filename: str = Query(..., description="ชื่อไฟล์ .csv หรือ .xlsx"),
+    current_user: dict = Depends(get_current_user)
+):
+    from app.utils.sender_import import import_senders
+    if not filename.lower().endswith((".csv", ".xlsx")):
+        raise HTTPException(status_code=400, detail="รองรับเฉพาะไฟล์ .csv และ .xlsx")
+    # รับไฟล์เป็น body ตรง ๆ และเขียนลงไฟล์ชั่วคราวทีละส่วน ไฟล์ใหญ่จึงไม่ค้างในหน่วยความจำ
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        try:
+            return await asyncio.to_thread(import_senders, upload, filename)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats")
+async def get_stats_endpoint(
+    dimension: Optional[List[str]] = Query(None),
+    days: int = Query(30, ge=1, le=366),
+    current_user: dict = Depends(get_current_user)
+):
+    dimensions = dimension or DIMENSIONS
+    if any(name not in DIMENSIONS for name in dimensions):
+        raise HTTPException(status_code=400, detail=f"dimension ต้องเป็นหนึ่งใน {', '.join(DIMENSIONS)}")
+    day_from = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+    return await get_stats(dimensions, current_user["id"], day_from)
+
+@router.get("/stats/request/{request_id}")
+async def get_request_stats_endpoint(request_id: str, current_user: dict = Depends(get_current_user)):
+    stats = await get_request_stats(request_id, current_user["id"])
+    if stats is not None:
+        return stats
+    # คำขอที่ยังไม่มีผู้ส่งได้สถานะใดจะยังไม่มีสถิติ
+    if not await get_job(request_id, current_user["id"]):
+        raise HTTPException(status_code=404, detail="ไม่พบคำขอ")
+    return {status: 0 for status in STATUSES}
+
+@router.get("/inbox/status")
+async def get_inbox_status_endpoint(current_user: dict = Depends(get_current_user)):
+    from app.workers.reply_ingestion import ingestion_status
+    return ingestion_status()
+
+@router.get("/email/status")
+async def get_email_status_endpoint(current_user: dict = Depends(get_current_user)):
+    from app.external_services.email import email_status
+    return email_status()
+
+@router.get("/pdf/status")
+async def get_pdf_status_endpoint(current_user: dict = Depends(get_current_user)):
+    from app.utils.pdf_renderer import renderer_status
+    return renderer_status()
+
+@router.get("/files/status")
+async def get_file_store_status_endpoint(current_user: dict = Depends(get_current_user)):
+    from app.utils.file_store import file_store_status
+    return file_store_status()
+
+async def start_background_workers():
+    from app.workers.scheduler import start_scheduler
+    from app.utils.pdf_renderer import start_renderer
+    from app.utils.credentials import start_credential_workers, credential_stats
+    from app.utils.pdf_renderer import render_stats
+    from app.utils.file_store import file_store_stats
+    from app.external_services.email import get_smtp_pool
+    from app.workers.reply_ingestion import ingestion_status
+    from app.models.indexes import ensure_indexes
+    global change_stream_task
+    ensure_indexes()
+    notification_hub.attach(asyncio.get_running_loop())
+    stats_collector.register("pdf_render", lambda: render_stats)
+    stats_collector.register("credentials", lambda: credential_stats)
+    stats_collector.register("smtp", lambda: get_smtp_pool().stats)
+    stats_collector.register("notification_hub", lambda: notification_hub.stats)
+    stats_collector.register("reply_ingestion", ingestion_status)
+    stats_collector.register("file_store", lambda: file_store_stats)
+    if get_settings().notification_change_stream:
+        change_stream_task = asyncio.create_task(watch_notification_changes(async_notifications_collection()))
+    start_renderer()
+    start_credential_workers()
+    start_scheduler()
+    start_request_workers()
+
+async def stop_background_workers():
+    from app.external_services.email import close_smtp_pool
+    from app.utils.pdf_renderer import shutdown_renderer
+    from app.utils.credentials import shutdown_credential_workers
+    from app.workers.scheduler import shutdown_scheduler
+    notification_hub.detach()
+    if change_stream_task:
+        change_stream_task.cancel()
+    await stop_request_workers()
+    shutdown_scheduler()
+    close_smtp_pool()
+    shutdown_renderer()
+    shutdown_credential_workers()
@@ -1,18 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from app.schemas.user import UserCreate, UserLogin
 from app.utils.authentication import create_access_token
 from app.dependencies import get_current_user
-from app.models.user import users_collection
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.models.user import async_users_collection
+from app.utils.credentials import hash_password, verify_password, credential_status
+from app.utils.rate_limit import check_rate_limit, login_limiter
+from pymongo.errors import DuplicateKeyError
 import datetime
 
 router = APIRouter()
 
-def create_user(data: UserCreate):
-    users = users_collection()
-    if users.find_one({"email": data.email}):
-        raise HTTPException(status_code=400, detail="อีเมลนี้มีผู้ใช้งานแล้ว")
-    hashed_password = generate_password_hash(data.password)
+async def create_user(data: UserCreate):
+    hashed_password = await hash_password(data.password)
     user_data = {
         "name": data.name,
         "email": data.email,
@@ -20,33 +19,51 @@ def create_user(data: UserCreate):
         "role": data.role,
         "created_at": datetime.datetime.utcnow()
     }
-    result = users.insert_one(user_data)
-    user = users.find_one({"_id": result.inserted_id})
-    return user
+    # ดัชนี email_unique กันอีเมลซ้ำ จึงไม่ต้องค้นหาก่อนและไม่ต้องอ่านกลับหลัง insert
+    try:
+        await async_users_collection().insert_one(user_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="อีเมลนี้มีผู้ใช้งานแล้ว")
+    return user_data
 
-def authenticate_user(data: UserLogin):
-    users = users_collection()
-    user = users.find_one({"email": data.email})
-    if not user or not check_password_hash(user["password"], data.password):
+async def authenticate_user(data: UserLogin, client_ip: str):
+    email_key = data.email.strip().lower()
+    check_rate_limit(login_limiter("ip"), client_ip)
+    check_rate_limit(login_limiter("email"), email_key)
+    users = async_users_collection()
+    user = await users.find_one({"email": data.email})
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await verify_password(user["password"], data.password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # อัปเกรด hash เป็น method ปัจจุบันตอนที่มีรหัสผ่านจริงอยู่ในมือ
+        await users.update_one({"_id": user["_id"], "password": user["password"]}, {"$set": {"password": new_hash}})
+    login_limiter("email").reset(email_key)
     return user
 
 @router.post("/user/register")
-def register_user(data: UserCreate):
-    user = create_user(data)
+async def register_user(data: UserCreate, request: Request):
+    check_rate_limit(login_limiter("ip"), request.client.host if request.client else "")
+    user = await create_user(data)
     token = create_access_token(user)
     return {"id": str(user["_id"]), "name": user["name"], "email": user["email"], "role": user["role"], "token": token}
 
 @router.post("/user/login")
-def login_user(data: UserLogin):
-    user = authenticate_user(data)
+async def login_user(data: UserLogin, request: Request):
+    user = await authenticate_user(data, request.client.host if request.client else "")
     token = create_access_token(user)
     return {"id": str(user["_id"]), "name": user["name"], "email": user["email"], "role": user["role"], "token": token}
 
 @router.get("/user/logout")
-def logout():
+async def logout():
     return {"message": "Logged out (frontend should clear token)"}
 
 @router.get("/user/me")
-def get_me(current_user: dict = Depends(get_current_user)):
-    return {"id": current_user["id"], "name": current_user["name"], "email": current_user["email"], "role": current_user.get("role")}
\ No newline at end of file
+async def get_me(current_user: dict = Depends(get_current_user)):
+    return {"id": current_user["id"], "name": current_user["name"], "email": current_user["email"], "role": current_user.get("role")}
+
+@router.get("/user/credentials/status")
+async def get_credentials_status(current_user: dict = Depends(get_current_user)):
+    return credential_status()
\ No newline at end of file
@@ -1,6 +1,10 @@
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class SenderRequest(BaseModel):
     fields: List[str]
-    rows: List[Dict]
\ No newline at end of file
+    rows: List[Dict]
+
+class CompleteSuspensionRequest(BaseModel):
+    sender_names: Optional[List[str]] = None
+    reply_file_id: Optional[str] = None
@@ -1,27 +1,22 @@
 import jwt
 import datetime
 from fastapi import HTTPException
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-JWT_SECRET = os.getenv("JWT_SECRET", "devsecret")
-JWT_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES", 1440))
+from app.config import get_settings
 
 def create_access_token(user: dict):
+    settings = get_settings()
     payload = {
         "sub": str(user["_id"]),
         "email": user["email"],
         "name": user.get("name"),
         "role": user.get("role"),
-        "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=JWT_EXPIRE_MINUTES)
+        "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=settings.jwt_expire_minutes)
     }
-    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+    return jwt.encode(payload, settings.jwt_secret, algorithm="HS256")
 
 def decode_token(token: str):
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        return jwt.decode(token, get_settings().jwt_secret, algorithms=["HS256"])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -0,0 +1,76 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from app.config import get_settings
+
+credential_stats = {"pending": 0, "hashed": 0, "verified": 0, "rehashed": 0, "rejected_busy": 0}
+_executor = None
+
+def needs_rehash(password_hash, method):
+    # hash ที่ method ไม่ตรงกับ PASSWORD_HASH_METHOD จะถูก hash ใหม่อัตโนมัติเมื่อผู้ใช้ login สำเร็จ
+    return password_hash.split("$", 1)[0] != method
+
+# werkzeug ใช้เฉพาะใน process ของ worker จึง import ภายในฟังก์ชัน
+def _hash(password, method):
+    from werkzeug.security import generate_password_hash
+    return generate_password_hash(password, method)
+
+def _verify(password_hash, password, method):
+    # ตรวจและ hash ใหม่ในงานเดียวกัน ไม่ต้องส่งงานเข้า pool สองรอบ
+    from werkzeug.security import generate_password_hash, check_password_hash
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if needs_rehash(password_hash, method):
+        return True, generate_password_hash(password, method)
+    return True, None
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # spawn แทน fork เหมือน pdf_renderer เพราะ process หลักมี thread อื่นทำงานอยู่
+        _executor = ProcessPoolExecutor(
+            max_workers=get_settings().password_hash_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def start_credential_workers():
+    executor = get_executor()
+    for _ in range(get_settings().password_hash_workers):
+        executor.submit(os.getpid)
+
+async def _run(func, *args):
+    # จำกัดงานที่รอคิว ไม่ให้ login จำนวนมากค้างอยู่ใน pool จนทุกคำขอช้า
+    if credential_stats["pending"] >= get_settings().password_hash_max_pending:
+        credential_stats["rejected_busy"] += 1
+        raise HTTPException(status_code=503, detail="ระบบกำลังทำงานหนัก กรุณาลองใหม่อีกครั้ง", headers={"Retry-After": "1"})
+    credential_stats["pending"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), func, *args)
+    finally:
+        credential_stats["pending"] -= 1
+
+async def hash_password(password):
+    password_hash = await _run(_hash, password, get_settings().password_hash_method)
+    credential_stats["hashed"] += 1
+    return password_hash
+
+async def verify_password(password_hash, password):
+    # คืน (ถูกต้องหรือไม่, hash ใหม่ถ้าต้องอัปเกรด)
+    valid, new_hash = await _run(_verify, password_hash, password, get_settings().password_hash_method)
+    credential_stats["verified"] += 1
+    if new_hash:
+        credential_stats["rehashed"] += 1
+    return valid, new_hash
+
+def credential_status():
+    settings = get_settings()
+    return {**credential_stats, "method": settings.password_hash_method, "workers": settings.password_hash_workers}
+
+def shutdown_credential_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
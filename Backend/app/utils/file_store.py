@@ -0,0 +1,211 @@
+import argparse
+import datetime
+import hashlib
+import time
+from bson.objectid import ObjectId
+from gridfs.errors import FileExists
+from pymongo import UpdateOne
+from app.config import get_settings
+from app.models.database import get_grid_fs
+from app.models.files import files_collection, chunks_collection
+from app.models.sender_names import sender_names_collection
+from app.models.job import jobs_collection
+from app.models.reply_match import reply_matches_collection
+from app.utils.metrics import timed
+
+# ไฟล์ใน GridFS ระบุด้วย SHA-256 ของเนื้อหา (ดัชนี sha256_unique) เนื้อหาเดียวกันเก็บเพียงครั้งเดียว
+# ไฟล์ที่ไม่มีแถวใดใน sender_names, reply_matches หรืองานใด (รวมงานที่เสร็จแล้ว) อ้างถึงจะถูกลบโดย run_retention
+GRIDFS_WRITE_CHUNK = 255 * 1024
+SENDER_REFERENCE_FIELDS = ("pdf_sent_data_id", "pdf_sent_suspension_id", "reply_file_id", "error_reply_file_id")
+JOB_REFERENCE_FIELDS = ("data_pdf_id", "suspension_pdf_id")
+# /api/request/{id}/replies เปิดไฟล์ตอบกลับทุกฉบับ แม้ฉบับหลังจะเขียนทับ reply_file_id ในแถวผู้ส่งไปแล้ว
+REPLY_MATCH_REFERENCE_FIELDS = ("reply_file_id",)
+
+file_store_stats = {
+    "stored_files": 0, "stored_bytes": 0,
+    "deduplicated_files": 0, "deduplicated_bytes": 0,
+    "compression_saved_bytes": 0,
+    "retention_runs": 0, "deleted_files": 0, "reclaimed_bytes": 0
+}
+last_retention = {}
+
+def compress_bytes(data):
+    settings = get_settings()
+    if settings.reply_compression != "zstd":
+        raise ValueError(f"REPLY_COMPRESSION ไม่รองรับ {settings.reply_compression!r}")
+    import zstandard
+    return zstandard.ZstdCompressor(level=settings.reply_compression_level).compress(data)
+
+def decompress_bytes(data, compression):
+    if not compression:
+        return data
+    if compression != "zstd":
+        raise ValueError(f"ไม่รู้จักการบีบอัดแบบ {compression!r}")
+    import zstandard
+    return zstandard.ZstdDecompressor().decompress(data)
+
+@timed("gridfs.put")
+def store_file(data, filename, file_type, request_id=None, compress=False):
+    # คืน _id ของไฟล์ที่มีเนื้อหาเดียวกันถ้ามีอยู่แล้ว และเลื่อน stored_at เพื่อไม่ให้ถูกลบระหว่างนี้
+    view = memoryview(data)
+    sha256 = hashlib.sha256(view).hexdigest()
+    now = datetime.datetime.now()
+    existing = files_collection().find_one_and_update({"sha256": sha256}, {"$max": {"stored_at": now}}, {"_id": 1})
+    if existing:
+        file_store_stats["deduplicated_files"] += 1
+        file_store_stats["deduplicated_bytes"] += len(view)
+        return existing["_id"]
+
+    payload, compression = view, None
+    if compress and get_settings().reply_compression:
+        compressed = compress_bytes(view)
+        if len(compressed) < len(view):
+            payload, compression = memoryview(compressed), get_settings().reply_compression
+
+    file_id = ObjectId()
+    try:
+        # เขียนทีละ chunk จาก buffer เดิม ไม่คัดลอกทั้งไฟล์ซ้ำเข้า BytesIO
+        with get_grid_fs().new_file(
+            _id=file_id, filename=filename, request_id=request_id, file_type=file_type,
+            sha256=sha256, compression=compression, raw_length=len(view), stored_at=now
+        ) as grid_in:
+            for offset in range(0, len(payload), GRIDFS_WRITE_CHUNK):
+                grid_in.write(bytes(payload[offset:offset + GRIDFS_WRITE_CHUNK]))
+    except FileExists:
+        # อีก process เก็บเนื้อหาเดียวกันไปก่อน chunk ที่เราเขียนไว้จึงไม่มีใครอ้างถึง
+        chunks_collection().delete_many({"files_id": file_id})
+        return files_collection().find_one({"sha256": sha256}, {"_id": 1})["_id"]
+
+    file_store_stats["stored_files"] += 1
+    file_store_stats["stored_bytes"] += len(payload)
+    file_store_stats["compression_saved_bytes"] += len(view) - len(payload)
+    return file_id
+
+def read_file(file_id):
+    grid_out = get_grid_fs().get(file_id)
+    return grid_out.filename, decompress_bytes(grid_out.read(), getattr(grid_out, "compression", None))
+
+def job_files(file_ids):
+    # งานที่เสร็จแล้วยังเปิดไฟล์ให้ดาวน์โหลดผ่าน /api/request/{id}/job จึงนับเป็นการอ้างถึงเช่นกัน
+    in_use = set()
+    for job in jobs_collection().find(
+        {"$or": [{field: {"$in": file_ids}} for field in JOB_REFERENCE_FIELDS]},
+        dict.fromkeys(JOB_REFERENCE_FIELDS, 1)
+    ):
+        in_use.update(job.get(field) for field in JOB_REFERENCE_FIELDS)
+    return in_use
+
+def reference_fields():
+    return ((sender_names_collection(), SENDER_REFERENCE_FIELDS), (reply_matches_collection(), REPLY_MATCH_REFERENCE_FIELDS))
+
+def count_references(file_ids):
+    counts = dict.fromkeys(file_ids, 0)
+    for collection, fields in reference_fields():
+        for field in fields:
+            for row in collection.aggregate([
+                {"$match": {field: {"$in": file_ids}}},
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}
+            ]):
+                counts[row["_id"]] += row["count"]
+    return counts
+
+def delete_files(docs, stored_before):
+    ids = [doc["_id"] for doc in docs]
+    files = files_collection()
+    # ไฟล์ที่ถูก store_file เก็บซ้ำหลังเริ่มรอบนี้ (stored_at ใหม่กว่า) จะไม่ถูกลบ
+    files.delete_many({"_id": {"$in": ids}, "stored_at": {"$lt": stored_before}})
+    remaining = set(files.distinct("_id", {"_id": {"$in": ids}}))
+    deleted = [doc for doc in docs if doc["_id"] not in remaining]
+    if deleted:
+        chunks_collection().delete_many({"files_id": {"$in": [doc["_id"] for doc in deleted]}})
+    return deleted
+
+def clear_references(file_ids):
+    for collection, fields in reference_fields():
+        for field in fields:
+            collection.update_many({field: {"$in": file_ids}}, {"$set": {field: None}})
+
+def run_retention(dry_run=False, batch_size=None):
+    settings = get_settings()
+    batch_size = batch_size or settings.file_retention_batch_size
+    started = time.perf_counter()
+    now = datetime.datetime.now()
+    grace_cutoff = now - datetime.timedelta(seconds=settings.file_retention_grace_seconds)
+    expire_cutoff = now - datetime.timedelta(days=settings.file_retention_days) if settings.file_retention_days else None
+    # ไฟล์ที่เพิ่งเก็บอาจยังไม่ถูกบันทึกลงงาน ข้ามไว้จนพ้นช่วง grace
+    settled = {"stored_at": {"$lt": grace_cutoff}}
+    summary = {"scanned": 0, "unreferenced": 0, "expired": 0, "deleted_files": 0, "reclaimed_bytes": 0, "dry_run": dry_run}
+
+    files = files_collection()
+    # ไฟล์จากก่อนมี stored_at เริ่มนับช่วง grace จากรอบแรกที่พบ ไม่ถูกลบทันที
+    legacy = {"stored_at": {"$exists": False}}
+    summary["legacy_files"] = files.count_documents(legacy)
+    if summary["legacy_files"] and not dry_run:
+        files.update_many(legacy, {"$set": {"stored_at": now}})
+    last_id = None
+    while True:
+        query = settled if last_id is None else {**settled, "_id": {"$gt": last_id}}
+        batch = list(files.find(query, {"length": 1, "stored_at": 1, "uploadDate": 1, "refcount": 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        summary["scanned"] += len(batch)
+
+        ids = [doc["_id"] for doc in batch]
+        # ตรวจงานก่อน sender_names งานบันทึกแถวก่อนจบ ไฟล์จึงถูกนับจากฝั่งใดฝั่งหนึ่งเสมอ
+        in_use = job_files(ids)
+        counts = count_references(ids)
+        garbage, expired, updates = [], [], []
+        for doc in batch:
+            refcount = counts[doc["_id"]] + (doc["_id"] in in_use)
+            if refcount == 0:
+                summary["unreferenced"] += 1
+                garbage.append(doc)
+            elif expire_cutoff and doc["_id"] not in in_use and doc.get("stored_at", doc["uploadDate"]) < expire_cutoff:
+                summary["expired"] += 1
+                garbage.append(doc)
+                expired.append(doc["_id"])
+            elif doc.get("refcount") != refcount:
+                updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"refcount": refcount}}))
+
+        if dry_run:
+            summary["deleted_files"] += len(garbage)
+            summary["reclaimed_bytes"] += sum(doc["length"] for doc in garbage)
+            continue
+        if updates:
+            files.bulk_write(updates, ordered=False)
+        if garbage:
+            deleted = delete_files(garbage, grace_cutoff)
+            summary["deleted_files"] += len(deleted)
+            summary["reclaimed_bytes"] += sum(doc["length"] for doc in deleted)
+            deleted_ids = {doc["_id"] for doc in deleted}
+            expired = [file_id for file_id in expired if file_id in deleted_ids]
+        if expired:
+            clear_references(expired)
+
+    summary["seconds"] = time.perf_counter() - started
+    if not dry_run:
+        file_store_stats["retention_runs"] += 1
+        file_store_stats["deleted_files"] += summary["deleted_files"]
+        file_store_stats["reclaimed_bytes"] += summary["reclaimed_bytes"]
+        last_retention.clear()
+        last_retention.update(summary, finished_at=datetime.datetime.now())
+    return summary
+
+def file_store_status():
+    return {**file_store_stats, "compression": get_settings().reply_compression, "last_retention": last_retention or None}
+
+if __name__ == "__main__":
+    # python -m app.utils.file_store [--dry-run]
+    parser = argparse.ArgumentParser(description="Delete unreferenced and expired GridFS files")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be deleted without deleting")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    summary = run_retention(dry_run=args.dry_run, batch_size=args.batch_size)
+    action = "Would delete" if args.dry_run else "Deleted"
+    print(f"Scanned {summary['scanned']} files: {summary['unreferenced']} unreferenced, {summary['expired']} expired")
+    if summary["legacy_files"]:
+        start = "on the next run" if args.dry_run else "from now"
+        print(f"{summary['legacy_files']} files without stored_at are kept for the grace period {start}")
+    print(f"✅ {action} {summary['deleted_files']} files, reclaimed {summary['reclaimed_bytes'] / 1024 / 1024:.1f} MB")
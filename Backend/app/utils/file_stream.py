@@ -0,0 +1,53 @@
+import re
+from urllib.parse import quote
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+MEDIA_TYPES = {
+    ".pdf": "application/pdf",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".csv": "text/csv",
+}
+
+def media_type_for(filename):
+    return next((media_type for ext, media_type in MEDIA_TYPES.items() if filename.lower().endswith(ext)), "application/octet-stream")
+
+def grid_file_etag(grid_out):
+    # pymongo 4 ไม่คำนวณ md5 ให้แล้ว จึงใช้ _id + เวลาอัปโหลด + ขนาด เมื่อไม่มี md5
+    md5 = getattr(grid_out, "md5", None)
+    if md5:
+        return f'"{md5}"'
+    return f'"{grid_out._id}-{int(grid_out.upload_date.timestamp())}-{grid_out.length}"'
+
+def content_disposition(filename):
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def parse_byte_range(range_header, length):
+    # รองรับช่วงเดียว: bytes=start-end, bytes=start- และ bytes=-suffix
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        suffix = int(end)
+        if suffix == 0:
+            return None
+        return max(length - suffix, 0), length - 1
+    start = int(start)
+    end = min(int(end), length - 1) if end else length - 1
+    if start > end or start >= length:
+        return None
+    return start, end
+
+async def iter_grid_file(grid_out, start, length):
+    grid_out.seek(start)
+    remaining = length
+    while remaining > 0:
+        chunk = await grid_out.read(min(grid_out.chunk_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
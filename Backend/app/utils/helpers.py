@@ -1,4 +1,5 @@
 from bson import ObjectId
+from itertools import islice
 
 def convert_objectid_to_str(data):
     if isinstance(data, list):
@@ -7,4 +8,9 @@ def convert_objectid_to_str(data):
         return {key: convert_objectid_to_str(value) for key, value in data.items()}
     if isinstance(data, ObjectId):
         return str(data)
-    return data
\ No newline at end of file
+    return data
+
+def chunked(items, size):
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,152 @@
+import os
+import time
+import datetime
+import functools
+import inspect
+from contextlib import contextmanager
+from prometheus_client import Histogram, Counter, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from pymongo import monitoring
+from starlette.responses import Response
+from app.config import get_settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+span_seconds = Histogram(
+    "span_duration_seconds", "Duration of instrumented operations (PDF, GridFS, SMTP, IMAP)",
+    ["span"], buckets=LATENCY_BUCKETS
+)
+span_errors = Counter("span_errors_total", "Instrumented operations that raised", ["span"])
+mongo_command_seconds = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency reported by pymongo",
+    ["command", "collection"], buckets=LATENCY_BUCKETS
+)
+mongo_command_failures = Counter("mongo_command_failures_total", "Failed MongoDB commands", ["command", "collection"])
+
+@contextmanager
+def span(name):
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        span_errors.labels(name).inc()
+        raise
+    finally:
+        span_seconds.labels(name).observe(time.perf_counter() - started)
+
+def timed(name):
+    # ใช้ได้ทั้งฟังก์ชันปกติและ async
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class MongoCommandListener(monitoring.CommandListener):
+    # pymongo เรียก listener จาก thread ที่รันคำสั่งนั้นเอง ต้องทำงานให้เร็วที่สุด
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        mongo_command_seconds.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        mongo_command_seconds.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        mongo_command_failures.labels(event.command_name, collection).inc()
+
+mongo_command_listener = MongoCommandListener()
+
+class StatsCollector:
+    # ส่งออกตัวเลขใน dict สถานะที่ worker แต่ละตัวเก็บอยู่แล้ว (pdf, smtp, ingestion ฯลฯ) เป็น gauge
+    def __init__(self):
+        self._sources = {}
+
+    def register(self, prefix, source):
+        self._sources[prefix] = source
+
+    def collect(self):
+        for prefix, source in self._sources.items():
+            try:
+                stats = source()
+            except Exception as e:
+                print(f"❌ Cannot collect {prefix} metrics:", e)
+                continue
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                gauge = GaugeMetricFamily(f"{prefix}_{key}", f"{prefix} {key}")
+                gauge.add_metric([], value)
+                yield gauge
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+class MetricsMiddleware:
+    # ASGI middleware แบบเบา ไม่ครอบ response เหมือน BaseHTTPMiddleware จึงไม่กระทบ streaming
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        profiler = start_profiler(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # FastAPI ใส่ route ที่จับคู่ได้ไว้ใน scope ใช้ path template เพื่อไม่ให้ label แตกตาม id
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            http_request_seconds.labels(scope["method"], route_path, status["code"]).observe(time.perf_counter() - started)
+            if profiler:
+                save_profile(profiler, scope["method"], route_path)
+
+def start_profiler(scope):
+    # เปิด profiler เฉพาะคำขอที่ส่ง header X-Profile: 1 และตั้ง PROFILING_ENABLED ไว้
+    if not get_settings().profiling_enabled or (b"x-profile", b"1") not in scope.get("headers", []):
+        return None
+    from pyinstrument import Profiler
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    return profiler
+
+def save_profile(profiler, method, route_path):
+    profiler.stop()
+    profile_dir = get_settings().profile_dir
+    os.makedirs(profile_dir, exist_ok=True)
+    name = f"{datetime.datetime.now():%Y%m%d-%H%M%S-%f}-{method}{route_path.replace('/', '_')}.html"
+    path = os.path.join(profile_dir, name)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(profiler.output_html())
+    print("✅ Saved profile:", path)
+
+async def metrics_endpoint(request):
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,48 @@
+import base64
+import datetime
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# คีย์ที่ใช้แบ่งหน้าได้ และวิธีแปลงค่าใน cursor กลับเป็นค่าที่เก็บในฐานข้อมูล
+# date เก็บเป็นสตริง YYYY-MM-DD แถวที่ไม่มีวันที่ (null) เข้ารหัสเป็นสตริงว่าง
+CURSOR_KEYS = {
+    "created_at": datetime.datetime.fromisoformat,
+    "date": lambda value: value or None,
+}
+
+def encode_cursor(doc, sort_key="created_at"):
+    value = doc.get(sort_key)
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    raw = f"{value or ''}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor, sort_key="created_at"):
+    try:
+        value, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return CURSOR_KEYS[sort_key](value), ObjectId(doc_id)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="cursor ไม่ถูกต้อง")
+
+async def keyset_page(collection, query, projection, limit, cursor=None, sort_key="created_at"):
+    # เรียงตาม (sort_key, _id) จากมากไปน้อย หน้าถัดไปเริ่มหลังเอกสารสุดท้ายของหน้าก่อน
+    # ดัชนีของคำค้นต้องลงท้ายด้วย sort_key, _id ไม่เช่นนั้น MongoDB ต้องเรียงในหน่วยความจำ
+    if cursor:
+        value, doc_id = decode_cursor(cursor, sort_key)
+        after = [{sort_key: value, "_id": {"$lt": doc_id}}]
+        if value is not None:
+            # null อยู่ท้ายสุดเมื่อเรียงจากมากไปน้อย แต่ $lt กับสตริงหรือวันที่ไม่จับคู่กับ null
+            after += [{sort_key: {"$lt": value}}, {sort_key: None}]
+        query = {**query, "$or": after}
+    docs = await (
+        collection.find(query, {**projection, sort_key: 1})
+        .sort([(sort_key, -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    next_cursor = encode_cursor(docs[limit - 1], sort_key) if len(docs) > limit else None
+    return docs[:limit], next_cursor
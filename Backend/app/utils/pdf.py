@@ -1,12 +1,16 @@
+import hashlib
 import os
+import tempfile
 from fpdf import FPDF
-from io import BytesIO
-from app.models.database import grid_fs
-from dotenv import load_dotenv
+from fontTools import ttLib
+from itertools import chain, islice
+from app.config import get_settings
+from app.utils.metrics import timed
+from app.utils.pdf_renderer import store_pdf
 
-load_dotenv()
-
-THAI_FONT_PATH_NORMAL = os.getenv("THAI_FONT_PATH_NORMAL")
+THAI_FONT_FAMILY = 'THSarabunNew'
+TABLE_ROW_HEIGHT = 8
+TABLE_SAMPLE_ROWS = 200
 
 FIELD_LABELS = {
     "sender_name": "ชื่อผู้ส่ง",
@@ -16,58 +20,168 @@ FIELD_LABELS = {
     "date": "วันที่"
 }
 
-def generate_custom_pdf_and_store(rows, fields, request_id, date_display):
-    pdf = FPDF(orientation='L')
-    pdf.add_font('THSarabunNew', '', THAI_FONT_PATH_NORMAL, uni=True)
-    pdf.set_font('THSarabunNew', '', 14)
-    pdf.add_page()
+# หนังสือขอระงับสัญญาณ: โครงร่างคงที่ เติมเฉพาะผู้รับ Request ID และวันที่
+SUSPENSION_TEMPLATE = (
+    ("cell", "เรียน {recipient}"),
+    ("ln", 10),
+    ("multi_cell", "ขอให้ดำเนินการระงับสัญญาณตามข้อมูลในเอกสารแนบ (Request ID: {request_id})"),
+    ("ln", 10),
+    ("cell", "ด้วยความเคารพ"),
+    ("cell", "ผู้ยื่นคำขอ"),
+    ("ln", 10),
+    ("text_color", (255, 0, 0)),
+    ("cell", "วันที่: {date_display}"),
+)
+
+# ตารางที่ fpdf ไม่ได้ใช้ (ไม่มี text shaping) แต่ทำให้การ subset ฟอนต์ตอน output ช้าลง
+UNUSED_FONT_TABLES = ("morx", "feat", "VDMX", "hdmx", "LTSH", "DSIG", "GSUB", "GPOS", "GDEF", "kern")
+
+_font_cache = {}
 
-    page_width = pdf.w - 2 * pdf.l_margin
-    col_width = page_width / len(fields) if fields else 40
+def thai_font_file(font_path=None):
+    # ตัดตารางที่ไม่ใช้ออกครั้งเดียว เก็บเป็นไฟล์ใน temp (ชื่อตาม path และเวลาแก้ไขของฟอนต์ต้นฉบับ)
+    # ทุก process ของ renderer ใช้ไฟล์เดียวกันผ่าน FPDF.add_font ตามปกติ
+    # fpdf2 ไม่มีทางที่รองรับให้ใช้ฟอนต์ที่ parse แล้วข้ามเอกสาร add_font จึงยัง parse ไฟล์นี้ทุกเอกสาร
+    # ผลต่างความเร็วเทียบกับไฟล์ต้นฉบับอยู่ในช่วงคลาดเคลื่อนของ benchmarks/bench_pdf.py
+    font_path = font_path or get_settings().thai_font_path_normal
+    cached = _font_cache.get(font_path)
+    if cached is None:
+        source = os.path.abspath(font_path)
+        key = hashlib.sha256(f"{source}|{os.path.getmtime(source)}|{UNUSED_FONT_TABLES}".encode()).hexdigest()[:16]
+        cached = os.path.join(tempfile.gettempdir(), f"sms-sender-{THAI_FONT_FAMILY}-{key}.ttf")
+        if not os.path.exists(cached):
+            ttfont = ttLib.TTFont(source, recalcTimestamp=False)
+            for tag in UNUSED_FONT_TABLES:
+                if tag in ttfont:
+                    del ttfont[tag]
+            # เขียนไฟล์ชั่วคราวแล้วเปลี่ยนชื่อ process อื่นจึงไม่เห็นไฟล์ที่เขียนไม่ครบ
+            partial = f"{cached}.{os.getpid()}"
+            ttfont.save(partial)
+            os.replace(partial, cached)
+        _font_cache[font_path] = cached
+    return cached
 
-    pdf.cell(0, 10, f"Request ID: {request_id}", 0, 1)
-    pdf.cell(0, 10, f"วันที่: {date_display}", 0, 1)
-    pdf.ln(5)
+def add_thai_font(pdf, font_path=None):
+    pdf.add_font(THAI_FONT_FAMILY, '', thai_font_file(font_path))
 
+class DataTablePDF(FPDF):
+    # วาดหัวตารางซ้ำทุกหน้า fpdf เรียก header() เองทุกครั้งที่ขึ้นหน้าใหม่ รวมถึงตอนตัดหน้าอัตโนมัติ
+    def __init__(self, fields, request_id, date_display):
+        super().__init__(orientation='L')
+        # ไม่ใส่ CreationDate ข้อมูลเดิมจึงได้ไฟล์เดิมทุกครั้ง (retry ใช้ไฟล์ใน file_store ซ้ำได้)
+        self.creation_date = None
+        self.fields = fields
+        self.request_id = request_id
+        self.date_display = date_display
+        self.col_widths = []
+
+    def header(self):
+        if self.page_no() == 1:
+            self.cell(0, 10, f"Request ID: {self.request_id}", 0, 1)
+            self.cell(0, 10, f"วันที่: {self.date_display}", 0, 1)
+            self.ln(5)
+        for field, width in zip(self.fields, self.col_widths):
+            self.cell(width, TABLE_ROW_HEIGHT, FIELD_LABELS.get(field, field), 1)
+        self.ln()
+
+    def footer(self):
+        self.set_y(-12)
+        self.cell(0, 8, f"หน้า {self.page_no()}", 0, 0, 'R')
+
+def fit_column_widths(pdf, fields, sample_rows):
+    page_width = pdf.w - pdf.l_margin - pdf.r_margin
+    if not fields:
+        return []
+    widths = []
     for field in fields:
-        label = FIELD_LABELS.get(field, field)
-        pdf.cell(col_width, 10, label, 1)
-    pdf.ln()
-
-    for row in rows:
-        for field in fields:
-            value = str(row.get(field, "-"))
-            pdf.cell(col_width, 10, value, 1)
+        texts = [FIELD_LABELS.get(field, field)] + [str(row.get(field, "-")) for row in sample_rows]
+        widths.append(max(pdf.get_string_width(text) for text in texts) + 2 * pdf.c_margin)
+    total = sum(widths)
+    if total <= page_width:
+        # ทุกคอลัมน์กว้างอย่างน้อยเท่าข้อมูลตัวอย่าง ที่เหลือแบ่งตามสัดส่วน
+        return [width * page_width / total for width in widths]
+    # กว้างเกินหน้า: คอลัมน์แคบคงความกว้างเดิม ลดเฉพาะคอลัมน์ที่กว้างกว่าเพดานร่วมกัน (ข้อความที่เกินจะขึ้นบรรทัดใหม่)
+    cap = page_width / len(widths)
+    narrow = [width for width in widths if width <= cap]
+    while narrow:
+        cap = (page_width - sum(narrow)) / (len(widths) - len(narrow))
+        wider = [width for width in widths if width <= cap]
+        if len(wider) == len(narrow):
+            break
+        narrow = wider
+    return [min(width, cap) for width in widths]
+
+def wrap_cells(pdf, texts, widths):
+    # แบ่งบรรทัดเฉพาะข้อความที่ยาวเกินคอลัมน์ (เช่นค่าที่ยาวกว่าแถวตัวอย่าง) แทนการตัดทิ้ง
+    cells = []
+    for text, width in zip(texts, widths):
+        if pdf.get_string_width(text) <= width - 2 * pdf.c_margin:
+            cells.append([text])
+        else:
+            cells.append(pdf.multi_cell(width, TABLE_ROW_HEIGHT, text, align='L', dry_run=True, output="LINES"))
+    return cells
+
+def draw_row(pdf, texts, widths):
+    cells = wrap_cells(pdf, texts, widths)
+    lines = max((len(cell) for cell in cells), default=1)
+    if lines == 1:
+        for text, width in zip(texts, widths):
+            pdf.cell(width, TABLE_ROW_HEIGHT, text, 1)
         pdf.ln()
+        return
 
-    pdf_stream = BytesIO(pdf.output(dest='S'))
-    return grid_fs.put(
-        pdf_stream,
-        filename=f"{request_id}_data.pdf",
-        request_id=request_id,
-        file_type="sent_data"
-    )
+    height = lines * TABLE_ROW_HEIGHT
+    # ขึ้นหน้าใหม่ก่อนวาดทั้งแถว ไม่ให้แถวเดียวถูกแบ่งครึ่งข้ามหน้า
+    if pdf.will_page_break(height):
+        pdf.add_page()
+    y = pdf.get_y()
+    for cell, width in zip(cells, widths):
+        x = pdf.get_x()
+        pdf.rect(x, y, width, height)
+        for i, line in enumerate(cell):
+            pdf.set_xy(x, y + i * TABLE_ROW_HEIGHT)
+            pdf.cell(width, TABLE_ROW_HEIGHT, line)
+        pdf.set_xy(x + width, y)
+    pdf.ln(height)
 
-def generate_suspension_pdf(request_id: str, date_display, recipient="เจ้าหน้าที่ผู้เกี่ยวข้อง"):
+def render_data_pdf(rows, fields, request_id, date_display):
+    rows = iter(rows)
+    sample_rows = list(islice(rows, TABLE_SAMPLE_ROWS))
+
+    pdf = DataTablePDF(fields, request_id, date_display)
+    add_thai_font(pdf)
+    pdf.set_font(THAI_FONT_FAMILY, '', 14)
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.col_widths = fit_column_widths(pdf, fields, sample_rows)
+    pdf.add_page()
+
+    for row in chain(sample_rows, rows):
+        draw_row(pdf, [str(row.get(field, "-")) for field in fields], pdf.col_widths)
+    return pdf.output()
+
+@timed("pdf.generate_custom_pdf_and_store")
+def generate_custom_pdf_and_store(rows, fields, request_id, date_display):
+    return store_pdf(render_data_pdf(rows, fields, request_id, date_display), f"{request_id}_data.pdf", request_id, "sent_data")
+
+def render_suspension_pdf(request_id: str, date_display, recipient="เจ้าหน้าที่ผู้เกี่ยวข้อง"):
     pdf = FPDF()
-    pdf.add_font('THSarabunNew', '', THAI_FONT_PATH_NORMAL, uni=True)
-    pdf.set_font('THSarabunNew', '', 16)
+    pdf.creation_date = None
+    add_thai_font(pdf)
+    pdf.set_font(THAI_FONT_FAMILY, '', 16)
     pdf.add_page()
 
-    pdf.cell(0, 10, f"เรียน {recipient}", 0, 1)
-    pdf.ln(10)
-    pdf.multi_cell(0, 10, f"ขอให้ดำเนินการระงับสัญญาณตามข้อมูลในเอกสารแนบ (Request ID: {request_id})")
-    pdf.ln(10)
-    pdf.cell(0, 10, "ด้วยความเคารพ", 0, 1)
-    pdf.cell(0, 10, "ผู้ยื่นคำขอ", 0, 1)
-    pdf.ln(10)
-    pdf.set_text_color(255, 0, 0)
-    pdf.cell(0, 10, f"วันที่: {date_display}", 0, 1)
-
-    pdf_stream = BytesIO(pdf.output(dest='S'))
-    return grid_fs.put(
-        pdf_stream,
-        filename=f"{request_id}_suspension.pdf",
-        request_id=request_id,
-        file_type="sent_suspension"
-    )
\ No newline at end of file
+    values = {"request_id": request_id, "date_display": date_display, "recipient": recipient}
+    for kind, arg in SUSPENSION_TEMPLATE:
+        if kind == "cell":
+            pdf.cell(0, 10, arg.format(**values), 0, 1)
+        elif kind == "multi_cell":
+            pdf.multi_cell(0, 10, arg.format(**values))
+        elif kind == "ln":
+            pdf.ln(arg)
+        elif kind == "text_color":
+            pdf.set_text_color(*arg)
+    return pdf.output()
+
+@timed("pdf.generate_suspension_pdf")
+def generate_suspension_pdf(request_id: str, date_display, recipient="เจ้าหน้าที่ผู้เกี่ยวข้อง"):
+    return store_pdf(render_suspension_pdf(request_id, date_display, recipient), f"{request_id}_suspension.pdf", request_id, "sent_suspension")
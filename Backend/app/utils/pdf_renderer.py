@@ -0,0 +1,89 @@
+import os
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from app.config import get_settings
+from app.utils.file_store import store_file
+from app.utils.metrics import span
+
+render_stats = {"queue_depth": 0, "completed": 0, "failed": 0}
+render_timings = deque(maxlen=1000)
+_executor = None
+
+# fpdf และ fontTools import ใน process ของ worker เท่านั้น process หลักส่งแค่ชื่อฟังก์ชัน render ไป
+def _warm_worker():
+    # import fpdf/fontTools และเตรียมไฟล์ฟอนต์ตั้งแต่ตอนเริ่ม process เพื่อไม่ให้งานแรกช้า
+    # ฟอนต์ยังถูก parse ใหม่ทุกเอกสาร (ดู thai_font_file ใน app/utils/pdf.py)
+    from app.utils.pdf import render_suspension_pdf
+    render_suspension_pdf("warmup", "")
+
+def _timed_render(render_name, *args):
+    from app.utils import pdf
+    started = time.perf_counter()
+    pdf_bytes = getattr(pdf, render_name)(*args)
+    return bytes(pdf_bytes), time.perf_counter() - started
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # spawn แทน fork เพราะ process หลักมี thread ของ worker อื่นทำงานอยู่
+        _executor = ProcessPoolExecutor(
+            max_workers=get_settings().pdf_render_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker
+        )
+    return _executor
+
+def start_renderer():
+    # สร้าง worker ให้ครบตั้งแต่เริ่มแอป ให้ initializer เตรียม worker ก่อนมีงานจริง
+    executor = get_executor()
+    for _ in range(get_settings().pdf_render_workers):
+        executor.submit(os.getpid)
+
+async def render_pdf(render_name, *args):
+    loop = asyncio.get_running_loop()
+    render_stats["queue_depth"] += 1
+    try:
+        with span(f"pdf.{render_name}"):
+            pdf_bytes, seconds = await loop.run_in_executor(get_executor(), _timed_render, render_name, *args)
+    except Exception:
+        render_stats["failed"] += 1
+        raise
+    finally:
+        render_stats["queue_depth"] -= 1
+    render_stats["completed"] += 1
+    render_timings.append((render_name, seconds))
+    return pdf_bytes
+
+def store_pdf(pdf_bytes, filename, request_id, file_type):
+    # PDF บีบอัดภายในอยู่แล้ว จึงไม่บีบอัดซ้ำ
+    return store_file(pdf_bytes, filename, file_type, request_id)
+
+async def generate_custom_pdf_and_store_async(rows, fields, request_id, date_display):
+    pdf_bytes = await render_pdf("render_data_pdf", rows, fields, request_id, date_display)
+    return await asyncio.to_thread(store_pdf, pdf_bytes, f"{request_id}_data.pdf", request_id, "sent_data")
+
+async def generate_suspension_pdf_async(request_id, date_display):
+    pdf_bytes = await render_pdf("render_suspension_pdf", request_id, date_display)
+    return await asyncio.to_thread(store_pdf, pdf_bytes, f"{request_id}_suspension.pdf", request_id, "sent_suspension")
+
+def renderer_status():
+    timings = {}
+    for name, seconds in render_timings:
+        timings.setdefault(name, []).append(seconds)
+    return {
+        **render_stats,
+        "workers": get_settings().pdf_render_workers,
+        "render_seconds": {
+            name: {"count": len(values), "avg": sum(values) / len(values), "max": max(values)}
+            for name, values in timings.items()
+        }
+    }
+
+def shutdown_renderer():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
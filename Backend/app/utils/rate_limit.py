@@ -0,0 +1,53 @@
+import time
+import threading
+from cachetools import TTLCache
+from fastapi import HTTPException
+from app.config import get_settings
+
+class RateLimiter:
+    # fixed window ต่อ key เก็บใน process (ถ้ารันหลาย worker แต่ละ worker นับแยกกัน)
+    def __init__(self, limit, window, cache_size):
+        self.limit = limit
+        self.window = window
+        # แก้ค่าใน list โดยไม่ set ใหม่ รายการจึงหมดอายุเมื่อครบ window นับจากครั้งแรก
+        self._windows = TTLCache(maxsize=cache_size, ttl=window)
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        # คืนจำนวนวินาทีที่ต้องรอ หรือ None ถ้ายังไม่เกินโควตา
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                self._windows[key] = [now, 1]
+                return None
+            if window[1] >= self.limit:
+                return max(1, int(window[0] + self.window - now) + 1)
+            window[1] += 1
+            return None
+
+    def reset(self, key):
+        with self._lock:
+            self._windows.pop(key, None)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def login_limiter(kind):
+    # kind เป็น "email" หรือ "ip" สร้างเมื่อใช้ครั้งแรกตามค่าใน settings
+    with _limiters_lock:
+        limiter = _limiters.get(kind)
+        if limiter is None:
+            settings = get_settings()
+            limit = getattr(settings, f"login_rate_limit_per_{kind}")
+            limiter = _limiters[kind] = RateLimiter(limit, settings.login_rate_limit_window, settings.rate_limit_cache_size)
+        return limiter
+
+def check_rate_limit(limiter, key):
+    retry_after = limiter.hit(key)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="พยายามเข้าสู่ระบบบ่อยเกินไป กรุณาลองใหม่ภายหลัง",
+            headers={"Retry-After": str(retry_after)}
+        )
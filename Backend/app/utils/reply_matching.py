@@ -0,0 +1,56 @@
+from io import BytesIO
+
+def normalize_columns(df):
+    df.columns = df.columns.astype(str).str.strip().str.lower().str.replace(' ', '_')
+    return df
+
+def normalize_sender_name(sender_name):
+    return str(sender_name).strip().lower()
+
+def normalize_phone_number(phone_number):
+    return ''.join(filter(str.isdigit, str(phone_number))).lstrip('0')
+
+def find_sender_columns(df):
+    sender_col = next((col for col in df.columns if "sender" in col and "name" in col), None)
+    phone_col = next((col for col in df.columns if "phone" in col or "number" in col), None)
+    return sender_col, phone_col
+
+def read_sender_file(file_data, filename):
+    # pandas ใช้เวลา import นาน โหลดเมื่อมีไฟล์ให้อ่านจริงเท่านั้น
+    import pandas as pd
+    # dtype=str เก็บเบอร์โทรตามที่เขียนไว้ ไม่แปลงเป็นทศนิยม
+    if filename.lower().endswith(".csv"):
+        df = pd.read_csv(BytesIO(file_data), dtype=str)
+    else:
+        df = pd.read_excel(BytesIO(file_data), dtype=str)
+    return normalize_columns(df).fillna("")
+
+def sender_keys(df, sender_col, phone_col):
+    import pandas as pd
+    return pd.MultiIndex.from_arrays([
+        df[sender_col].str.strip().str.lower(),
+        df[phone_col].str.replace(r'\D', '', regex=True).str.lstrip('0')
+    ])
+
+def match_reply(file_data, filename, senders):
+    requested = {
+        (normalize_sender_name(sender["sender_name"]), normalize_phone_number(sender["phone_number"])): sender["sender_name"]
+        for sender in senders
+    }
+    try:
+        df = read_sender_file(file_data, filename)
+    except Exception as e:
+        return {"matched": [], "missing": list(requested.values()), "extra": [], "error": str(e)}
+
+    sender_col, phone_col = find_sender_columns(df)
+    if not sender_col or not phone_col:
+        return {"matched": [], "missing": list(requested.values()), "extra": [], "error": "ไม่พบคอลัมน์ชื่อผู้ส่งหรือเบอร์มือถือ"}
+
+    keys = sender_keys(df, sender_col, phone_col)
+    reply_keys = set(keys)
+    return {
+        "matched": [name for key, name in requested.items() if key in reply_keys],
+        "missing": [name for key, name in requested.items() if key not in reply_keys],
+        "extra": df[~keys.isin(list(requested))].to_dict("records"),
+        "error": None
+    }
@@ -0,0 +1,155 @@
+import os
+import sys
+import datetime
+import pandas as pd
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.config import get_settings
+from app.models.sender_names import sender_names_collection
+from app.utils.reply_matching import normalize_columns, normalize_sender_name, normalize_phone_number, find_sender_columns
+from app.utils.sender_search import invalidate_sender_cache
+
+def find_column(df, *keywords):
+    return next((col for col in df.columns if all(keyword in col for keyword in keywords)), None)
+
+def cell_text(value):
+    # openpyxl คืนค่าตามชนิดของเซลล์ เบอร์โทรที่เป็นตัวเลขจะกลายเป็น float ได้
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    return str(value).strip()
+
+def iter_sender_chunks(file_obj, filename, chunk_size=None):
+    chunk_size = chunk_size or get_settings().sender_import_chunk_size
+    # อ่านไฟล์ทีละส่วน ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ
+    if filename.lower().endswith(".csv"):
+        for chunk in pd.read_csv(file_obj, dtype=str, keep_default_na=False, chunksize=chunk_size):
+            yield normalize_columns(chunk)
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [cell_text(value) for value in next(rows, ())]
+        chunk = []
+        for row in rows:
+            chunk.append([cell_text(value) for value in row[:len(header)]])
+            if len(chunk) == chunk_size:
+                yield normalize_columns(pd.DataFrame(chunk, columns=header))
+                chunk = []
+        if chunk:
+            yield normalize_columns(pd.DataFrame(chunk, columns=header))
+    finally:
+        workbook.close()
+
+def canonical_phone_number(phone_number):
+    digits = ''.join(filter(str.isdigit, str(phone_number)))
+    if digits.startswith("66") and len(digits) == 11:
+        digits = digits[2:]
+    digits = "0" + digits.lstrip("0")
+    return digits if len(digits) == 10 else None
+
+def parse_sender_date(value, default):
+    if not value:
+        return default
+    for parse in (lambda text: datetime.date.fromisoformat(text[:10]), lambda text: datetime.datetime.strptime(text, "%d/%m/%Y").date()):
+        try:
+            return parse(value).isoformat()
+        except ValueError:
+            continue
+    return None
+
+def import_senders(file_obj, filename, progress=None, chunk_size=None):
+    max_rejects = get_settings().sender_import_max_rejects
+    sender_names = sender_names_collection()
+    today = datetime.date.today().isoformat()
+    summary = {"rows": 0, "inserted": 0, "updated": 0, "duplicates": 0, "rejected": 0, "rejects": []}
+    seen = set()
+
+    def reject(row_number, error):
+        summary["rejected"] += 1
+        if len(summary["rejects"]) < max_rejects:
+            summary["rejects"].append({"row": row_number, "error": error})
+
+    first_row = 2  # แถวที่ 1 เป็นหัวตาราง
+    for chunk in iter_sender_chunks(file_obj, filename, chunk_size):
+        sender_col, phone_col = find_sender_columns(chunk)
+        if not sender_col or not phone_col:
+            raise ValueError("ไม่พบคอลัมน์ชื่อผู้ส่งหรือเบอร์มือถือ")
+        provider_col = find_column(chunk, "provider")
+        full_name_col = find_column(chunk, "full", "name")
+        date_col = "date" if "date" in chunk.columns else find_column(chunk, "date")
+
+        now = datetime.datetime.now()
+        operations = []
+        operation_rows = []
+        for offset, row in enumerate(chunk.to_dict("records")):
+            row_number = first_row + offset
+            sender_name = str(row[sender_col]).strip()
+            phone_number = canonical_phone_number(row[phone_col])
+            if not sender_name:
+                reject(row_number, "ไม่มีชื่อผู้ส่ง")
+                continue
+            if not phone_number:
+                reject(row_number, f"เบอร์มือถือไม่ถูกต้อง: {row[phone_col]}")
+                continue
+            date = parse_sender_date(str(row[date_col]).strip() if date_col else "", today)
+            if not date:
+                reject(row_number, f"วันที่ไม่ถูกต้อง: {row[date_col]}")
+                continue
+            key = (normalize_sender_name(sender_name), normalize_phone_number(phone_number))
+            if key in seen:
+                summary["duplicates"] += 1
+                continue
+            seen.add(key)
+
+            fields = {"date": date, "updated_at": now}
+            if provider_col and row[provider_col]:
+                fields["mobile_provider"] = str(row[provider_col]).strip().upper()
+            if full_name_col and row[full_name_col]:
+                fields["full_name"] = str(row[full_name_col]).strip()
+            operations.append(UpdateOne(
+                {"sender_name": sender_name, "phone_number": phone_number},
+                {"$set": fields, "$setOnInsert": {"status": ["available"], "created_at": now}},
+                upsert=True
+            ))
+            operation_rows.append(row_number)
+
+        summary["rows"] += len(chunk)
+        first_row += len(chunk)
+        if operations:
+            try:
+                result = sender_names.bulk_write(operations, ordered=False)
+                summary["inserted"] += result.upserted_count
+                summary["updated"] += result.matched_count
+            except BulkWriteError as e:
+                summary["inserted"] += e.details["nUpserted"]
+                summary["updated"] += e.details["nMatched"]
+                for error in e.details["writeErrors"]:
+                    reject(operation_rows[error["index"]], error["errmsg"])
+        if progress:
+            progress(summary)
+
+    if summary["inserted"] or summary["updated"]:
+        invalidate_sender_cache()
+    return summary
+
+if __name__ == "__main__":
+    # python -m app.utils.sender_import senders.xlsx
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m app.utils.sender_import <file.csv|file.xlsx>")
+    path = sys.argv[1]
+
+    def print_progress(summary):
+        print(f"{summary['rows']} rows: {summary['inserted']} inserted, {summary['updated']} updated, "
+              f"{summary['duplicates']} duplicates, {summary['rejected']} rejected")
+
+    with open(path, "rb") as file_obj:
+        summary = import_senders(file_obj, os.path.basename(path), progress=print_progress)
+    for rejected in summary["rejects"]:
+        print(f"❌ row {rejected['row']}: {rejected['error']}")
+    print("✅ นำเข้าข้อมูลผู้ส่งเรียบร้อย")
@@ -0,0 +1,69 @@
+import re
+import datetime
+import threading
+from cachetools import TTLCache
+from fastapi import HTTPException
+from app.config import get_settings
+
+SENDER_PROJECTION = {
+    "sender_name": 1,
+    "mobile_provider": 1,
+    "phone_number": 1,
+    "full_name": 1,
+    "date": 1,
+    "status": 1
+}
+
+_sender_cache = None
+_sender_cache_lock = threading.Lock()
+
+def sender_cache():
+    global _sender_cache
+    if _sender_cache is None:
+        settings = get_settings()
+        _sender_cache = TTLCache(maxsize=settings.sender_cache_size, ttl=settings.sender_cache_ttl)
+    return _sender_cache
+
+def parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="รูปแบบวันที่ไม่ถูกต้อง ควรใช้ YYYY-MM-DD")
+
+def build_sender_query(start=None, end=None, provider=None, status=None, name_prefix=None):
+    query = {}
+    today = datetime.date.today()
+    start_date = parse_date(start) if start else None
+    end_date = parse_date(end) if end else None
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="วันที่เริ่มต้นต้องน้อยกว่าหรือเท่ากับวันที่สิ้นสุด")
+    if end_date and end_date > today:
+        raise HTTPException(status_code=400, detail="วันที่สิ้นสุดต้องไม่มากกว่าวันปัจจุบัน")
+    # date เก็บเป็นสตริง YYYY-MM-DD ซึ่งเรียงตามตัวอักษรได้ตรงกับลำดับวันที่ จึงใช้ดัชนีได้
+    if start_date or end_date:
+        query["date"] = {}
+        if start_date:
+            query["date"]["$gte"] = start_date.isoformat()
+        if end_date:
+            query["date"]["$lte"] = end_date.isoformat()
+    if provider:
+        query["mobile_provider"] = provider
+    if status:
+        query["status"] = status
+    if name_prefix:
+        # regex แบบยึดต้นสตริงและไม่สนตัวพิมพ์เล็กใหญ่ไม่ได้ จึงใช้แบบตรงตัวเพื่อให้ใช้ดัชนี sender_name ได้
+        query["sender_name"] = {"$regex": f"^{re.escape(name_prefix)}"}
+    return query
+
+def cached_sender_page(key):
+    with _sender_cache_lock:
+        return sender_cache().get(key)
+
+def cache_sender_page(key, page):
+    with _sender_cache_lock:
+        sender_cache()[key] = page
+
+def invalidate_sender_cache():
+    # เรียกทุกครั้งที่ข้อมูลผู้ส่งเปลี่ยน (สร้างคำขอ รับคำตอบ ระงับสัญญาณ)
+    with _sender_cache_lock:
+        sender_cache().clear()
@@ -0,0 +1,131 @@
+import sys
+import datetime
+from collections import Counter
+from pymongo import UpdateOne, ReplaceOne
+from app.models.stats import sender_stats_collection, async_sender_stats_collection
+from app.models.notification import notifications_collection
+
+STATUSES = ["pending", "suspension_requested", "received", "error", "suspended"]
+DIMENSIONS = ["all", "request", "provider", "day", "user"]
+
+# ทุกครั้งที่ผู้ส่งได้สถานะใหม่ จะมีการแจ้งเตือนหนึ่งรายการ (idempotency_key กันซ้ำ)
+# สถิติจึงนับจากการแจ้งเตือน: จำนวนผู้ส่งที่ไปถึงแต่ละสถานะ แยกตามมิติต่าง ๆ
+def stat_keys(doc):
+    return [
+        ("all", "all"),
+        ("request", doc["request_id"]),
+        ("provider", doc.get("mobile_provider") or "unknown"),
+        ("day", doc["created_at"].strftime("%Y-%m-%d")),
+        ("user", doc["user_id"])
+    ]
+
+# สถิติของคำขอเก็บ user_id ของเจ้าของไว้ด้วย /api/stats จึงส่งคืนเฉพาะคำขอของผู้ใช้ที่เรียก
+def stat_owner(dimension, doc):
+    return {"user_id": doc["user_id"]} if dimension == "request" else {}
+
+def stat_updates(counts, owners):
+    now = datetime.datetime.now()
+    return [
+        UpdateOne(
+            {"_id": f"{dimension}:{value}"},
+            {
+                "$inc": {f"counts.{status}": count for status, count in statuses.items()},
+                "$set": {"dimension": dimension, "value": value, "updated_at": now, **owners[(dimension, value)]}
+            },
+            upsert=True
+        )
+        for (dimension, value), statuses in counts.items()
+    ]
+
+def count_status_events(docs):
+    counts, owners = {}, {}
+    for doc in docs:
+        if doc["status"] not in STATUSES:
+            continue
+        for key in stat_keys(doc):
+            counts.setdefault(key, Counter())[doc["status"]] += 1
+            owners[key] = stat_owner(key[0], doc)
+    return counts, owners
+
+def record_status_events(docs):
+    counts, owners = count_status_events(docs)
+    if counts:
+        sender_stats_collection().bulk_write(stat_updates(counts, owners), ordered=False)
+
+async def record_status_events_async(docs):
+    counts, owners = count_status_events(docs)
+    if counts:
+        await async_sender_stats_collection().bulk_write(stat_updates(counts, owners), ordered=False)
+
+def stats_document(doc):
+    return {status: doc.get("counts", {}).get(status, 0) for status in STATUSES}
+
+async def get_stats(dimensions, user_id, day_from=None):
+    # all, provider และ day เป็นยอดรวมทั้งระบบ ส่วน request และ user คืนเฉพาะของ user_id
+    shared = [dimension for dimension in dimensions if dimension in ("all", "provider")]
+    clauses = [{"dimension": {"$in": shared}}] if shared else []
+    if "day" in dimensions:
+        clauses.append({"dimension": "day", **({"value": {"$gte": day_from}} if day_from else {})})
+    if "request" in dimensions:
+        clauses.append({"dimension": "request", "user_id": user_id})
+    if "user" in dimensions:
+        clauses.append({"dimension": "user", "value": user_id})
+    query = {"$or": clauses}
+    stats = {dimension: {} for dimension in dimensions}
+    async for doc in async_sender_stats_collection().find(query):
+        stats[doc["dimension"]][doc["value"]] = stats_document(doc)
+    return stats
+
+async def get_request_stats(request_id, user_id):
+    # None เมื่อคำขอไม่ใช่ของ user_id หรือยังไม่มีสถิติ
+    doc = await async_sender_stats_collection().find_one({"_id": f"request:{request_id}", "user_id": user_id})
+    return stats_document(doc) if doc else None
+
+def rebuild_stats():
+    # นับใหม่ทั้งหมดจาก notifications ใช้ backfill หรือแก้ค่าที่คลาดเคลื่อน
+    pipeline = [
+        {"$match": {"status": {"$in": STATUSES}}},
+        {"$group": {
+            "_id": {
+                "request_id": "$request_id",
+                "mobile_provider": "$mobile_provider",
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "user_id": "$user_id",
+                "status": "$status"
+            },
+            "count": {"$sum": 1}
+        }}
+    ]
+    counts, owners = {}, {}
+    for group in notifications_collection().aggregate(pipeline, allowDiskUse=True):
+        key = group["_id"]
+        doc = {
+            "request_id": key["request_id"],
+            "mobile_provider": key.get("mobile_provider"),
+            "created_at": datetime.datetime.strptime(key["day"], "%Y-%m-%d"),
+            "user_id": key["user_id"]
+        }
+        for stat_key in stat_keys(doc):
+            counts.setdefault(stat_key, Counter())[key["status"]] += group["count"]
+            owners[stat_key] = stat_owner(stat_key[0], doc)
+
+    now = datetime.datetime.now()
+    stats = sender_stats_collection()
+    operations = [
+        ReplaceOne(
+            {"_id": f"{dimension}:{value}"},
+            {"dimension": dimension, "value": value, "counts": dict(statuses), "updated_at": now, **owners[(dimension, value)]},
+            upsert=True
+        )
+        for (dimension, value), statuses in counts.items()
+    ]
+    if operations:
+        stats.bulk_write(operations, ordered=False)
+    stats.delete_many({"updated_at": {"$lt": now}})
+    return len(operations)
+
+if __name__ == "__main__":
+    # python -m app.utils.status_stats --rebuild
+    if sys.argv[1:] != ["--rebuild"]:
+        sys.exit("usage: python -m app.utils.status_stats --rebuild")
+    print(f"✅ สร้างสถิติใหม่ {rebuild_stats()} รายการ")
@@ -0,0 +1,217 @@
+import imaplib
+import random
+import select
+import ssl
+import threading
+import time
+import datetime
+from app.config import get_settings
+from app.external_services.email import connect_imap, check_inbox_and_save_reply
+from app.models.mailbox_state import mailbox_state_collection
+
+ingestion_metrics = {
+    "leader": False,
+    "mode": None,
+    "uidvalidity": None,
+    "uidnext": None,
+    "last_uid": 0,
+    "lag_messages": 0,
+    "deferred_messages": 0,
+    "last_cycle_seconds": None,
+    "last_success_at": None,
+    "last_error": None,
+    "consecutive_failures": 0,
+}
+
+def ingestion_status():
+    status = dict(ingestion_metrics)
+    last_success_at = status["last_success_at"]
+    status["lag_seconds"] = (datetime.datetime.now() - last_success_at).total_seconds() if last_success_at else None
+    return status
+
+class ReplyIngestionWorker:
+    def __init__(self, connect=connect_imap, mailbox=None, poll_interval=None, idle_timeout=None):
+        settings = get_settings()
+        self.connect = connect
+        self.mailbox = mailbox or settings.imap_mailbox
+        self.poll_interval = poll_interval or settings.imap_poll_interval
+        self.idle_timeout = idle_timeout or settings.imap_idle_timeout
+        self.mail = None
+        self.uidvalidity = None
+        self.uidnext = None
+        self.last_uid = 0
+        self.deferred_uids = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="reply-ingestion", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._disconnect()
+
+    def run(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                if self.mail is None:
+                    self._open()
+                self.sync()
+                failures = 0
+                self._wait_for_mail()
+            except Exception as e:
+                failures += 1
+                ingestion_metrics["last_error"] = str(e)
+                ingestion_metrics["consecutive_failures"] = failures
+                print("❌ Error in reply ingestion:", e)
+                self._disconnect()
+                self._stop.wait(self._backoff(failures))
+
+    @staticmethod
+    def _backoff(failures):
+        # exponential backoff แบบ full jitter ไม่ให้หลายเครื่องเชื่อมต่อ IMAP พร้อมกัน
+        settings = get_settings()
+        return random.uniform(0, min(settings.imap_backoff_max_seconds, settings.imap_backoff_base_seconds * 2 ** (failures - 1)))
+
+    def sync(self):
+        started = time.monotonic()
+        result, data = self.mail.uid("SEARCH", None, f"UID {self.last_uid + 1}:*")
+        if result != "OK":
+            raise imaplib.IMAP4.error(f"UID SEARCH failed: {data}")
+        # SEARCH เห็นข้อความที่ EXISTS ก่อนหน้านี้แจ้งไว้แล้ว
+        self.mail.response("EXISTS")
+        # "n:*" ตรงกับข้อความล่าสุดเสมอ แม้ UID ของข้อความนั้นจะน้อยกว่า n
+        found = list(map(int, data[0].split()))
+        uids = sorted(uid for uid in found if uid > self.last_uid)
+        self._update_uidnext(max(found, default=0) + 1)
+        # รายงานก่อนประมวลผล ถ้ารอบนี้ล้มเหลว metric ยังแสดงจำนวนที่ค้างอยู่
+        ingestion_metrics.update({"uidnext": self.uidnext, "lag_messages": self._lag()})
+
+        # ข้อความของงานที่ยังไม่จบถูกเลื่อนไว้ ตรวจซ้ำพร้อมข้อความใหม่จนกว่างานจะบันทึกแถวผู้ส่งเสร็จ
+        retry = sorted(self.deferred_uids)
+        if uids or retry:
+            self.deferred_uids = check_inbox_and_save_reply(self.mail, retry + uids)
+            self.last_uid = max(uids, default=self.last_uid)
+            self._save_state()
+
+        ingestion_metrics.update({
+            "last_uid": self.last_uid,
+            "lag_messages": self._lag(),
+            "deferred_messages": len(self.deferred_uids),
+            "last_cycle_seconds": time.monotonic() - started,
+            "last_success_at": datetime.datetime.now(),
+            "last_error": None,
+            "consecutive_failures": 0,
+        })
+
+    def _update_uidnext(self, candidate):
+        # UIDNEXT มาจากผล SELECT หรือ untagged OK [UIDNEXT n] ที่เซิร์ฟเวอร์ส่งมาภายหลัง และต้องมากกว่า UID ล่าสุดที่พบ
+        _, data = self.mail.response("UIDNEXT")
+        reported = [int(value) for value in data if value]
+        self.uidnext = max([self.uidnext or 0, candidate, *reported])
+
+    def _lag(self):
+        return max(0, (self.uidnext or 1) - 1 - self.last_uid)
+
+    def _open(self):
+        mail = self.connect()
+        result, _ = mail.select(self.mailbox)
+        if result != "OK":
+            raise imaplib.IMAP4.error(f"Cannot select mailbox {self.mailbox}")
+        self.mail = mail
+        uidvalidity = mail.response("UIDVALIDITY")[1][0]
+        self.uidvalidity = int(uidvalidity) if uidvalidity else None
+        self.uidnext = None
+        self._update_uidnext(0)
+        state = mailbox_state_collection().find_one({"_id": self.mailbox}) or {}
+        # UID จาก UIDVALIDITY เก่าใช้ไม่ได้แล้ว จึงตรวจ mailbox ใหม่ตั้งแต่ต้น
+        if state.get("uidvalidity") != self.uidvalidity:
+            state = {}
+        self.last_uid = state.get("last_uid", 0)
+        self.deferred_uids = set(state.get("deferred_uids", []))
+        ingestion_metrics["uidvalidity"] = self.uidvalidity
+        ingestion_metrics["mode"] = "idle" if "IDLE" in mail.capabilities else "poll"
+
+    def _save_state(self):
+        mailbox_state_collection().update_one(
+            {"_id": self.mailbox},
+            {"$set": {
+                "uidvalidity": self.uidvalidity,
+                "last_uid": self.last_uid,
+                "deferred_uids": sorted(self.deferred_uids),
+                "updated_at": datetime.datetime.now()
+            }},
+            upsert=True
+        )
+
+    def _disconnect(self):
+        if self.mail is None:
+            return
+        try:
+            self.mail.logout()
+        except (imaplib.IMAP4.error, OSError):
+            pass
+        self.mail = None
+
+    def _wait_for_mail(self):
+        # EXISTS ที่มาระหว่าง FETCH/STORE หลัง SEARCH คือข้อความใหม่ที่เซิร์ฟเวอร์จะไม่แจ้งซ้ำใน IDLE
+        if self.mail.response("EXISTS")[1][0] is not None:
+            return
+        # งานที่จบไม่ทำให้ IDLE ตื่น ถ้ามีข้อความที่รออยู่จึง poll แทน
+        if self.deferred_uids or "IDLE" not in self.mail.capabilities:
+            self._stop.wait(self.poll_interval)
+            return
+
+        tag = self.mail._new_tag()
+        self.mail.send(tag + b" IDLE\r\n")
+        line = self.mail.readline()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+
+        # ตื่นทุกช่วงสั้น ๆ ไม่ให้ stop() ต้องรอนานเมื่อไม่มีอีเมลเข้า
+        deadline = time.monotonic() + self.idle_timeout
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            if not self._readable(1):
+                continue
+            line = self.mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed during IDLE")
+            if line.rstrip().endswith(b"EXISTS"):
+                break
+
+        self.mail.send(b"DONE\r\n")
+        while True:
+            line = self.mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed while leaving IDLE")
+            if line.startswith(tag):
+                break
+
+    def _readable(self, timeout):
+        sock = self.mail.sock
+        if hasattr(sock, "pending") and sock.pending():
+            return True
+        if self._buffered():
+            return True
+        readable, _, _ = select.select([sock], [], [], timeout)
+        return bool(readable)
+
+    def _buffered(self):
+        # imaplib อ่านผ่าน buffer ของ makefile ข้อมูลที่มาในแพ็กเก็ตเดียวกับ "+ idling" (เช่น EXISTS) จึงค้างอยู่ใน buffer
+        # และ select บน socket มองไม่เห็น peek แบบ non-blocking คืนข้อมูลใน buffer โดยไม่รอ socket
+        sock = self.mail.sock
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            return bool(self.mail.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(timeout)
@@ -0,0 +1,245 @@
+import os
+import asyncio
+import datetime
+import uuid
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from app.models.job import jobs_collection, async_jobs_collection, job_rows_collection, async_job_rows_collection
+from app.models.sender_names import sender_names_collection
+from app.config import get_settings
+from app.utils.pdf_renderer import generate_custom_pdf_and_store_async, generate_suspension_pdf_async
+from app.utils.helpers import chunked
+from app.utils.sender_search import invalidate_sender_cache
+from app.external_services.email import send_email
+from app.external_services.notification import create_notifications, build_notification
+
+worker_tasks = []
+
+class LeaseLost(Exception):
+    pass
+
+async def enqueue_request_job(request_id, fields, rows, user_id):
+    now = datetime.datetime.now()
+    # เขียนแถวก่อนสร้างงาน worker จึงไม่เห็นงานที่แถวยังไม่ครบ
+    chunk_size = get_settings().job_rows_chunk_size
+    chunks = [
+        {"request_id": request_id, "seq": seq, "rows": rows[start:start + chunk_size]}
+        for seq, start in enumerate(range(0, len(rows), chunk_size))
+    ]
+    if chunks:
+        await async_job_rows_collection().insert_many(chunks)
+    await async_jobs_collection().insert_one({
+        "_id": request_id,
+        "request_id": request_id,
+        "status": "queued",
+        "stage": "queued",
+        "fields": fields,
+        "row_count": len(rows),
+        "row_chunks": len(chunks),
+        "created_by": user_id,
+        "thai_date": now.strftime("%d %B %Y"),
+        "attempts": 0,
+        "available_at": now,
+        "lease_until": None,
+        "worker_id": None,
+        "data_pdf_id": None,
+        "suspension_pdf_id": None,
+        "email_sent": False,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now
+    })
+
+async def get_job(request_id, user_id):
+    return await async_jobs_collection().find_one(
+        {"_id": request_id, "created_by": user_id},
+        {"fields": 0}
+    )
+
+def load_job_rows(request_id):
+    rows = []
+    for chunk in job_rows_collection().find({"request_id": request_id}).sort("seq", 1):
+        rows.extend(chunk["rows"])
+    return rows
+
+def claim_job(worker_id):
+    now = datetime.datetime.now()
+    return jobs_collection().find_one_and_update(
+        {"$or": [
+            {"status": "queued", "available_at": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}}
+        ]},
+        {
+            "$set": {
+                "status": "running",
+                "worker_id": worker_id,
+                "lease_until": now + datetime.timedelta(seconds=get_settings().job_lease_seconds),
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("available_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def update_job(job, **fields):
+    # ต่ออายุ lease ทุกครั้งที่อัปเดต และตรวจว่างานยังเป็นของ worker นี้อยู่
+    now = datetime.datetime.now()
+    fields["lease_until"] = now + datetime.timedelta(seconds=get_settings().job_lease_seconds)
+    fields["updated_at"] = now
+    result = jobs_collection().update_one(
+        {"_id": job["_id"], "worker_id": job["worker_id"], "status": "running"},
+        {"$set": fields}
+    )
+    if result.matched_count == 0:
+        raise LeaseLost(job["_id"])
+    job.update(fields)
+
+def finish_job(job, status, **fields):
+    now = datetime.datetime.now()
+    fields.update({"status": status, "lease_until": None, "updated_at": now})
+    if status in ("done", "failed"):
+        fields["finished_at"] = now
+    result = jobs_collection().update_one(
+        {"_id": job["_id"], "worker_id": job["worker_id"]},
+        {"$set": fields}
+    )
+    # งานจบแล้วไม่ต้อง retry อีก แถวที่เก็บไว้อยู่ใน sender_names แล้ว
+    if status in ("done", "failed") and result.matched_count:
+        job_rows_collection().delete_many({"request_id": job["request_id"]})
+
+def save_request_rows(rows, fields, request_id, thai_date, data_pdf_id, suspension_pdf_id, user_id):
+    sender_names = sender_names_collection()
+    saved = 0
+    errors = []
+    for chunk in chunked(enumerate(rows), get_settings().mongo_bulk_batch_size):
+        now = datetime.datetime.now()
+        chunk_rows = []
+        operations = []
+        for index, row in chunk:
+            if not row.get("sender_name") or not row.get("phone_number"):
+                errors.append({"row": index, "error": "ต้องระบุ sender_name และ phone_number"})
+                continue
+            chunk_rows.append((index, row))
+            operations.append(UpdateOne(
+                {"sender_name": row["sender_name"], "phone_number": row["phone_number"]},
+                {
+                    "$set": {
+                        "request_id": request_id,
+                        "thai_date": thai_date,
+                        "fields": fields,
+                        "pdf_sent_data_id": data_pdf_id,
+                        "pdf_sent_suspension_id": suspension_pdf_id,
+                        "created_by": user_id,
+                        "created_at": now,
+                        "updated_at": now
+                    },
+                    "$addToSet": {
+                        "status": {"$each": ["pending", "suspension_requested"]}
+                    },
+                    "$setOnInsert": {
+                        "mobile_provider": row.get("mobile_provider"),
+                        "full_name": row.get("full_name"),
+                        "date": row.get("date")
+                    }
+                },
+                upsert=True
+            ))
+        if not operations:
+            continue
+
+        failed = set()
+        try:
+            sender_names.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details["writeErrors"]:
+                failed.add(error["index"])
+                errors.append({"row": chunk_rows[error["index"]][0], "error": error["errmsg"]})
+
+        notifications = []
+        for position, (_, row) in enumerate(chunk_rows):
+            if position in failed:
+                continue
+            notifications.append(build_notification(request_id, row["sender_name"], "pending", user_id, thai_date, row.get("mobile_provider")))
+            notifications.append(build_notification(request_id, row["sender_name"], "suspension_requested", user_id, thai_date, row.get("mobile_provider")))
+        create_notifications(notifications)
+        saved += len(chunk_rows) - len(failed)
+
+    if saved:
+        invalidate_sender_cache()
+    errors.sort(key=lambda error: error["row"])
+    return saved, errors
+
+async def process_request_job(job):
+    request_id = job["request_id"]
+    thai_date = job["thai_date"]
+
+    # แต่ละขั้นตอนบันทึกผลไว้ในงาน เมื่อ retry จะข้ามขั้นตอนที่ทำสำเร็จแล้ว
+    if not job["data_pdf_id"] or not job["suspension_pdf_id"]:
+        await asyncio.to_thread(update_job, job, stage="rendering")
+        data_pdf_id, suspension_pdf_id = await asyncio.gather(
+            generate_custom_pdf_and_store_async(job["rows"], job["fields"], request_id, thai_date),
+            generate_suspension_pdf_async(request_id, thai_date)
+        )
+        await asyncio.to_thread(update_job, job, data_pdf_id=data_pdf_id, suspension_pdf_id=suspension_pdf_id)
+
+    if not job["email_sent"]:
+        await asyncio.to_thread(update_job, job, stage="emailing")
+        subject = f"ขอข้อมูลและระงับสัญญาณ (Request ID: {request_id})"
+        body = f"เรียนเจ้าหน้าที่\n\nRequest ID: {request_id}\nวันที่: {thai_date}\nกรุณาดำเนินการระงับสัญญาณตามเอกสารแนบและส่งข้อมูลกลับในรูปแบบ Excel/CSV"
+        await asyncio.to_thread(send_email, subject, body, [job["data_pdf_id"], job["suspension_pdf_id"]])
+        await asyncio.to_thread(update_job, job, email_sent=True)
+
+    await asyncio.to_thread(update_job, job, stage="saving")
+    saved, errors = await asyncio.to_thread(
+        save_request_rows, job["rows"], job["fields"], request_id, thai_date,
+        job["data_pdf_id"], job["suspension_pdf_id"], job["created_by"]
+    )
+    return {"saved": saved, "errors": errors}
+
+async def run_job(job):
+    if job["attempts"] > get_settings().job_max_attempts:
+        await asyncio.to_thread(finish_job, job, "failed", error=job.get("error") or "Lease expired too many times")
+        return
+    try:
+        # งานที่สร้างก่อนแยกแถวออกไปยังมี rows อยู่ในเอกสารงาน
+        if "rows" not in job:
+            job["rows"] = await asyncio.to_thread(load_job_rows, job["request_id"])
+        result = await process_request_job(job)
+    except LeaseLost:
+        print(f"❌ Lost lease on request job {job['_id']}")
+        return
+    except Exception as e:
+        print(f"❌ Request job {job['_id']} failed (attempt {job['attempts']}):", e)
+        if job["attempts"] >= get_settings().job_max_attempts:
+            await asyncio.to_thread(finish_job, job, "failed", error=str(e))
+        else:
+            delay = get_settings().job_retry_delay_seconds * 2 ** (job["attempts"] - 1)
+            available_at = datetime.datetime.now() + datetime.timedelta(seconds=delay)
+            await asyncio.to_thread(finish_job, job, "queued", error=str(e), available_at=available_at)
+        return
+    await asyncio.to_thread(finish_job, job, "done", stage="done", result=result, error=None)
+
+async def request_worker_loop(worker_id):
+    while True:
+        try:
+            job = await asyncio.to_thread(claim_job, worker_id)
+        except Exception as e:
+            print("❌ Error claiming request job:", e)
+            job = None
+        if job is None:
+            await asyncio.sleep(get_settings().job_poll_interval)
+            continue
+        await run_job(job)
+
+def start_request_workers(count=None):
+    for _ in range(count or get_settings().request_workers):
+        worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        worker_tasks.append(asyncio.create_task(request_worker_loop(worker_id)))
+
+async def stop_request_workers():
+    for task in worker_tasks:
+        task.cancel()
+    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    worker_tasks.clear()
@@ -0,0 +1,96 @@
+import os
+import socket
+import uuid
+import datetime
+from apscheduler.schedulers.background import BackgroundScheduler
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.config import get_settings
+from app.models.lease import leases_collection
+from app.workers.reply_ingestion import ReplyIngestionWorker, ingestion_metrics
+from app.utils.file_store import run_retention
+
+INGESTION_LEASE = "reply-ingestion"
+RETENTION_LEASE = "file-retention"
+
+instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+scheduler = BackgroundScheduler(job_defaults={"coalesce": True, "max_instances": 1})
+reply_worker = None
+
+def acquire_lease(name, owner=instance_id, seconds=None):
+    seconds = seconds or get_settings().scheduler_lease_seconds
+    # ได้ lease เมื่อยังไม่มีใครถือ หมดอายุแล้ว หรือเราถืออยู่เอง (ต่ออายุ)
+    now = datetime.datetime.now()
+    try:
+        leases_collection().find_one_and_update(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + datetime.timedelta(seconds=seconds), "renewed_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # มี worker อื่นถือ lease ที่ยังไม่หมดอายุ upsert จึงชนกับ _id เดิม
+        return False
+    return True
+
+def release_lease(name, owner=instance_id):
+    leases_collection().delete_one({"_id": name, "owner": owner})
+
+def run_reply_ingestion_leader():
+    # ทุก process แข่งกันถือ lease มีเพียง process เดียวที่เชื่อมต่อ IMAP
+    global reply_worker
+    try:
+        leader = acquire_lease(INGESTION_LEASE)
+    except Exception as e:
+        print("❌ Cannot renew reply ingestion lease:", e)
+        leader = False
+    ingestion_metrics["leader"] = leader
+    if leader and reply_worker is None:
+        reply_worker = ReplyIngestionWorker()
+        reply_worker.start()
+    elif not leader and reply_worker is not None:
+        print("❌ Lost reply ingestion lease, stopping worker")
+        reply_worker.stop()
+        reply_worker = None
+
+def run_file_retention_leader():
+    # lease ยาวเท่ารอบการทำงาน ในแต่ละรอบจึงมีเพียง process เดียวที่ลบไฟล์
+    try:
+        if not acquire_lease(RETENTION_LEASE, seconds=get_settings().file_retention_interval_seconds):
+            return
+        summary = run_retention()
+    except Exception as e:
+        print("❌ File retention failed:", e)
+        return
+    if summary["deleted_files"]:
+        print(f"✅ File retention deleted {summary['deleted_files']} files, reclaimed {summary['reclaimed_bytes']} bytes")
+
+def start_scheduler():
+    scheduler.add_job(
+        run_reply_ingestion_leader, "interval",
+        seconds=get_settings().scheduler_renew_seconds,
+        id=INGESTION_LEASE,
+        next_run_time=datetime.datetime.now(),
+        replace_existing=True
+    )
+    retention_interval = get_settings().file_retention_interval_seconds
+    if retention_interval > 0:
+        scheduler.add_job(
+            run_file_retention_leader, "interval",
+            seconds=retention_interval,
+            id=RETENTION_LEASE,
+            replace_existing=True
+        )
+    scheduler.start()
+
+def shutdown_scheduler():
+    global reply_worker
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    if reply_worker is not None:
+        reply_worker.stop()
+        reply_worker = None
+        try:
+            release_lease(INGESTION_LEASE)
+        except Exception as e:
+            print("❌ Cannot release reply ingestion lease:", e)
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+# รันจากโฟลเดอร์ Backend: python benchmarks/bench_auth.py
+os.environ["MONGO_DATABASE_NAME"] = os.getenv("BENCH_MONGO_DATABASE_NAME", "sms_sender_bench")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import users
+from app.models.user import users_collection
+from app.models.database import drop_database, open_async_db, close_async_db
+from app.utils.authentication import create_access_token
+from app.dependencies import clear_user_cache
+
+REQUESTS = int(os.getenv("BENCH_REQUESTS", 2000))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", 20))
+
+@asynccontextmanager
+async def lifespan(app):
+    open_async_db()
+    yield
+    close_async_db()
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(users.router, prefix="/api")
+
+user_id = users_collection().insert_one({"name": "bench", "email": "bench@example.com", "role": "user"}).inserted_id
+headers = {"Authorization": f"Bearer {create_access_token({'_id': user_id, 'email': 'bench@example.com', 'name': 'bench', 'role': 'user'})}"}
+
+def call(use_cache):
+    if not use_cache:
+        clear_user_cache()
+    started = time.perf_counter()
+    client.get("/api/user/me", headers=headers).raise_for_status()
+    return time.perf_counter() - started
+
+def run(use_cache):
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        started = time.perf_counter()
+        latencies = sorted(pool.map(lambda _: call(use_cache), range(REQUESTS)))
+        elapsed = time.perf_counter() - started
+    return REQUESTS / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+with TestClient(app) as client:
+    for label, use_cache in (("no cache", False), ("cache", True)):
+        throughput, p50, p99 = run(use_cache)
+        print(f"{label:>8}: {throughput:8.0f} req/s  p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+
+drop_database()
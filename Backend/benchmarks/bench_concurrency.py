@@ -0,0 +1,80 @@
+import asyncio
+import datetime
+import os
+import sys
+import time
+
+# รันจากโฟลเดอร์ Backend: python benchmarks/bench_concurrency.py
+# เทียบ handler แบบ sync (pymongo บน threadpool) กับ async (Motor) เมื่อมีคำขอพร้อมกันจำนวนมาก
+os.environ["MONGO_DATABASE_NAME"] = os.getenv("BENCH_MONGO_DATABASE_NAME", "sms_sender_bench")
+os.environ.setdefault("MONGO_SENDER_NAMES_COLLECTION", "sender_names")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI, Depends
+from app.routers import requests
+from app.dependencies import get_current_user
+from app.models.database import drop_database, open_async_db, close_async_db
+from app.models.sender_names import sender_names_collection
+from app.models.user import users_collection
+from app.models.indexes import ensure_indexes
+from app.utils.authentication import create_access_token
+
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", 500))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", 3))
+ROWS = int(os.getenv("BENCH_ROWS", 200))
+
+app = FastAPI()
+app.include_router(requests.router, prefix="/api")
+
+@app.get("/sync/requests")
+def get_requests_sync(current_user: dict = Depends(get_current_user)):
+    # เส้นทางเดิม: def + pymongo ทำงานบน threadpool ของ Starlette
+    docs = sender_names_collection().find({"created_by": current_user["id"]}).sort("created_at", -1).limit(100)
+    return [{"request_id": doc["request_id"], "sender_name": doc["sender_name"], "created_at": doc["created_at"]} for doc in docs]
+
+def seed():
+    drop_database()
+    ensure_indexes()
+    user_id = users_collection().insert_one({"name": "bench", "email": "bench@example.com", "role": "user"}).inserted_id
+    now = datetime.datetime.now()
+    sender_names_collection().insert_many([{
+        "request_id": f"bench-{i // 10}",
+        "sender_name": f"Bench Sender {i}",
+        "phone_number": f"08{i:08d}",
+        "thai_date": "bench",
+        "status": ["pending"],
+        "created_by": str(user_id),
+        "created_at": now - datetime.timedelta(seconds=i)
+    } for i in range(ROWS)])
+    return {"Authorization": f"Bearer {create_access_token({'_id': user_id, 'email': 'bench@example.com', 'name': 'bench'})}"}
+
+async def measure(client, path, headers):
+    latencies = []
+
+    async def call():
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await asyncio.gather(*(call() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+async def main():
+    headers = seed()
+    open_async_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{CONCURRENCY} concurrent requests x {ROUNDS} rounds")
+        for label, path in (("sync pymongo", "/sync/requests"), ("async motor", "/api/requests")):
+            throughput, p50, p99 = await measure(client, path, headers)
+            print(f"{label:>13}: {throughput:8.0f} req/s  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms")
+    close_async_db()
+    drop_database()
+
+asyncio.run(main())
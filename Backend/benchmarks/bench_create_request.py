@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import uuid
+
+# รันจากโฟลเดอร์ Backend: python benchmarks/bench_create_request.py
+# ใช้ฐานข้อมูลแยกสำหรับ benchmark เพื่อไม่ให้ข้อมูลจริงปนกัน
+os.environ["MONGO_DATABASE_NAME"] = os.getenv("BENCH_MONGO_DATABASE_NAME", "sms_sender_bench")
+os.environ.setdefault("MONGO_SENDER_NAMES_COLLECTION", "sender_names")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import drop_database
+from app.models.sender_names import sender_names_collection
+from app.external_services.notification import create_notification
+from app.workers.request_jobs import save_request_rows
+
+ROW_COUNTS = [10, 100, 1000, 10000]
+
+def make_rows(count):
+    return [{
+        "sender_name": f"Bench Sender {i}",
+        "phone_number": f"08{i:08d}",
+        "mobile_provider": "AIS" if i % 2 == 0 else "TRUE",
+        "full_name": f"นายทดสอบ {i}",
+        "date": "2025-01-01"
+    } for i in range(count)]
+
+def save_rows_one_by_one(rows, request_id):
+    # เส้นทางเดิม: update_one + insert_one สองครั้งต่อแถว
+    sender_names = sender_names_collection()
+    for row in rows:
+        sender_names.update_one(
+            {"sender_name": row["sender_name"], "phone_number": row["phone_number"]},
+            {
+                "$set": {"request_id": request_id, "thai_date": "bench", "created_by": "bench"},
+                "$addToSet": {"status": {"$each": ["pending", "suspension_requested"]}},
+                "$setOnInsert": {"mobile_provider": row.get("mobile_provider")}
+            },
+            upsert=True
+        )
+        create_notification(request_id, row["sender_name"], "pending", "bench", "bench")
+        create_notification(request_id, row["sender_name"], "suspension_requested", "bench", "bench")
+
+def save_rows_bulk(rows, request_id):
+    save_request_rows(rows, ["sender_name"], request_id, "bench", None, None, "bench")
+
+def measure(save, rows):
+    drop_database()
+    started = time.perf_counter()
+    save(rows, str(uuid.uuid4()))
+    return time.perf_counter() - started
+
+print(f"{'rows':>8} {'one-by-one rows/s':>18} {'bulk rows/s':>12} {'speedup':>8}")
+for count in ROW_COUNTS:
+    rows = make_rows(count)
+    one_by_one = measure(save_rows_one_by_one, rows)
+    bulk = measure(save_rows_bulk, rows)
+    print(f"{count:>8} {count / one_by_one:>18.0f} {count / bulk:>12.0f} {one_by_one / bulk:>7.1f}x")
+
+drop_database()
@@ -0,0 +1,306 @@
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import os
+import platform
+import sys
+import time
+import uuid
+from email.message import EmailMessage
+
+# รันจากโฟลเดอร์ Backend: python benchmarks/bench_e2e.py --rows 10 100 --concurrency 1 8 --requests 20
+# วัดทั้งรอบตั้งแต่ POST /api/request จนสถานะเป็น received โดยใช้ SMTP sink และ IMAP server ในเครื่อง
+# ฐานข้อมูลเป็น mongomock (ค่าเริ่มต้น), mongod ชั่วคราว (--mongod) หรือ URI ที่กำหนด (--mongo-uri)
+# ผลอ้างอิงใน benchmarks/baselines/ ใช้กับ --compare ได้ e2e-mongomock.json บันทึกจาก
+#   --rows 10 100 --concurrency 1 4 --requests 8
+# จบด้วย exit code 1 ถ้ามีคำขอที่ไม่ถึงสถานะ received
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+import pandas as pd
+from local_services import SMTPSink, IMAPServer, start_mongod
+
+MOCK_RESPONSES_DIR = os.path.join(BACKEND_DIR, "mock_nbtc_responses")
+OPERATOR_EMAIL = "nbtc-operator@example.org"
+BENCH_EMAIL = "bench@sms-sender.local"
+STAGES = ["submit", "job_done", "email_sent", "ingest", "received"]
+FIELDS = ["sender_name", "phone_number", "mobile_provider", "full_name", "date"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark: submission to received reply")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000], help="rows per request")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="requests in flight")
+    parser.add_argument("--requests", type=int, default=10, help="requests per (rows, concurrency) run")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for each stage")
+    parser.add_argument("--mongod", action="store_true", help="start a temporary mongod instead of mongomock")
+    parser.add_argument("--mongo-uri", help="use an existing MongoDB instead of mongomock")
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/e2e-<time>.json)")
+    parser.add_argument("--compare", help="earlier JSON results to compare p50/p99 against")
+    return parser.parse_args()
+
+def configure_environment(args, smtp, imap):
+    # ต้องตั้งค่าก่อน import app เพราะโมดูลอ่าน env ตอน import
+    stop_mongo = None
+    if args.mongod:
+        uri, stop_mongo = start_mongod()
+        mongo = "mongod"
+    else:
+        uri = args.mongo_uri
+        mongo = "external" if uri else "mongomock"
+    if uri:
+        os.environ["MONGO_CONNECTION_STRING"] = uri
+        os.environ.pop("APP_TEST_MODE", None)
+    else:
+        os.environ["APP_TEST_MODE"] = "1"
+    os.environ.update({
+        "MONGO_DATABASE_NAME": os.getenv("BENCH_MONGO_DATABASE_NAME", "sms_sender_bench_e2e"),
+        "EMAIL_TEST_OUTBOX": "0",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp.port),
+        "SMTP_STARTTLS": "false",
+        "IMAP_SERVER": "127.0.0.1",
+        "IMAP_PORT": str(imap.port),
+        "IMAP_SSL": "false",
+        "SENDER_EMAIL": BENCH_EMAIL,
+        "SENDER_PASSWORD": "bench",
+        "RECIPIENT_EMAIL": OPERATOR_EMAIL,
+        "LOGIN_RATE_LIMIT_PER_IP": "1000000",
+    })
+    os.environ.setdefault("MONGO_SENDER_NAMES_COLLECTION", "sender_names")
+    return mongo, stop_mongo
+
+def reply_columns():
+    # ใช้หัวตารางและข้อความจากไฟล์ตัวอย่างของ กสทช เป็นแม่แบบคำตอบ
+    template = pd.read_excel(os.path.join(MOCK_RESPONSES_DIR, "response_case_1_complete.xlsx"), dtype=str)
+    comment = template["comment"].iloc[0] if "comment" in template and len(template) else ""
+    return list(template.columns), comment
+
+def reply_message(subject, filename, file_data):
+    msg = EmailMessage()
+    msg["From"] = OPERATOR_EMAIL
+    msg["To"] = BENCH_EMAIL
+    msg["Subject"] = f"Re: {subject}"
+    msg.set_content("ดำเนินการเรียบร้อย ตามไฟล์แนบ")
+    msg.add_attachment(file_data, maintype="application", subtype="octet-stream", filename=filename)
+    return msg.as_bytes()
+
+def seed_mailbox(mailbox):
+    # ใส่ไฟล์ตัวอย่างทั้งหมดเป็นคำตอบของคำขอที่ไม่มีในระบบ ให้ ingestion ต้องกรองทิ้ง
+    for filename in sorted(os.listdir(MOCK_RESPONSES_DIR)):
+        if filename.startswith("~$") or not filename.endswith((".xlsx", ".csv")):
+            continue
+        with open(os.path.join(MOCK_RESPONSES_DIR, filename), "rb") as file:
+            subject = f"ขอข้อมูลและระงับสัญญาณ (Request ID: {uuid.uuid4()})"
+            mailbox.append(reply_message(subject, filename, file.read()))
+
+def build_reply(rows, columns, comment):
+    values = {"status": "suspended", "comment": comment}
+    df = pd.DataFrame([{column: row.get(column, values.get(column, "")) for column in columns} for row in rows])
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def make_rows(run_id, request_index, count):
+    base = (run_id * 1000 + request_index) * count
+    return [{
+        "sender_name": f"E2E {run_id}-{request_index} Sender {i}",
+        "phone_number": f"08{(base + i) % 10 ** 8:08d}",
+        "mobile_provider": "AIS" if i % 2 == 0 else "TRUE",
+        "full_name": f"นายทดสอบ {i}",
+        "date": datetime.date.today().isoformat()
+    } for i in range(count)]
+
+def summarize(values):
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "p50": values[len(values) // 2],
+        "p99": values[min(len(values) - 1, int(len(values) * 0.99))],
+        "mean": sum(values) / len(values),
+        "max": values[-1]
+    }
+
+async def poll(fetch, done, timeout, interval=0.05):
+    deadline = time.perf_counter() + timeout
+    while True:
+        value = await fetch()
+        if done(value):
+            return value
+        if time.perf_counter() > deadline:
+            raise TimeoutError(value)
+        await asyncio.sleep(interval)
+
+class Harness:
+    def __init__(self, client, headers, mailbox, timeout):
+        self.client = client
+        self.headers = headers
+        self.mailbox = mailbox
+        self.timeout = timeout
+        self.columns, self.comment = reply_columns()
+        self.emails = {}
+
+    def on_email(self, received_at, msg):
+        from email.header import decode_header, make_header
+        from app.external_services.email import REQUEST_ID_PATTERN
+        subject = str(make_header(decode_header(msg["Subject"] or "")))
+        for request_id in REQUEST_ID_PATTERN.findall(subject.lower()):
+            self.emails[request_id] = (received_at, subject)
+
+    async def get_json(self, path):
+        response = await self.client.get(path, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def run_request(self, rows):
+        timings = dict.fromkeys(STAGES)
+        started = time.perf_counter()
+        response = await self.client.post("/api/request", json={"fields": FIELDS, "rows": rows}, headers=self.headers)
+        response.raise_for_status()
+        timings["submit"] = time.perf_counter() - started
+        request_id = response.json()["request_id"]
+
+        try:
+            job = await poll(
+                lambda: self.get_json(f"/api/request/{request_id}/job"),
+                lambda job: job["status"] in ("done", "failed"), self.timeout
+            )
+            if job["status"] != "done":
+                return timings, f"job failed: {job.get('error')}"
+            timings["job_done"] = time.perf_counter() - started
+            if request_id not in self.emails:
+                return timings, "email not delivered to SMTP sink"
+            email_received_at, subject = self.emails[request_id]
+            timings["email_sent"] = email_received_at - started
+
+            # ผู้ให้บริการตอบกลับหลังจากระบบบันทึกคำขอเสร็จ
+            reply = await asyncio.to_thread(build_reply, rows, self.columns, self.comment)
+            injected = time.perf_counter()
+            self.mailbox.append(reply_message(subject, f"{request_id}_reply.xlsx", reply))
+            await poll(
+                lambda: self.get_json(f"/api/stats/request/{request_id}"),
+                lambda stats: stats.get("received", 0) + stats.get("error", 0) >= len(rows), self.timeout
+            )
+            finished = time.perf_counter()
+            timings["ingest"] = finished - injected
+            timings["received"] = finished - started
+        except TimeoutError as e:
+            return timings, f"timed out waiting: {e}"
+        return timings, None
+
+    async def run(self, run_id, rows, concurrency, requests):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(index):
+            async with semaphore:
+                return await self.run_request(make_rows(run_id, index, rows))
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(limited(index) for index in range(requests)))
+        elapsed = time.perf_counter() - started
+        completed = [timings for timings, error in results if error is None]
+        errors = [error for _, error in results if error]
+        return {
+            "rows": rows,
+            "concurrency": concurrency,
+            "requests": requests,
+            "completed": len(completed),
+            "errors": errors[:20],
+            "wall_seconds": elapsed,
+            "requests_per_second": len(completed) / elapsed,
+            "rows_per_second": len(completed) * rows / elapsed,
+            "stages": {stage: summarize(timings[stage] for timings, _ in results) for stage in STAGES}
+        }
+
+async def wait_for_ingestion(timeout):
+    from app.workers.reply_ingestion import ingestion_metrics
+    deadline = time.perf_counter() + timeout
+    while not (ingestion_metrics["leader"] and ingestion_metrics["last_success_at"]):
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"reply ingestion did not start: {ingestion_metrics['last_error']}")
+        await asyncio.sleep(0.1)
+
+async def benchmark(args, smtp, mailbox):
+    from app.main import app
+    from app.models.database import drop_database
+
+    drop_database()
+    runs = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await wait_for_ingestion(args.timeout)
+        response = await client.post("/api/user/register", json={"name": "bench", "email": BENCH_EMAIL, "password": "bench-password"})
+        response.raise_for_status()
+        harness = Harness(client, {"Authorization": f"Bearer {response.json()['token']}"}, mailbox, args.timeout)
+        smtp.on_message = harness.on_email
+
+        run_id = 0
+        for rows in args.rows:
+            for concurrency in args.concurrency:
+                run_id += 1
+                result = await harness.run(run_id, rows, concurrency, args.requests)
+                runs.append(result)
+                print_run(result)
+    drop_database()
+    return runs
+
+def print_run(result):
+    print(f"rows {result['rows']:>6}  concurrency {result['concurrency']:>3}  "
+          f"{result['completed']}/{result['requests']} ok  {result['requests_per_second']:.2f} req/s  {result['rows_per_second']:.0f} rows/s")
+    for stage in STAGES:
+        summary = result["stages"][stage]
+        if summary:
+            print(f"    {stage:>10}: p50 {summary['p50'] * 1000:9.1f} ms  p99 {summary['p99'] * 1000:9.1f} ms")
+    for error in result["errors"]:
+        print(f"    ❌ {error}")
+
+def compare(previous_path, runs):
+    with open(previous_path, encoding="utf-8") as file:
+        previous = {(run["rows"], run["concurrency"]): run for run in json.load(file)["runs"]}
+    print(f"\nเทียบกับ {previous_path} (ค่าปัจจุบัน / ค่าเดิม)")
+    for run in runs:
+        old = previous.get((run["rows"], run["concurrency"]))
+        if not old:
+            continue
+        print(f"rows {run['rows']:>6}  concurrency {run['concurrency']:>3}")
+        for stage in STAGES:
+            new_summary, old_summary = run["stages"][stage], old["stages"].get(stage)
+            if new_summary and old_summary:
+                print(f"    {stage:>10}: p50 {new_summary['p50'] / old_summary['p50']:5.2f}x  p99 {new_summary['p99'] / old_summary['p99']:5.2f}x")
+
+def main():
+    args = parse_args()
+    smtp = SMTPSink().start()
+    imap = IMAPServer().start()
+    seed_mailbox(imap.mailbox)
+    mongo, stop_mongo = configure_environment(args, smtp, imap)
+    try:
+        runs = asyncio.run(benchmark(args, smtp, imap.mailbox))
+    finally:
+        smtp.stop()
+        imap.stop()
+        if stop_mongo:
+            stop_mongo()
+
+    output = args.output or os.path.join(BACKEND_DIR, "benchmarks", "results", f"e2e-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump({
+            "created_at": datetime.datetime.now().isoformat(),
+            "environment": {"mongo": mongo, "python": platform.python_version(), "platform": platform.platform()},
+            "config": {"rows": args.rows, "concurrency": args.concurrency, "requests": args.requests},
+            "runs": runs
+        }, file, ensure_ascii=False, indent=2)
+    print(f"✅ บันทึกผลไว้ที่ {output}")
+    if args.compare:
+        compare(args.compare, runs)
+    failed = sum(run["requests"] - run["completed"] for run in runs)
+    if failed:
+        sys.exit(f"❌ {failed} requests did not complete")
+
+if __name__ == "__main__":
+    main()
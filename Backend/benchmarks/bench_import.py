@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+import time
+
+# รันจากโฟลเดอร์ Backend: python benchmarks/bench_import.py
+os.environ["MONGO_DATABASE_NAME"] = os.getenv("BENCH_MONGO_DATABASE_NAME", "sms_sender_bench")
+os.environ.setdefault("MONGO_SENDER_NAMES_COLLECTION", "sender_names")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+from app.models.database import drop_database
+from app.models.indexes import ensure_indexes
+from app.utils.sender_import import import_senders
+
+ROWS = int(os.getenv("BENCH_ROWS", 100000))
+HEADER = ["Sender Name", "Mobile Provider", "Phone Number", "Full Name", "Date"]
+
+def make_row(i):
+    # มีแถวซ้ำและแถวเสียปนอยู่ราว 1% เหมือนไฟล์จริง
+    phone = f"08{i % (ROWS - ROWS // 100):08d}" if i % 97 else "12"
+    return [f"Sender {i % (ROWS - ROWS // 100)}", "AIS" if i % 2 else "TRUE", phone, f"นายทดสอบ {i}", "2025-01-01"]
+
+def write_csv(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(HEADER) + "\n")
+        for i in range(ROWS):
+            f.write(",".join(make_row(i)) + "\n")
+
+def write_xlsx(path):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(HEADER)
+    for i in range(ROWS):
+        sheet.append(make_row(i))
+    workbook.save(path)
+
+def measure(path):
+    drop_database()
+    ensure_indexes()
+    started = time.perf_counter()
+    with open(path, "rb") as file_obj:
+        summary = import_senders(file_obj, os.path.basename(path))
+    elapsed = time.perf_counter() - started
+    return elapsed, summary
+
+with tempfile.TemporaryDirectory() as directory:
+    print(f"{'format':>6} {'rows':>8} {'seconds':>8} {'rows/s':>8} {'inserted':>9} {'dupes':>6} {'rejected':>9}")
+    for extension, write in (("csv", write_csv), ("xlsx", write_xlsx)):
+        path = os.path.join(directory, f"senders.{extension}")
+        write(path)
+        elapsed, summary = measure(path)
+        print(f"{extension:>6} {summary['rows']:>8} {elapsed:>8.2f} {summary['rows'] / elapsed:>8.0f} "
+              f"{summary['inserted']:>9} {summary['duplicates']:>6} {summary['rejected']:>9}")
+
+drop_database()
@@ -0,0 +1,81 @@
+import os
+import re
+import sys
+import time
+import subprocess
+
+# รันจากโฟลเดอร์ Backend: python benchmarks/bench_import_time.py
+# วัดเวลา import app.main (ที่ uvicorn ต้องรอก่อนรับคำขอแรก) และจบด้วย exit code 1 ถ้าเกินงบ
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = int(os.getenv("BENCH_RUNS", 5))
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 600))
+TOP_MODULES = int(os.getenv("BENCH_TOP_MODULES", 15))
+# โมดูลหนักที่ต้องไม่ถูกโหลดตอน import แอป (โหลดเมื่อใช้งานจริงเท่านั้น)
+DEFERRED_MODULES = ("pandas", "fpdf", "fontTools", "openpyxl", "mongomock")
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def run_python(code, *flags):
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+def wall_clock_ms():
+    # เวลาทั้ง process รวมการเริ่ม interpreter ใช้ค่า median จากหลายรอบ
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        run_python("import app.main")
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+def import_profile():
+    # -X importtime เขียนเวลาแต่ละโมดูลลง stderr เป็นไมโครวินาที (self | cumulative)
+    result = run_python("import app.main", "-X", "importtime")
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent)))
+    return modules
+
+def app_import_ms(modules):
+    return next((cumulative for name, _, cumulative, _ in modules if name == "app.main"), 0) / 1000
+
+def loaded_deferred_modules():
+    code = (
+        "import sys, app.main\n"
+        f"print(' '.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))"
+    )
+    return run_python(code).stdout.split()
+
+if __name__ == "__main__":
+    modules = import_profile()
+    app_ms = app_import_ms(modules)
+    # รวม self time ตามแพ็กเกจระดับบนสุด เพื่อดูว่าแพ็กเกจไหนกินเวลาไปเท่าไร
+    packages = {}
+    for name, self_us, _, _ in modules:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    print(f"Top {TOP_MODULES} packages by import time:")
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:TOP_MODULES]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    process_ms = wall_clock_ms()
+    print(f"import app.main: {app_ms:.1f} ms (importtime), process wall clock median of {RUNS}: {process_ms:.1f} ms")
+
+    failures = []
+    if app_ms > IMPORT_TIME_BUDGET_MS:
+        failures.append(f"import app.main took {app_ms:.1f} ms, budget {IMPORT_TIME_BUDGET_MS:.0f} ms")
+    loaded = loaded_deferred_modules()
+    if loaded:
+        failures.append(f"heavy modules loaded at import time: {', '.join(loaded)}")
+
+    for failure in failures:
+        print("❌", failure)
+    if failures:
+        sys.exit(1)
+    print("✅ Import time within budget")
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+import time
+
+# รันจากโฟลเดอร์ Backend: python benchmarks/bench_login.py
+# ยิง login พร้อมกันจำนวนมาก แล้ววัด latency ของ /user/me ที่ถูกเรียกระหว่างนั้น
+os.environ["MONGO_DATABASE_NAME"] = os.getenv("BENCH_MONGO_DATABASE_NAME", "sms_sender_bench")
+os.environ.setdefault("MONGO_SENDER_NAMES_COLLECTION", "sender_names")
+os.environ.setdefault("LOGIN_RATE_LIMIT_PER_EMAIL", "1000000")
+os.environ.setdefault("LOGIN_RATE_LIMIT_PER_IP", "1000000")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from werkzeug.security import generate_password_hash
+from app.routers import users
+from app.models.database import drop_database, open_async_db, close_async_db
+from app.models.indexes import ensure_indexes
+from app.models.user import users_collection
+from app.utils.authentication import create_access_token
+from app.config import get_settings
+from app.utils.credentials import start_credential_workers, shutdown_credential_workers
+
+LOGINS = int(os.getenv("BENCH_LOGINS", 200))
+PROBES = int(os.getenv("BENCH_PROBES", 50))
+
+@asynccontextmanager
+async def lifespan(app):
+    open_async_db()
+    start_credential_workers()
+    yield
+    shutdown_credential_workers()
+    close_async_db()
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(users.router, prefix="/api")
+
+def seed():
+    drop_database()
+    ensure_indexes()
+    user_id = users_collection().insert_one({
+        "name": "bench", "email": "bench@example.com", "role": "user",
+        "password": generate_password_hash("bench-password", get_settings().password_hash_method)
+    }).inserted_id
+    return {"Authorization": f"Bearer {create_access_token({'_id': user_id, 'email': 'bench@example.com'})}"}
+
+async def main():
+    headers = seed()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def login():
+            response = await client.post("/api/user/login", json={"email": "bench@example.com", "password": "bench-password"})
+            return response.status_code
+
+        async def probe():
+            started = time.perf_counter()
+            (await client.get("/api/user/me", headers=headers)).raise_for_status()
+            return time.perf_counter() - started
+
+        async def probes():
+            latencies = []
+            for _ in range(PROBES):
+                latencies.append(await probe())
+                await asyncio.sleep(0.01)
+            return sorted(latencies)
+
+        started = time.perf_counter()
+        statuses, latencies = await asyncio.gather(asyncio.gather(*(login() for _ in range(LOGINS))), probes())
+        elapsed = time.perf_counter() - started
+
+    ok = statuses.count(200)
+    print(f"{LOGINS} concurrent logins ({get_settings().password_hash_method}): {ok} ok, {statuses.count(503)} busy, {ok / elapsed:.1f} logins/s")
+    print(f"/user/me during storm: p50 {latencies[len(latencies) // 2] * 1000:.1f} ms  p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    drop_database()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import logging
+import warnings
+
+# รันจากโฟลเดอร์ Backend: python benchmarks/bench_pdf.py
+os.environ.setdefault("THAI_FONT_PATH_NORMAL", "Fonts/THSarabunNew.ttf")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.getLogger("fontTools").setLevel(logging.ERROR)
+warnings.simplefilter("ignore", DeprecationWarning)
+
+from fpdf import FPDF
+from app.config import get_settings
+from app.utils.pdf import render_suspension_pdf
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", 50))
+
+def render_suspension_pdf_uncached(request_id, date_display, recipient="เจ้าหน้าที่ผู้เกี่ยวข้อง"):
+    # เส้นทางเดิม: add_font ด้วยไฟล์ฟอนต์ต้นฉบับที่ยังมีตารางที่ไม่ใช้
+    pdf = FPDF()
+    pdf.add_font("THSarabunNew", "", get_settings().thai_font_path_normal)
+    pdf.set_font('THSarabunNew', '', 16)
+    pdf.add_page()
+    pdf.cell(0, 10, f"เรียน {recipient}", 0, 1)
+    pdf.ln(10)
+    pdf.multi_cell(0, 10, f"ขอให้ดำเนินการระงับสัญญาณตามข้อมูลในเอกสารแนบ (Request ID: {request_id})")
+    pdf.ln(10)
+    pdf.cell(0, 10, "ด้วยความเคารพ", 0, 1)
+    pdf.cell(0, 10, "ผู้ยื่นคำขอ", 0, 1)
+    pdf.ln(10)
+    pdf.set_text_color(255, 0, 0)
+    pdf.cell(0, 10, f"วันที่: {date_display}", 0, 1)
+    return pdf.output(dest='S')
+
+def pdfs_per_second(render):
+    render("warmup", "01 January 2025")
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        render(f"123e4567-e89b-12d3-a456-{i:012d}", "01 January 2025")
+    return ITERATIONS / (time.perf_counter() - started)
+
+before = pdfs_per_second(render_suspension_pdf_uncached)
+after = pdfs_per_second(render_suspension_pdf)
+print(f"suspension letter, original font file: {before:7.1f} PDFs/s")
+print(f"suspension letter, stripped font file: {after:7.1f} PDFs/s ({after / before:.2f}x)")
@@ -0,0 +1,263 @@
+import email
+import re
+import select
+import socketserver
+import subprocess
+import tempfile
+import threading
+import time
+import shutil
+
+# บริการจำลองในเครื่องสำหรับ bench_e2e.py: SMTP sink, IMAP server (รองรับ IDLE) และ mongod ชั่วคราว
+# รองรับเฉพาะคำสั่งที่ smtplib/imaplib ของแอปใช้จริง ไม่ใช่เซิร์ฟเวอร์เต็มรูปแบบ
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 localhost SMTP sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                self.server.receive(self.read_data())
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+class SMTPSink(_Server):
+    # เก็บอีเมลทุกฉบับพร้อมเวลาที่ได้รับ และเรียก on_message ถ้ากำหนดไว้
+    def __init__(self, host="127.0.0.1", port=0, on_message=None):
+        super().__init__((host, port), _SMTPHandler)
+        self.on_message = on_message
+        self.messages = []
+        self._lock = threading.Lock()
+
+    def receive(self, data):
+        received_at = time.perf_counter()
+        msg = email.message_from_bytes(data)
+        with self._lock:
+            self.messages.append((received_at, msg))
+        if self.on_message:
+            self.on_message(received_at, msg)
+
+UID_RANGE = re.compile(r"(\d+)(?::(\d+|\*))?")
+
+class _IMAPHandler(socketserver.StreamRequestHandler):
+    # อ่านแบบไม่ buffer เพื่อให้ select บน socket ระหว่าง IDLE เห็นคำสั่ง DONE
+    rbufsize = 0
+
+    def send(self, data):
+        self.wfile.write(data if isinstance(data, bytes) else data.encode() + b"\r\n")
+
+    def handle(self):
+        self.known = 0
+        self.send("* OK local IMAP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode(errors="replace").strip().split(" ", 2)
+            if len(parts) < 2:
+                continue
+            tag, command, args = parts[0], parts[1].upper(), parts[2] if len(parts) > 2 else ""
+            if command == "UID":
+                command, _, args = args.partition(" ")
+                command = "UID " + command.upper()
+            handler = {
+                "CAPABILITY": self.capability,
+                "LOGIN": self.ok,
+                "NOOP": self.ok,
+                "CHECK": self.ok,
+                "SELECT": self.select,
+                "EXAMINE": self.select,
+                "UID SEARCH": self.uid_search,
+                "UID FETCH": self.uid_fetch,
+                "UID STORE": self.ok,
+                "IDLE": self.idle,
+                "LOGOUT": self.logout,
+            }.get(command)
+            if handler is None:
+                self.send(f"{tag} BAD unsupported command {command}")
+            elif handler(tag, args) is False:
+                return
+
+    def notify_exists(self):
+        # เหมือนเซิร์ฟเวอร์จริง: แจ้งจำนวนข้อความใหม่ที่ session นี้ยังไม่เคยเห็น
+        count = len(self.server.mailbox.messages)
+        if count > self.known:
+            self.send(f"* {count} EXISTS")
+            self.known = count
+
+    def ok(self, tag, args):
+        self.notify_exists()
+        self.send(f"{tag} OK completed")
+
+    def capability(self, tag, args):
+        self.send("* CAPABILITY IMAP4rev1 IDLE")
+        self.ok(tag, args)
+
+    def select(self, tag, args):
+        mailbox = self.server.mailbox
+        self.known = len(mailbox.messages)
+        self.send(f"* {self.known} EXISTS")
+        self.send(f"* OK [UIDVALIDITY {mailbox.uidvalidity}] UIDs valid")
+        self.send(f"* OK [UIDNEXT {mailbox.next_uid}] Predicted next UID")
+        self.send(f"{tag} OK [READ-WRITE] SELECT completed")
+
+    def matching_uids(self, uid_set):
+        uids = self.server.mailbox.uids()
+        wanted = set()
+        for start, end in UID_RANGE.findall(uid_set):
+            start = int(start)
+            if end == "*":
+                # ตามมาตรฐาน "n:*" รวม UID ล่าสุดเสมอแม้จะน้อยกว่า n
+                wanted.update(uid for uid in uids if uid >= start)
+                if uids:
+                    wanted.add(uids[-1])
+            else:
+                stop = int(end) if end else start
+                wanted.update(uid for uid in uids if min(start, stop) <= uid <= max(start, stop))
+        return sorted(wanted)
+
+    def uid_search(self, tag, args):
+        uid_set = args.split()[-1]
+        self.notify_exists()
+        self.send("* SEARCH " + " ".join(str(uid) for uid in self.matching_uids(uid_set)))
+        self.send(f"{tag} OK SEARCH completed")
+
+    def uid_fetch(self, tag, args):
+        uid_set, _, items = args.partition(" ")
+        headers_only = "HEADER.FIELDS" in items.upper()
+        mailbox = self.server.mailbox
+        for uid in self.matching_uids(uid_set):
+            sequence, data = mailbox.get(uid)
+            if headers_only:
+                msg = email.message_from_bytes(data)
+                data = f"Subject: {msg['Subject'] or ''}\r\nFrom: {msg['From'] or ''}\r\n\r\n".encode()
+                item = "BODY[HEADER.FIELDS (SUBJECT FROM)]"
+            else:
+                item = "RFC822"
+            self.send(f"* {sequence} FETCH (UID {uid} {item} {{{len(data)}}}\r\n".encode() + data + b")\r\n")
+        self.send(f"{tag} OK FETCH completed")
+
+    def idle(self, tag, args):
+        self.send("+ idling")
+        while True:
+            readable, _, _ = select.select([self.connection], [], [], 0.05)
+            if readable:
+                line = self.rfile.readline()
+                if not line:
+                    return False
+                if line.strip().upper() == b"DONE":
+                    self.send(f"{tag} OK IDLE terminated")
+                    return
+            self.notify_exists()
+
+    def logout(self, tag, args):
+        self.send("* BYE logging out")
+        self.ok(tag, args)
+        return False
+
+class Mailbox:
+    def __init__(self, uidvalidity=1):
+        self.uidvalidity = uidvalidity
+        self.messages = []
+        self.next_uid = 1
+        self._lock = threading.Lock()
+
+    def append(self, data):
+        with self._lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.messages.append((uid, data))
+        return uid
+
+    def uids(self):
+        with self._lock:
+            return [uid for uid, _ in self.messages]
+
+    def get(self, uid):
+        with self._lock:
+            for sequence, (message_uid, data) in enumerate(self.messages, start=1):
+                if message_uid == uid:
+                    return sequence, data
+        raise KeyError(uid)
+
+class IMAPServer(_Server):
+    def __init__(self, host="127.0.0.1", port=0, mailbox=None):
+        super().__init__((host, port), _IMAPHandler)
+        self.mailbox = mailbox or Mailbox()
+
+def start_mongod(binary="mongod", timeout=30):
+    # เปิด mongod ชั่วคราวบนพอร์ตว่าง คืน (uri, stop)
+    from pymongo import MongoClient
+    path = shutil.which(binary)
+    if not path:
+        raise RuntimeError(f"{binary} not found in PATH")
+    dbpath = tempfile.mkdtemp(prefix="bench-mongod-")
+    with socketserver.TCPServer(("127.0.0.1", 0), socketserver.BaseRequestHandler) as probe:
+        port = probe.server_address[1]
+    process = subprocess.Popen(
+        [path, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    uri = f"mongodb://127.0.0.1:{port}"
+
+    def stop():
+        process.terminate()
+        process.wait(10)
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            MongoClient(uri, serverSelectionTimeoutMS=500).admin.command("ping")
+            return uri, stop
+        except Exception:
+            if process.poll() is not None or time.monotonic() > deadline:
+                stop()
+                raise RuntimeError("mongod did not start")
+            time.sleep(0.2)
@@ -0,0 +1,56 @@
+import os
+import time
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ต้องตั้งก่อน import app เพราะ get_settings() อ่านค่าครั้งเดียวต่อ process
+os.environ.update({
+    "APP_TEST_MODE": "1",
+    "MONGO_DATABASE_NAME": "sms_sender_test",
+    "MONGO_SENDER_NAMES_COLLECTION": "sender_names",
+    "MONGO_MOCK_COLLECTION": "mock_sender_names",
+    "THAI_FONT_PATH_NORMAL": os.path.join(BACKEND_DIR, "Fonts", "THSarabunNew.ttf"),
+    # ไม่มีเซิร์ฟเวอร์ IMAP ในการทดสอบ worker จะเชื่อมต่อไม่สำเร็จและรอ backoff
+    "IMAP_SERVER": "127.0.0.1",
+    "IMAP_PORT": "1",
+    "IMAP_SSL": "false",
+    "PDF_RENDER_WORKERS": "1",
+    "PASSWORD_HASH_WORKERS": "1",
+    "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+    "JOB_POLL_INTERVAL": "0.1",
+})
+
+@pytest.fixture
+def db():
+    from app.models.database import drop_database
+    from app.models.indexes import ensure_indexes
+    drop_database()
+    ensure_indexes()
+    yield
+    drop_database()
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+def register(client, email, name="tester"):
+    response = client.post("/api/user/register", json={"name": name, "email": email, "password": "password123"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+@pytest.fixture
+def auth_headers(client, db):
+    return register(client, "tester@example.com")
+
+def wait_for_job(client, headers, request_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/request/{request_id}/job", headers=headers).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"job {request_id} did not finish: {job}")
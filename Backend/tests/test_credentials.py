@@ -0,0 +1,11 @@
+from werkzeug.security import generate_password_hash
+from app.utils.credentials import _verify, needs_rehash
+
+def test_verify_rehashes_only_when_the_method_changed():
+    old_hash = generate_password_hash("secret", "pbkdf2:sha256:1000")
+    assert not needs_rehash(old_hash, "pbkdf2:sha256:1000")
+    assert _verify(old_hash, "secret", "pbkdf2:sha256:1000") == (True, None)
+
+    valid, new_hash = _verify(old_hash, "secret", "pbkdf2:sha256:2000")
+    assert valid and new_hash.startswith("pbkdf2:sha256:2000$")
+    assert _verify(old_hash, "wrong", "pbkdf2:sha256:2000") == (False, None)
@@ -0,0 +1,65 @@
+import datetime
+from app.config import get_settings
+from app.models.files import files_collection
+from app.models.job import jobs_collection
+from app.models.reply_match import reply_matches_collection
+from app.models.sender_names import sender_names_collection
+from app.utils.file_store import store_file, run_retention
+
+def age_files(days=30):
+    files_collection().update_many({}, {"$set": {"stored_at": datetime.datetime.now() - datetime.timedelta(days=days)}})
+
+def stored_ids():
+    return set(files_collection().distinct("_id"))
+
+def test_retention_is_opt_in():
+    assert get_settings().file_retention_interval_seconds == 0
+
+def test_retention_keeps_files_of_done_jobs_and_error_replies(db):
+    sent_pdf = store_file(b"%PDF sent", "data.pdf", "sent_data", "r1")
+    error_reply = store_file(b"sender_name\nother\n", "reply.csv", "reply", "r2")
+    orphan = store_file(b"nobody", "orphan.pdf", "sent_data", "r3")
+    jobs_collection().insert_one({"request_id": "r1", "status": "done", "data_pdf_id": sent_pdf, "suspension_pdf_id": None})
+    sender_names_collection().insert_one({
+        "request_id": "r2", "sender_name": "s", "status": ["pending", "error"],
+        "reply_file_id": None, "error_reply_file_id": error_reply
+    })
+    age_files()
+
+    summary = run_retention()
+
+    assert summary["deleted_files"] == 1
+    assert stored_ids() == {sent_pdf, error_reply}
+    assert orphan not in stored_ids()
+
+def test_retention_starts_the_grace_period_for_files_without_stored_at(db):
+    legacy = store_file(b"legacy", "old.pdf", "sent_data", "r1")
+    files_collection().update_one({"_id": legacy}, {"$unset": {"stored_at": ""}})
+
+    assert run_retention(dry_run=True)["legacy_files"] == 1
+    assert "stored_at" not in files_collection().find_one({"_id": legacy})
+
+    summary = run_retention()
+    assert (summary["legacy_files"], summary["deleted_files"]) == (1, 0)
+    assert legacy in stored_ids()
+
+    age_files()
+    assert run_retention()["deleted_files"] == 1
+    assert legacy not in stored_ids()
+
+def test_retention_keeps_replies_only_referenced_by_their_match(db):
+    # ตอบกลับที่แจ้ง error สองฉบับ ฉบับหลังเขียนทับ error_reply_file_id ในแถวผู้ส่ง
+    first = store_file(b"sender_name\nother\n", "reply1.csv", "reply", "r1")
+    second = store_file(b"sender_name\nanother\n", "reply2.csv", "reply", "r1")
+    sender_names_collection().insert_one({
+        "request_id": "r1", "sender_name": "s", "status": ["pending", "error"],
+        "reply_file_id": None, "error_reply_file_id": second
+    })
+    reply_matches_collection().insert_many([
+        {"request_id": "r1", "reply_file_id": first, "created_at": datetime.datetime.now()},
+        {"request_id": "r1", "reply_file_id": second, "created_at": datetime.datetime.now()}
+    ])
+    age_files()
+
+    assert run_retention()["deleted_files"] == 0
+    assert stored_ids() == {first, second}
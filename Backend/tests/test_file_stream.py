@@ -0,0 +1,18 @@
+import pytest
+from app.utils.file_stream import parse_byte_range
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=999-999", (999, 999)),
+    (" bytes=0-0 ", (0, 0)),
+])
+def test_parse_byte_range(header, expected):
+    assert parse_byte_range(header, 1000) == expected
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-1", "bytes=-0", "bytes=-", "items=0-1", "bytes=0-1,5-6"])
+def test_unsatisfiable_or_unsupported_ranges(header):
+    assert parse_byte_range(header, 1000) is None
@@ -0,0 +1,18 @@
+import os
+import sys
+from tests.conftest import BACKEND_DIR
+
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+from bench_import_time import IMPORT_TIME_BUDGET_MS, app_import_ms, import_profile, loaded_deferred_modules
+
+# งบใน benchmark วัดบนเครื่องที่ว่าง เครื่องที่รันเทสต์พร้อมงานอื่นช้ากว่านั้นได้มาก จึงเผื่อไว้สองเท่า
+# และใช้ค่าที่เร็วที่สุดจากหลายรอบ ให้สะท้อนเวลา import จริงแทนเสียงรบกวนของเครื่อง
+TEST_IMPORT_TIME_BUDGET_MS = float(os.getenv("TEST_IMPORT_TIME_BUDGET_MS", 2 * IMPORT_TIME_BUDGET_MS))
+TEST_IMPORT_TIME_RUNS = 3
+
+def test_heavy_modules_are_not_loaded_by_app_import():
+    assert loaded_deferred_modules() == []
+
+def test_app_import_time_within_budget():
+    best_ms = min(app_import_ms(import_profile()) for _ in range(TEST_IMPORT_TIME_RUNS))
+    assert 0 < best_ms <= TEST_IMPORT_TIME_BUDGET_MS
@@ -0,0 +1,41 @@
+import os
+import shutil
+import subprocess
+import sys
+import pytest
+from app.models.indexes import plan_stages, query_plans
+from tests.conftest import BACKEND_DIR
+
+@pytest.fixture(scope="module")
+def mongo_uri():
+    # ใช้ TEST_MONGO_URI ถ้ากำหนดไว้ ไม่เช่นนั้นเปิด mongod ชั่วคราว ถ้าไม่มีทั้งสองอย่างให้ข้าม
+    if os.getenv("TEST_MONGO_URI"):
+        yield os.environ["TEST_MONGO_URI"]
+        return
+    if not shutil.which("mongod"):
+        pytest.skip("ต้องมี mongod หรือ TEST_MONGO_URI เพื่อ explain คำค้นจริง")
+    sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+    from local_services import start_mongod
+    uri, stop = start_mongod()
+    yield uri
+    stop()
+
+def test_known_queries_use_indexes(mongo_uri):
+    env = {**os.environ, "APP_TEST_MODE": "0", "MONGO_CONNECTION_STRING": mongo_uri, "MONGO_DATABASE_NAME": "sms_sender_plan_check"}
+    result = subprocess.run(
+        [sys.executable, "-m", "app.models.indexes", "--check"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+def test_plan_stages_finds_nested_stages():
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "SORT", "inputStage": {"stage": "OR", "inputStages": [
+        {"stage": "IXSCAN"}, {"stage": "FETCH", "inputStage": {"stage": "COLLSCAN"}}
+    ]}}}
+    assert (plan_stages(plan, "COLLSCAN"), plan_stages(plan, "SORT"), plan_stages(plan, "PROJECTION")) == (1, 1, 0)
+
+def test_sender_search_queries_are_checked():
+    sender_queries = [query for collection_fn, query, sort in query_plans() if collection_fn.__name__ == "sender_names_collection" and sort == [("date", -1), ("_id", -1)]]
+    assert {} in sender_queries
+    assert {"status": "available"} in sender_queries
+    assert {"mobile_provider": "AIS"} in sender_queries
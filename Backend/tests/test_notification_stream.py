@@ -0,0 +1,44 @@
+import asyncio
+import dataclasses
+import datetime
+from bson.objectid import ObjectId
+from app.config import get_settings
+from app.external_services.notification_hub import notification_hub
+from app.models.notification import notifications_collection
+from app.routers import requests as requests_router
+
+def notification(doc_id, user_id="user-1"):
+    return {
+        "_id": doc_id, "user_id": user_id, "request_id": "r", "sender_name": "s", "status": "pending", "idempotency_key": str(doc_id),
+        "thai_date": "1 มกราคม 2569", "is_read": False, "created_at": datetime.datetime.now()
+    }
+
+def event_ids(events):
+    return [event.split("\n", 1)[0].removeprefix("id: ") for event in events if event.startswith("id: ")]
+
+def test_resume_replays_every_missed_notification_and_dedups_live_events(client, db, monkeypatch):
+    settings = dataclasses.replace(get_settings(), notification_stream_queue_size=2, notification_stream_heartbeat_seconds=0.05)
+    monkeypatch.setattr(requests_router, "get_settings", lambda: settings)
+    last_seen = ObjectId()
+    missed = [notification(ObjectId()) for _ in range(5)]
+    notifications_collection().insert_many(missed)
+    # อีก process สร้าง _id ที่น้อยกว่า last_seen แต่ส่งมาทีหลังผ่าน change stream
+    late = notification(ObjectId.from_datetime(datetime.datetime(2020, 1, 1)))
+
+    async def run():
+        stream = requests_router.stream_notifications({"id": "user-1"}, str(last_seen))
+        events = [await stream.__anext__()]
+        while len(events) < 1 + len(missed):
+            events.append(await stream.__anext__())
+        queue = next(iter(notification_hub._subscribers["user-1"]))
+        queue.put_nowait(missed[-1])
+        queue.put_nowait(late)
+        events.append(await stream.__anext__())
+        events.append(await stream.__anext__())
+        await stream.aclose()
+        return events
+
+    events = asyncio.run(run())
+
+    assert event_ids(events) == [str(doc["_id"]) for doc in missed] + [str(late["_id"])]
+    assert events[-1] == ": ping\n\n"
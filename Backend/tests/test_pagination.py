@@ -0,0 +1,34 @@
+import datetime
+from bson.objectid import ObjectId
+from app.models.sender_names import sender_names_collection
+from app.utils.pagination import encode_cursor, decode_cursor
+
+def read_all_pages(client, headers, path, limit):
+    docs, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        docs.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return docs
+
+def test_sender_pages_follow_date_then_id(client, auth_headers):
+    dates = ["2025-01-03", "2025-01-01", None, "2025-01-03", "2025-01-02", "2025-01-01", None]
+    sender_names_collection().insert_many([
+        {"sender_name": f"Sender {index}", "date": date, "status": ["available"]} for index, date in enumerate(dates)
+    ])
+    expected = [doc["sender_name"] for doc in sender_names_collection().find({}).sort([("date", -1), ("_id", -1)])]
+
+    docs = read_all_pages(client, auth_headers, "/api/available-senders", 2)
+
+    assert [doc["sender_name"] for doc in docs] == expected
+
+def test_cursor_round_trips():
+    now = datetime.datetime(2026, 1, 2, 3, 4, 5, 678000)
+    doc = {"_id": ObjectId(), "created_at": now, "date": "2026-01-02"}
+    assert decode_cursor(encode_cursor(doc)) == (now, doc["_id"])
+    assert decode_cursor(encode_cursor(doc, "date"), "date") == ("2026-01-02", doc["_id"])
+    value, _ = decode_cursor(encode_cursor({**doc, "date": None}, "date"), "date")
+    assert value is None
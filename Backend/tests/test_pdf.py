@@ -0,0 +1,63 @@
+import pytest
+from fontTools import ttLib
+from app.utils.pdf import (
+    FIELD_LABELS, TABLE_SAMPLE_ROWS, THAI_FONT_FAMILY, UNUSED_FONT_TABLES, DataTablePDF, add_thai_font,
+    fit_column_widths, thai_font_file, render_data_pdf, render_suspension_pdf, wrap_cells
+)
+
+ROWS = [
+    {"sender_name": "ร้านค้า", "mobile_provider": "AIS", "phone_number": "0812345678", "full_name": "สมชาย ใจดี", "date": "01/01/2025"},
+    {"sender_name": "shop", "mobile_provider": "DTAC", "phone_number": "0898765432", "full_name": "สมหญิง รักดี", "date": "02/01/2025"},
+]
+FIELDS = list(ROWS[0])
+
+def test_stripped_font_drops_unused_tables():
+    font = ttLib.TTFont(thai_font_file())
+    assert not any(tag in font for tag in UNUSED_FONT_TABLES)
+
+def test_rendering_twice_in_one_process_gives_the_same_pdf():
+    # ฟอนต์ที่ cache ไว้ต้องไม่มีสถานะ (glyph ที่ subset) ค้างจากเอกสารก่อนหน้า
+    first = [render_suspension_pdf("r1", "01 มกราคม 2568"), render_data_pdf(ROWS, FIELDS, "r1", "01 มกราคม 2568")]
+    second = [render_suspension_pdf("r1", "01 มกราคม 2568"), render_data_pdf(ROWS, FIELDS, "r1", "01 มกราคม 2568")]
+    for pdf in first:
+        assert bytes(pdf).startswith(b"%PDF-") and bytes(pdf).rstrip().endswith(b"%%EOF")
+    assert first == second
+
+def table_pdf(sample_rows):
+    pdf = DataTablePDF(FIELDS, "r1", "01 มกราคม 2568")
+    add_thai_font(pdf)
+    pdf.set_font(THAI_FONT_FAMILY, '', 14)
+    pdf.col_widths = fit_column_widths(pdf, FIELDS, sample_rows)
+    return pdf
+
+def test_columns_are_at_least_as_wide_as_the_sample():
+    pdf = table_pdf(ROWS)
+    page_width = pdf.w - pdf.l_margin - pdf.r_margin
+    assert sum(pdf.col_widths) == pytest.approx(page_width)
+    for field, width in zip(FIELDS, pdf.col_widths):
+        assert all(pdf.get_string_width(str(row[field])) + 2 * pdf.c_margin <= width for row in ROWS)
+
+def test_overwide_sample_only_narrows_the_widest_column():
+    wide = dict(ROWS[0], full_name="ชื่อยาวมาก " * 40)
+    pdf = table_pdf([wide])
+    page_width = pdf.w - pdf.l_margin - pdf.r_margin
+    assert sum(pdf.col_widths) == pytest.approx(page_width)
+    for field, width in zip(FIELDS, pdf.col_widths):
+        if field != "full_name":
+            texts = [FIELD_LABELS[field], str(wide[field])]
+            assert width == pytest.approx(max(map(pdf.get_string_width, texts)) + 2 * pdf.c_margin)
+
+def test_values_longer_than_the_sample_wrap_instead_of_truncating():
+    pdf = table_pdf(ROWS)
+    pdf.add_page()
+    phone = "0812345678" * 8
+    cells = wrap_cells(pdf, [phone if field == "phone_number" else str(ROWS[0][field]) for field in FIELDS], pdf.col_widths)
+    wrapped = cells[FIELDS.index("phone_number")]
+    assert len(wrapped) > 1
+    assert "".join(wrapped) == phone
+    assert all(len(cell) == 1 for i, cell in enumerate(cells) if i != FIELDS.index("phone_number"))
+
+def test_long_row_after_the_sample_renders():
+    rows = ROWS * (TABLE_SAMPLE_ROWS // 2) + [dict(ROWS[0], phone_number="0812345678" * 8, full_name="สมชาย " * 60)]
+    pdf = render_data_pdf(rows, FIELDS, "r1", "01 มกราคม 2568")
+    assert bytes(pdf).startswith(b"%PDF-")
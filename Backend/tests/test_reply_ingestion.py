@@ -0,0 +1,222 @@
+import imaplib
+import re
+import socket
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+from app.external_services import email as email_service
+from app.external_services.email import check_inbox_and_save_reply, uid_sets
+from app.models.job import jobs_collection
+from app.models.sender_names import sender_names_collection
+from app.workers import reply_ingestion
+from app.workers.reply_ingestion import ReplyIngestionWorker
+from tests.conftest import register, wait_for_job
+
+class FakeIMAP:
+    # จำลองเฉพาะ UID FETCH/STORE ที่ check_inbox_and_save_reply ใช้
+    def __init__(self, messages):
+        self.messages = messages
+        self.commands = []
+
+    def matching(self, uid_set):
+        uids = set()
+        for part in uid_set.split(","):
+            start, _, end = part.partition(":")
+            uids.update(range(int(start), int(end or start) + 1))
+        return sorted(uid for uid in uids if uid in self.messages)
+
+    def uid(self, command, uid_set, *args):
+        self.commands.append((command, uid_set))
+        if command != "FETCH":
+            return "OK", [b""]
+        data = []
+        for uid in self.matching(uid_set):
+            data.append((f"{uid} (UID {uid} RFC822 {{{len(self.messages[uid])}}}".encode(), self.messages[uid]))
+            data.append(b")")
+        return "OK", data
+
+def reply_message(request_id, csv):
+    msg = EmailMessage()
+    msg["From"] = "operator@example.org"
+    msg["Subject"] = f"Re: ขอข้อมูลและระงับสัญญาณ (Request ID: {request_id})"
+    msg.set_content("ตอบกลับ")
+    msg.add_attachment(csv.encode(), maintype="text", subtype="csv", filename="reply.csv")
+    return msg.as_bytes()
+
+def add_senders(request_id, names):
+    sender_names_collection().insert_many([{
+        "request_id": request_id, "sender_name": name, "phone_number": f"08{index:08d}",
+        "status": ["pending", "suspension_requested"], "created_by": "user", "thai_date": "1 January 2026"
+    } for index, name in enumerate(names)])
+
+def statuses(request_id):
+    return {doc["sender_name"]: doc["status"] for doc in sender_names_collection().find({"request_id": request_id})}
+
+def reply_files(request_id):
+    return {doc["sender_name"]: str(doc.get("reply_file_id")) for doc in sender_names_collection().find({"request_id": request_id})}
+
+def test_corrected_reply_in_the_same_cycle_is_applied(db):
+    request_id = str(uuid.uuid4())
+    add_senders(request_id, ["Sender 1", "Sender 2"])
+    mail = FakeIMAP({
+        1: reply_message(request_id, "sender_name,phone_number\nSender 1,0800000000\n"),
+        2: reply_message(request_id, "sender_name,phone_number\nSender 1,0800000000\nSender 2,0800000001\n"),
+    })
+
+    check_inbox_and_save_reply(mail, [1, 2])
+
+    result = statuses(request_id)
+    assert "received" in result["Sender 1"]
+    assert "received" in result["Sender 2"]
+    assert ("STORE", "1:2") in mail.commands
+
+def test_reply_for_an_unfinished_job_is_deferred_until_the_rows_are_saved(db):
+    request_id = str(uuid.uuid4())
+    # ส่งอีเมลแล้วแต่การบันทึกแถวผู้ส่งล้มเหลวและรอ retry
+    jobs_collection().insert_one({"_id": request_id, "request_id": request_id, "status": "queued", "email_sent": True})
+    mail = FakeIMAP({3: reply_message(request_id, "sender_name,phone_number\nSender 1,0800000000\n")})
+
+    assert check_inbox_and_save_reply(mail, [3]) == {3}
+    assert not any(command == "STORE" for command, _ in mail.commands)
+
+    add_senders(request_id, ["Sender 1"])
+    jobs_collection().update_one({"_id": request_id}, {"$set": {"status": "done"}})
+    assert check_inbox_and_save_reply(mail, [3]) == set()
+    assert "received" in statuses(request_id)["Sender 1"]
+
+def test_reply_diff_is_stored_and_exposed(client, auth_headers):
+    rows = [{"sender_name": name, "phone_number": phone} for name, phone in [("Sender A", "0811111111"), ("Sender B", "0822222222")]]
+    response = client.post("/api/request", json={"fields": ["sender_name", "phone_number"], "rows": rows}, headers=auth_headers)
+    request_id = response.json()["request_id"]
+    assert wait_for_job(client, auth_headers, request_id)["status"] == "done"
+    mail = FakeIMAP({1: reply_message(request_id, "sender_name,phone_number\nSender A,081-111-1111\nUnknown,0899999999\n")})
+
+    check_inbox_and_save_reply(mail, [1])
+
+    replies = client.get(f"/api/request/{request_id}/replies", headers=auth_headers).json()
+    assert len(replies) == 1
+    assert (replies[0]["matched"], replies[0]["missing"], replies[0]["extra_count"]) == (["Sender A"], ["Sender B"], 1)
+    assert replies[0]["extra"] == [{"sender_name": "Unknown", "phone_number": "0899999999"}]
+    assert replies[0]["reply_file_id"] == reply_files(request_id)["Sender A"]
+
+    other_headers = register(client, "other@example.com", "other")
+    assert client.get(f"/api/request/{request_id}/replies", headers=other_headers).status_code == 404
+
+def test_uid_sets_collapse_ranges_and_split_long_commands(monkeypatch):
+    assert uid_sets([7, 1, 2, 3, 5, 8, 3]) == ["1:3,5,7:8"]
+    monkeypatch.setattr(email_service, "IMAP_UID_SET_SIZE", 2)
+    assert uid_sets(range(1, 20, 2)) == ["1,3", "5,7", "9,11", "13,15", "17,19"]
+    assert all(re.fullmatch(r"[\d:,]+", uid_set) for uid_set in uid_sets(range(1000)))
+
+def serve_imap(handler):
+    # เซิร์ฟเวอร์ IMAP หนึ่งการเชื่อมต่อ handler ตอบทีละบรรทัดคำสั่ง
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def run():
+        conn, _ = listener.accept()
+        with conn, conn.makefile("rb") as lines:
+            conn.sendall(b"* PREAUTH [CAPABILITY IMAP4rev1 IDLE] ready\r\n")
+            for line in lines:
+                tag, _, command = line.decode().strip().partition(" ")
+                command = command.upper()
+                if command == "CAPABILITY":
+                    conn.sendall(f"* CAPABILITY IMAP4rev1 IDLE\r\n{tag} OK done\r\n".encode())
+                elif command == "LOGOUT":
+                    conn.sendall(f"* BYE\r\n{tag} OK done\r\n".encode())
+                else:
+                    conn.sendall(handler(tag, command))
+                if command == "LOGOUT":
+                    break
+        listener.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return imaplib.IMAP4("127.0.0.1", listener.getsockname()[1])
+
+def test_idle_wakes_on_exists_sent_with_the_continuation():
+    state = {}
+
+    def handler(tag, command):
+        if tag == "DONE":
+            return f"{state['idle_tag']} OK IDLE done\r\n".encode()
+        if command == "IDLE":
+            state["idle_tag"] = tag
+            # EXISTS มาในแพ็กเก็ตเดียวกับ "+ idling" จึงค้างอยู่ใน buffer ของ imaplib
+            return b"+ idling\r\n* 3 EXISTS\r\n"
+        return f"{tag} OK done\r\n".encode()
+
+    worker = ReplyIngestionWorker(connect=None, mailbox="INBOX", idle_timeout=10)
+    worker.mail = serve_imap(handler)
+    started = time.monotonic()
+    worker._wait_for_mail()
+    assert time.monotonic() - started < 2
+    worker._disconnect()
+
+def test_lag_comes_from_the_server_uidnext(db, monkeypatch):
+    def handler(tag, command):
+        if command.startswith("SELECT"):
+            return f"* 9 EXISTS\r\n* OK [UIDVALIDITY 7]\r\n* OK [UIDNEXT 21]\r\n{tag} OK [READ-WRITE] done\r\n".encode()
+        if command.startswith("UID SEARCH"):
+            return f"* SEARCH 20\r\n{tag} OK done\r\n".encode()
+        return f"{tag} OK done\r\n".encode()
+
+    monkeypatch.setattr(reply_ingestion, "check_inbox_and_save_reply", lambda mail, uids: set())
+    worker = ReplyIngestionWorker(connect=lambda: serve_imap(handler), mailbox="INBOX")
+    worker._open()
+    assert worker.uidnext == 21
+    worker.last_uid = 15
+    worker.sync()
+    status = reply_ingestion.ingestion_status()
+    assert (status["uidnext"], status["last_uid"], status["lag_messages"]) == (21, 20, 0)
+
+    worker.last_uid = 12
+    monkeypatch.setattr(reply_ingestion, "check_inbox_and_save_reply", lambda mail, uids: (_ for _ in ()).throw(OSError("down")))
+    try:
+        worker.sync()
+    except OSError:
+        pass
+    assert reply_ingestion.ingestion_status()["lag_messages"] == 8
+    worker._disconnect()
+
+def test_deferred_uids_are_retried_after_last_uid_moves_on(db, monkeypatch):
+    def handler(tag, command):
+        if command.startswith("SELECT"):
+            return f"* 5 EXISTS\r\n* OK [UIDVALIDITY 7]\r\n* OK [UIDNEXT 6]\r\n{tag} OK [READ-WRITE] done\r\n".encode()
+        if command.startswith("UID SEARCH"):
+            return f"* SEARCH 5\r\n{tag} OK done\r\n".encode()
+        return f"{tag} OK done\r\n".encode()
+
+    calls = []
+    results = iter([{5}, set()])
+    monkeypatch.setattr(reply_ingestion, "check_inbox_and_save_reply", lambda mail, uids: calls.append(uids) or next(results))
+    worker = ReplyIngestionWorker(connect=lambda: serve_imap(handler), mailbox="INBOX")
+    worker._open()
+    worker.sync()
+    assert (worker.last_uid, worker.deferred_uids) == (5, {5})
+
+    # state ที่บันทึกไว้ทำให้ worker ตัวใหม่ยังตรวจข้อความที่เลื่อนไว้ต่อ
+    worker._disconnect()
+    worker = ReplyIngestionWorker(connect=lambda: serve_imap(handler), mailbox="INBOX")
+    worker._open()
+    assert worker.deferred_uids == {5}
+    worker.sync()
+    assert calls == [[5], [5]]
+    assert worker.deferred_uids == set()
+    worker._disconnect()
+
+def test_exists_seen_after_search_skips_idle():
+    commands = []
+
+    def handler(tag, command):
+        commands.append(command)
+        # เซิร์ฟเวอร์แจ้งข้อความใหม่ระหว่าง STORE และจะไม่แจ้งซ้ำตอน IDLE
+        return f"* 4 EXISTS\r\n{tag} OK done\r\n".encode()
+
+    worker = ReplyIngestionWorker(connect=None, mailbox="INBOX", idle_timeout=10)
+    worker.mail = serve_imap(handler)
+    worker.mail.noop()
+    started = time.monotonic()
+    worker._wait_for_mail()
+    assert time.monotonic() - started < 1
+    assert "IDLE" not in commands
+    worker._disconnect()
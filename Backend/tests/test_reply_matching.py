@@ -0,0 +1,35 @@
+import os
+import pytest
+from app.utils.reply_matching import match_reply
+from tests.conftest import BACKEND_DIR
+
+FIXTURES = os.path.join(BACKEND_DIR, "mock_nbtc_responses")
+REQUESTED = [{"sender_name": f"Sender {i}", "phone_number": f"08{i}1234567"} for i in range(1, 6)]
+ALL = [sender["sender_name"] for sender in REQUESTED]
+
+def match_fixture(filename):
+    with open(os.path.join(FIXTURES, filename), "rb") as file:
+        return match_reply(file.read(), filename, REQUESTED)
+
+@pytest.mark.parametrize("filename, matched, extra_names", [
+    ("response_case_1_complete.xlsx", ALL, []),
+    ("response_case_2_missing_data.xlsx", ["Sender 1", "Sender 3"], ["Sender 2"]),
+    ("response_case_3_incorrect_data.xlsx", ["Sender 2"], ["Sender 1"]),
+    ("response_case_4_missing_senders.xlsx", ["Sender 1", "Sender 3"], []),
+    ("response_case_6_extra_data.xlsx", ALL, ["Sender Unknown"]),
+])
+def test_match_reply_on_operator_fixtures(filename, matched, extra_names):
+    result = match_fixture(filename)
+    assert result["error"] is None
+    assert result["matched"] == matched
+    assert result["missing"] == [name for name in ALL if name not in matched]
+    assert [row["sender_name"] for row in result["extra"]] == extra_names
+
+def test_empty_reply_marks_every_sender_missing():
+    result = match_fixture("response_case_5_empty.xlsx")
+    assert (result["matched"], result["missing"]) == ([], ALL)
+    assert result["error"]
+
+def test_phone_numbers_match_regardless_of_formatting():
+    csv = "Sender Name,Phone Number\n sender 1 ,+0 81-123-4567\n".encode()
+    assert match_reply(csv, "reply.csv", REQUESTED[:1])["matched"] == ["Sender 1"]
@@ -0,0 +1,59 @@
+import dataclasses
+from io import BytesIO
+from app.config import get_settings
+from app.external_services.email import test_outbox
+from app.models.job import jobs_collection, job_rows_collection
+from app.models.sender_names import sender_names_collection
+from app.models.stats import sender_stats_collection
+from app.workers import request_jobs
+from tests.conftest import wait_for_job
+
+FIELDS = ["sender_name", "phone_number", "mobile_provider"]
+
+def make_rows(count):
+    return [{"sender_name": f"Sender {i}", "phone_number": f"08{i:08d}", "mobile_provider": "AIS"} for i in range(count)]
+
+def test_request_job_completes_in_test_mode(client, auth_headers):
+    # bulk_write(UpdateOne) ต้องทำงานได้กับ mongomock ตามเวอร์ชันที่ pin ไว้ใน requirements.txt
+    sent_before = len(test_outbox)
+    response = client.post("/api/request", json={"fields": FIELDS, "rows": make_rows(3)}, headers=auth_headers)
+    assert response.status_code == 202
+    request_id = response.json()["request_id"]
+
+    job = wait_for_job(client, auth_headers, request_id)
+    assert job["status"] == "done", job["error"]
+    assert job["result"] == {"saved": 3, "errors": []}
+    assert sender_names_collection().count_documents({"request_id": request_id}) == 3
+    assert len(test_outbox) == sent_before + 1
+    assert sender_stats_collection().find_one({"_id": f"request:{request_id}"})["counts"]["pending"] == 3
+
+def test_job_rows_are_stored_outside_the_job_document(client, auth_headers, monkeypatch):
+    settings = dataclasses.replace(get_settings(), job_rows_chunk_size=2)
+    monkeypatch.setattr(request_jobs, "get_settings", lambda: settings)
+    response = client.post("/api/request", json={"fields": FIELDS, "rows": make_rows(5)}, headers=auth_headers)
+    request_id = response.json()["request_id"]
+
+    job_doc = jobs_collection().find_one({"_id": request_id})
+    assert "rows" not in job_doc
+    assert (job_doc["row_count"], job_doc["row_chunks"]) == (5, 3)
+
+    job = wait_for_job(client, auth_headers, request_id)
+    assert job["result"]["saved"] == 5
+    # แถวของงานที่จบแล้วถูกลบ
+    assert job_rows_collection().count_documents({"request_id": request_id}) == 0
+
+def test_load_job_rows_keeps_submission_order(db):
+    rows = make_rows(5)
+    job_rows_collection().insert_many([
+        {"request_id": "r", "seq": 1, "rows": rows[2:4]},
+        {"request_id": "r", "seq": 0, "rows": rows[:2]},
+        {"request_id": "r", "seq": 2, "rows": rows[4:]},
+    ])
+    assert request_jobs.load_job_rows("r") == rows
+
+def test_import_senders_bulk_writes_in_test_mode(db):
+    from app.utils.sender_import import import_senders
+    csv = "sender_name,phone_number,mobile_provider\nA,0811111111,AIS\nB,0822222222,DTAC\nA,0811111111,AIS\n"
+    summary = import_senders(BytesIO(csv.encode()), "senders.csv")
+    assert (summary["inserted"], summary["duplicates"], summary["rejected"]) == (2, 1, 0)
+    assert sender_names_collection().count_documents({}) == 2
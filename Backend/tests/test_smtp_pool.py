@@ -0,0 +1,99 @@
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+import pytest
+from aiosmtpd.controller import Controller
+from app.external_services.smtp_pool import SMTPPool, CoalescingDispatcher
+
+class Sink:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            self.messages.append(envelope)
+            self.sessions.add(id(session))
+        return "250 OK"
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, sink
+    controller.stop()
+
+def make_pool(controller, size=2):
+    return SMTPPool(controller.hostname, controller.port, size=size, starttls=False, timeout=5)
+
+def message(subject, recipient="operator@example.org"):
+    msg = EmailMessage()
+    msg["From"] = "sms-sender@example.org"
+    msg["To"] = recipient
+    msg["Subject"] = subject
+    msg.set_content(subject)
+    return msg
+
+def test_pool_reuses_one_session_for_sequential_sends(smtp_server):
+    controller, sink = smtp_server
+    pool = make_pool(controller)
+    for index in range(5):
+        pool.send(message(f"message {index}"))
+    pool.close()
+    assert len(sink.messages) == 5
+    assert len(sink.sessions) == 1
+    assert (pool.stats["sent"], pool.stats["connects"]) == (5, 1)
+
+def test_pool_never_opens_more_sessions_than_its_size(smtp_server):
+    controller, sink = smtp_server
+    pool = make_pool(controller, size=2)
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda index: pool.send(message(f"message {index}")), range(20)))
+    pool.close()
+    assert len(sink.messages) == 20
+    assert pool.stats["connects"] <= 2
+
+def test_pool_reconnects_when_the_server_dropped_the_session():
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    pool = make_pool(controller)
+    pool.send(message("before restart"))
+    # เซิร์ฟเวอร์ปิดแล้วเปิดใหม่ session ที่ค้างใน pool ใช้ต่อไม่ได้
+    controller.stop()
+    controller = Controller(sink, hostname="127.0.0.1", port=controller.port)
+    controller.start()
+    try:
+        pool.send(message("after restart"))
+    finally:
+        pool.close()
+        controller.stop()
+    assert len(sink.messages) == 2
+    assert pool.stats["reconnects"] == 1
+
+def test_dispatcher_coalesces_messages_per_recipient(smtp_server):
+    controller, sink = smtp_server
+    pool = make_pool(controller)
+
+    def build(recipient, subject, body, attachments):
+        msg = message(subject, recipient)
+        for filename, data in attachments:
+            msg.add_attachment(data, maintype="application", subtype="pdf", filename=filename)
+        return msg
+
+    dispatcher = CoalescingDispatcher(build, pool.send, window=0.3)
+    futures = [dispatcher.submit("operator@example.org", f"request {index}", "body", [(f"{index}.pdf", b"%PDF")]) for index in range(3)]
+    futures.append(dispatcher.submit("other@example.org", "request 3", "body", []))
+
+    assert [future.result(timeout=10) for future in futures] == [3, 3, 3, 1]
+    pool.close()
+    subjects = sorted(envelope.content.split(b"Subject: ")[1].split(b"\r\n")[0] for envelope in sink.messages)
+    assert subjects == [b"request 0 / request 1 / request 2", b"request 3"]
@@ -0,0 +1,29 @@
+from tests.conftest import register, wait_for_job
+
+def create_request(client, headers, sender_name):
+    rows = [{"sender_name": sender_name, "phone_number": "0800000001", "mobile_provider": "AIS"}]
+    response = client.post("/api/request", json={"fields": ["sender_name", "phone_number", "mobile_provider"], "rows": rows}, headers=headers)
+    request_id = response.json()["request_id"]
+    assert wait_for_job(client, headers, request_id)["status"] == "done"
+    return request_id
+
+def test_stats_only_show_the_callers_requests(client, auth_headers):
+    other_headers = register(client, "other@example.com", "other")
+    own_request = create_request(client, auth_headers, "Sender 1")
+    other_request = create_request(client, other_headers, "Sender 2")
+
+    stats = client.get("/api/stats", headers=auth_headers).json()
+    assert list(stats["request"]) == [own_request]
+    assert len(stats["user"]) == 1
+    assert stats["all"]["all"]["pending"] == 2
+
+    assert client.get(f"/api/stats/request/{own_request}", headers=auth_headers).json()["pending"] == 1
+    assert client.get(f"/api/stats/request/{other_request}", headers=auth_headers).status_code == 404
+
+def test_request_stats_stay_with_the_requester_after_a_sender_is_requested_again(client, auth_headers):
+    other_headers = register(client, "other@example.com", "other")
+    first_request = create_request(client, auth_headers, "Sender 1")
+    create_request(client, other_headers, "Sender 1")
+
+    assert client.get(f"/api/stats/request/{first_request}", headers=auth_headers).json()["pending"] == 1
+    assert client.get(f"/api/stats/request/{first_request}", headers=other_headers).status_code == 404
@@ -0,0 +1,38 @@
+from app.models.notification import notifications_collection
+from app.models.sender_names import sender_names_collection
+from tests.conftest import register, wait_for_job
+
+def create_request(client, headers, *sender_names):
+    rows = [{"sender_name": name, "phone_number": f"08000000{i:02d}", "mobile_provider": "AIS"} for i, name in enumerate(sender_names)]
+    response = client.post("/api/request", json={"fields": ["sender_name", "phone_number", "mobile_provider"], "rows": rows}, headers=headers)
+    request_id = response.json()["request_id"]
+    assert wait_for_job(client, headers, request_id)["status"] == "done"
+    return request_id
+
+def suspended_notifications(request_id):
+    return notifications_collection().count_documents({"request_id": request_id, "status": "suspended"})
+
+def test_complete_suspensions_marks_only_pending_senders(client, auth_headers):
+    request_id = create_request(client, auth_headers, "S1", "S2")
+
+    response = client.post(f"/api/request/complete-suspension/{request_id}", json={"sender_names": ["S1", "S3"]}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["suspended"] == 1
+    assert {item["sender_name"]: item["result"] for item in body["results"]} == {"S1": "suspended", "S3": "not_found"}
+
+    response = client.post(f"/api/request/complete-suspension/{request_id}/S1", headers=auth_headers)
+    assert response.json() == {"message": "Sender already marked as suspended"}
+    assert suspended_notifications(request_id) == 1
+
+def test_complete_suspensions_rejects_another_users_request(client, auth_headers):
+    request_id = create_request(client, auth_headers, "S1")
+    other_headers = register(client, "other@example.com", "other")
+
+    response = client.post(f"/api/request/complete-suspension/{request_id}", json={"sender_names": ["S1"]}, headers=other_headers)
+    assert response.status_code == 404
+    response = client.post(f"/api/request/complete-suspension/{request_id}/S1", headers=other_headers)
+    assert response.status_code == 404
+
+    assert "suspended" not in sender_names_collection().find_one({"request_id": request_id, "sender_name": "S1"})["status"]
+    assert suspended_notifications(request_id) == 0
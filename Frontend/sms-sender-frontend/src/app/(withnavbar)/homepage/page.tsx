@@ -34,13 +34,16 @@ export default function DashboardPage() {
   useEffect(() => {
     const fetchData = async () => {
       try {
+        const session = await getSession();
+        const token = session?.user.token;
+        if (!token) return;
         let data;
         if (!startDate && !endDate) {
           // ถ้าไม่ได้เลือกช่วง → ดึงทั้งหมด
-          data = await getAvailableSenders();
+          data = await getAvailableSenders(token);
         } else {
           // ดึงตามช่วงที่ระบุ
-          data = await getAvailableSenders(startDate, endDate);
+          data = await getAvailableSenders(token, startDate, endDate);
         }
         setSenders(data);
       } catch (err) {
@@ -4,32 +4,96 @@ import { useEffect, useState } from "react";
 import { Bell } from "lucide-react";
 import { getSession } from "next-auth/react";
 import getNotifications from "@/libs/getNotification";
+import getUnreadCount from "@/libs/getUnreadCount";
 import markNotificationAsRead from "@/libs/markRequestAsRead";
 
 export default function NotificationBell() {
   const [open, setOpen] = useState(false);
   const [notis, setNotis] = useState<any[]>([]);
+  const [unreadCount, setUnreadCount] = useState(0);
 
   const fetchNotifications = async () => {
     const session = await getSession();
     const token = session?.user.token;
-    if (!token) return;
+    if (!token) return [];
 
     try {
-      const data = await getNotifications(token);
+      const [data, unread] = await Promise.all([
+        getNotifications(token),
+        getUnreadCount(token),
+      ]);
       setNotis(data);
+      setUnreadCount(unread);
+      return data;
     } catch (err) {
       console.error("โหลดแจ้งเตือนไม่สำเร็จ", err);
+      return [];
+    }
+  };
+
+  const fetchUnreadCount = async () => {
+    const session = await getSession();
+    const token = session?.user.token;
+    if (!token) return;
+
+    try {
+      setUnreadCount(await getUnreadCount(token));
+    } catch (err) {
+      console.error("โหลดจำนวนแจ้งเตือนไม่สำเร็จ", err);
     }
   };
 
   useEffect(() => {
-    fetchNotifications();
-    const interval = setInterval(fetchNotifications, 10000);
-    return () => clearInterval(interval);
-  }, []);
+    // รับแจ้งเตือนใหม่ทาง SSE แทนการ poll ทุก 10 วินาที
+    let source: EventSource | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let lastEventId: string | null = null;
+    let closed = false;
+
+    const connect = async () => {
+      const session = await getSession();
+      const token = session?.user.token;
+      if (!token || closed) return;
+
+      if (lastEventId === null) {
+        // ต่อจากรายการล่าสุดที่โหลดมา backend จะส่งรายการที่เกิดระหว่างนั้นให้ก่อน
+        const data = await fetchNotifications();
+        lastEventId = data[0]?.notification_id ?? "";
+        if (closed) return;
+      }
 
-  const unreadCount = notis.filter((n) => !n.is_read).length;
+      const params = new URLSearchParams({ token });
+      if (lastEventId) params.append("last_event_id", lastEventId);
+      source = new EventSource(
+        `${process.env.NEXT_PUBLIC_BACKEND_URL}/api/notifications/stream?${params.toString()}`
+      );
+
+      source.addEventListener("notification", (event) => {
+        const n = JSON.parse((event as MessageEvent).data);
+        lastEventId = (event as MessageEvent).lastEventId || n.notification_id;
+        setNotis((prev) =>
+          prev.some((p) => p.notification_id === n.notification_id) ? prev : [n, ...prev]
+        );
+        fetchUnreadCount();
+      });
+
+      source.onerror = () => {
+        // ถ้ายังเชื่อมต่อใหม่ได้ เบราว์เซอร์จะลองเองพร้อม Last-Event-ID
+        // ถ้าถูกปิด (เช่น token หมดอายุ) สร้างใหม่เองโดยส่ง last_event_id ทาง query string
+        if (source?.readyState === EventSource.CLOSED && !closed) {
+          source.close();
+          retryTimer = setTimeout(connect, 5000);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
+  }, []);
 
   const handleToggle = async () => {
     const nextOpen = !open;
@@ -40,9 +104,10 @@ export default function NotificationBell() {
       const token = session?.user.token;
       if (!token) return;
 
-      const unread = notis.filter((n) => !n.is_read);
+      // รายการที่ยังไม่อ่านอาจไม่อยู่ในหน้าแรก จึงขอเฉพาะที่ยังไม่อ่านจาก backend
+      const unread = await getNotifications(token, true);
       await Promise.all(
-        unread.map((n) => markNotificationAsRead(n.notification_id, token))
+        unread.map((n: any) => markNotificationAsRead(n.notification_id, token))
       );
       await fetchNotifications();
     }
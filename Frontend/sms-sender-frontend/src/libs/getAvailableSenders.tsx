@@ -1,19 +1,31 @@
 'use server';
 
-export default async function getAvailableSenders(start?: string, end?: string) {
+export default async function getAvailableSenders(token: string, start?: string, end?: string) {
   const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL;
 
   const params = new URLSearchParams();
   if (start) params.append("start", start);
   if (end) params.append("end", end);
+  params.append("limit", "1000");
 
-  const url = `${BACKEND_URL}/api/available-senders${params.toString() ? "?" + params.toString() : ""}`;
+  // backend แบ่งผลลัพธ์เป็นหน้า ดึงต่อจนกว่าจะไม่มี X-Next-Cursor
+  const senders: any[] = [];
+  let cursor: string | null = null;
+  do {
+    if (cursor) params.set("cursor", cursor);
+    const response = await fetch(`${BACKEND_URL}/api/available-senders?${params.toString()}`, {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    });
 
-  const response = await fetch(url);
+    if (!response.ok) {
+      throw new Error('Failed to fetch mock data');
+    }
 
-  if (!response.ok) {
-    throw new Error('Failed to fetch mock data');
-  }
+    senders.push(...(await response.json()));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
 
-  return await response.json();
+  return senders;
 }
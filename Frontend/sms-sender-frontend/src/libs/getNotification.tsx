@@ -1,9 +1,14 @@
 'use server';
 
-export default async function getNotifications(token: string) {
+export default async function getNotifications(token: string, unreadOnly = false) {
   const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL;
 
-  const response = await fetch(`${BACKEND_URL}/api/notifications`, {
+  // กระดิ่งแสดงเฉพาะหน้าแรก (ล่าสุดก่อน) ไม่ดึงประวัติทั้งหมดทุกครั้ง
+  const params = new URLSearchParams();
+  params.append("limit", "100");
+  if (unreadOnly) params.append("unread_only", "true");
+
+  const response = await fetch(`${BACKEND_URL}/api/notifications?${params.toString()}`, {
     method: 'GET',
     headers: {
       'Content-Type': 'application/json',
@@ -18,4 +23,4 @@ export default async function getNotifications(token: string) {
   }
 
   return await response.json();
-}
\ No newline at end of file
+}
@@ -3,17 +3,29 @@
 export default async function getRequestList(token: string) {
   const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL;
 
-  const response = await fetch(`${BACKEND_URL}/api/requests`, {
-    method: "GET",
-    headers: {
-      "Content-Type": "application/json",
-      Authorization: `Bearer ${token}`,
-    },
-  });
+  const params = new URLSearchParams();
+  params.append("limit", "1000");
 
-  if (!response.ok) {
-    throw new Error('Failed to fetch request list');
-  }
+  // backend แบ่งผลลัพธ์เป็นหน้า ดึงต่อจนกว่าจะไม่มี X-Next-Cursor
+  const requests: any[] = [];
+  let cursor: string | null = null;
+  do {
+    if (cursor) params.set("cursor", cursor);
+    const response = await fetch(`${BACKEND_URL}/api/requests?${params.toString()}`, {
+      method: "GET",
+      headers: {
+        "Content-Type": "application/json",
+        Authorization: `Bearer ${token}`,
+      },
+    });
 
-  return await response.json();
+    if (!response.ok) {
+      throw new Error('Failed to fetch request list');
+    }
+
+    requests.push(...(await response.json()));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+
+  return requests;
 }
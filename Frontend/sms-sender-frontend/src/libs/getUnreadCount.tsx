@@ -0,0 +1,22 @@
+'use server';
+
+export default async function getUnreadCount(token: string) {
+  const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL;
+
+  const response = await fetch(`${BACKEND_URL}/api/notifications/unread-count`, {
+    method: 'GET',
+    headers: {
+      'Content-Type': 'application/json',
+      Authorization: `Bearer ${token}`,
+    },
+  });
+
+  if (!response.ok) {
+    const err = await response.json();
+    console.error(err);
+    throw new Error('Failed to fetch unread notification count');
+  }
+
+  const data = await response.json();
+  return data.unread as number;
+}